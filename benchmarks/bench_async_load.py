@@ -0,0 +1,123 @@
+"""
+Нагрузочное сравнение синхронного и асинхронного стека (USE_ASYNC_DB).
+
+Для каждого режима поднимается отдельный процесс uvicorn на временной базе,
+после чего N конкурентных клиентов в течение заданного времени читают
+GET /users/{id} и GET /users/{id}/orders.
+
+Запуск:
+    python -m benchmarks.bench_async_load --concurrency 500 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+from src.database.migrate import upgrade
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(workdir, users_count):
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'test.db')}")
+    upgrade(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, email, age) VALUES (?, ?, ?, ?)",
+            [(i, f"user_{i}", f"user_{i}@example.com", 30) for i in range(1, users_count + 1)],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO orders (user_id, product_name, quantity) VALUES (?, ?, ?)",
+            [(i % users_count + 1, f"Product {i}", 1) for i in range(users_count * 5)],
+        )
+    engine.dispose()
+
+
+def start_server(workdir, port, use_async):
+    env = dict(os.environ, PYTHONPATH=ROOT, USE_ASYNC_DB="1" if use_async else "0")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port),
+         "--log-level", "warning", "--backlog", "4096"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("uvicorn не запустился")
+
+
+async def load(base_url, concurrency, duration, users_count):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    completed = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker(seed_value):
+            nonlocal completed, errors
+            rnd = random.Random(seed_value)
+            while time.perf_counter() < deadline:
+                user_id = rnd.randint(1, users_count)
+                path = f"/users/{user_id}" if rnd.random() < 0.5 else f"/users/{user_id}/orders"
+                try:
+                    response = await client.get(path)
+                    if response.status_code == 200:
+                        completed += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return completed / elapsed, errors
+
+
+def run_mode(use_async, args):
+    with tempfile.TemporaryDirectory() as workdir:
+        seed(workdir, args.users)
+        port = free_port()
+        process = start_server(workdir, port, use_async)
+        try:
+            return asyncio.run(load(f"http://127.0.0.1:{port}", args.concurrency, args.duration, args.users))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"конкурентных соединений: {args.concurrency}, длительность: {args.duration} с")
+    for use_async in (False, True):
+        rps, errors = run_mode(use_async, args)
+        mode = "async" if use_async else "sync"
+        print(f"{mode:>6}: {rps:>9.1f} req/s, ошибок: {errors}")
+
+
+if __name__ == "__main__":
+    main()
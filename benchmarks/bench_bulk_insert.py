@@ -0,0 +1,88 @@
+"""
+Сравнение скорости импорта заказов: цикл по POST /orders против
+одного запроса POST /orders/bulk (JSON-массив и NDJSON).
+
+Запуск:
+    python -m benchmarks.bench_bulk_insert --rows 2000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.api import users, orders
+from src.database.db import get_read_db, get_write_db
+from src.models.orm_models import Base
+
+
+def make_client(db_path):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(orders.router)
+    app.dependency_overrides[get_write_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    client = TestClient(app)
+    user_id = client.post("/users", json={"username": "importer", "email": "importer@example.com", "age": 30}).json()["id"]
+    return client, user_id
+
+
+def payload(user_id, rows):
+    return [{"user_id": user_id, "product_name": f"Product {i}", "quantity": 1} for i in range(rows)]
+
+
+def bench_single(client, items):
+    started = time.perf_counter()
+    for item in items:
+        client.post("/orders", json=item)
+    return len(items) / (time.perf_counter() - started)
+
+
+def bench_bulk_json(client, items):
+    started = time.perf_counter()
+    response = client.post("/orders/bulk", json=items)
+    assert response.json()["created"] == len(items)
+    return len(items) / (time.perf_counter() - started)
+
+
+def bench_bulk_ndjson(client, items):
+    body = "\n".join(json.dumps(item) for item in items)
+    started = time.perf_counter()
+    response = client.post("/orders/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["created"] == len(items)
+    return len(items) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, bench in (("single", bench_single), ("bulk json", bench_bulk_json), ("bulk ndjson", bench_bulk_ndjson)):
+        with tempfile.TemporaryDirectory() as tmp:
+            client, user_id = make_client(os.path.join(tmp, "bench.db"))
+            results[name] = bench(client, payload(user_id, args.rows))
+
+    for name, rate in results.items():
+        print(f"{name:>12}: {rate:>10.0f} строк/с ({rate / results['single']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
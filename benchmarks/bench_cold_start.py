@@ -0,0 +1,86 @@
+"""
+Холодный старт: время импорта src.main в свежем интерпретаторе.
+
+Импорт выполняет каждый воркер uvicorn и каждый тестовый процесс, поэтому
+он не должен ходить в базу: схему готовят миграции, а приложение при
+старте (lifespan) только сверяет её версию. Бюджет задан относительно
+голого import fastapi, измеренного в том же прогоне, — так он не зависит
+от скорости машины. Тест tests/unit/test_startup.py проверяет только то,
+что импорт не создаёт файл базы.
+
+Запуск:
+    python -m benchmarks.bench_cold_start --runs 10 --importtime
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджет на импорт src.main (без запуска интерпретатора) в долях от
+# import fastapi: сейчас ~2.3, запас на шум машины
+IMPORT_BUDGET_RATIO = 3.0
+BASELINE_MODULE = "fastapi"
+
+_MEASURE = "import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+
+
+def _env(database_url: str) -> Dict[str, str]:
+    return dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL=database_url)
+
+
+def measure_import(database_url: str, module: str = "src.main") -> float:
+    """Секунды на импорт module в новом процессе."""
+    output = subprocess.run(
+        [sys.executable, "-c", _MEASURE.format(module=module)],
+        cwd=ROOT, env=_env(database_url), capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(database_url: str, module: str = "src.main", top: int = 10) -> List[Tuple[int, str]]:
+    """Модули с наибольшим собственным временем импорта (мкс) по -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=_env(database_url), capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[0].strip().isdigit():
+            rows.append((int(parts[0]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="показать самые медленные модули")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "cold.db")
+        database_url = f"sqlite:///{db_path}"
+        baseline = statistics.median(measure_import(database_url, BASELINE_MODULE) for _ in range(args.runs))
+        timings = [measure_import(database_url) for _ in range(args.runs)]
+        touched_db = os.path.exists(db_path)
+        if args.importtime:
+            for self_us, name in slowest_imports(database_url):
+                print(f"{self_us / 1000:>8.1f} мс  {name}")
+
+    median = statistics.median(timings)
+    budget = baseline * IMPORT_BUDGET_RATIO
+    print(f"импорт src.main: медиана {median * 1000:.0f} мс, мин {min(timings) * 1000:.0f} мс, "
+          f"макс {max(timings) * 1000:.0f} мс (бюджет {budget * 1000:.0f} мс = "
+          f"{IMPORT_BUDGET_RATIO:g} × import {BASELINE_MODULE} {baseline * 1000:.0f} мс)")
+    if touched_db:
+        print("Импорт обратился к базе данных")
+    return 1 if median > budget or touched_db else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Поиск заказов по словам в названии товара: LIKE '%...%' (обход всей
+таблицы orders) против полнотекстового индекса orders_fts (MATCH),
+первая страница из --limit заказов с сортировкой по id и по релевантности.
+
+Время обоих способов зависит от избирательности запроса, поэтому он
+измеряется для трёх видов запросов: редкое слово (номер товара), то же
+вместе со словом, которое есть в каждом названии ("product"), и слово,
+которого нет нигде. LIKE останавливается, набрав страницу, и быстр на
+частых совпадениях, но без совпадений читает всю таблицу; MATCH читает
+списки вхождений слов, и слово из каждой строки делает его медленнее.
+
+База берётся из benchmarks.seed (по умолчанию 1 млн заказов); индекс
+orders_fts заполняется триггерами при вставке, отдельно измеряется его
+полная пересборка (python -m src.database.fulltext rebuild).
+
+Запуск:
+    python -m benchmarks.bench_fulltext --scale 1m --lookups 50
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, text
+
+from benchmarks.seed import PRODUCTS, SCALES, default_db_path, seed
+from src.database.fulltext import rebuild_fulltext
+from src.database.order_search import OrderSearch, OrderSort, search_statement
+
+LIKE_SQL = text(
+    "SELECT id, user_id, product_name, quantity FROM orders "
+    "WHERE product_name LIKE :pattern ORDER BY id LIMIT :limit"
+)
+
+
+def measure(conn, statement_for, queries) -> float:
+    """Среднее время запроса в мс; statement_for(query) -> (запрос, параметры)."""
+    started = time.perf_counter()
+    for query in queries:
+        conn.execute(*statement_for(query)).fetchall()
+    return (time.perf_counter() - started) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="1m")
+    parser.add_argument("--db", help="путь к файлу базы (по умолчанию benchmarks/data/seed-<scale>.db)")
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = args.db or default_db_path(args.scale)
+    started = time.perf_counter()
+    _, orders = seed(db_path, args.scale, verbose=True)
+    print(f"база готова за {time.perf_counter() - started:.1f} с")
+
+    rnd = random.Random(7)
+    numbers = [rnd.randrange(PRODUCTS) for _ in range(args.lookups)]
+    query_kinds = {
+        "редкое слово": [f"{number}" for number in numbers],
+        "частое + редкое": [f"product {number}" for number in numbers],
+        "нет совпадений": [f"missing{number}" for number in numbers],
+    }
+
+    def like(query):
+        return LIKE_SQL, {"pattern": f"%{query}%", "limit": args.limit}
+
+    def fulltext(sort):
+        return lambda query: (search_statement(OrderSearch(q=query), sort, limit=args.limit), {})
+
+    methods = [
+        ("LIKE '%...%'", like),
+        ("MATCH, sort=id", fulltext(OrderSort.id)),
+        ("MATCH, sort=rank", fulltext(OrderSort.rank)),
+    ]
+    engine = create_engine(f"sqlite:///{db_path}")
+    print(f"заказов {orders:,}, запросов {args.lookups}, страница {args.limit}, мс/запрос")
+    print(f"{'':<18}" + "".join(f"{kind:>18}" for kind in query_kinds))
+    with engine.connect() as conn:
+        for name, statement_for in methods:
+            timings = [measure(conn, statement_for, queries) for queries in query_kinds.values()]
+            print(f"{name:<18}" + "".join(f"{elapsed:>18.3f}" for elapsed in timings))
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        rebuild_fulltext(conn)
+        rebuild = time.perf_counter() - started
+    engine.dispose()
+    print(f"пересборка orders_fts {rebuild:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
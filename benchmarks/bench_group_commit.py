@@ -0,0 +1,88 @@
+"""
+Пропускная способность вставки заказов: отдельный commit на заказ
+(crud.create_order) против групповой фиксации (GroupCommitWriter).
+
+--threads потоков, как потоки обработчиков, создают по одному заказу за
+вызов на файловой базе SQLite с PRAGMA профиля --profile (production:
+WAL и synchronous=NORMAL; с --synchronous FULL каждый commit — fsync).
+
+Запуск:
+    python -m benchmarks.bench_group_commit --threads 32 --orders 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import crud
+from src.database.db import apply_sqlite_pragmas
+from src.database.group_commit import GroupCommitWriter
+from src.models.orm_models import Base, User
+from src.models.pydantic_models import OrderCreate
+
+USERS = 100
+
+
+def make_session_factory(path: str, profile: str, synchronous: str, pool_size: int):
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}, pool_size=pool_size, max_overflow=0
+    )
+    apply_sqlite_pragmas(engine, profile, {"synchronous": synchronous, "busy_timeout": 30000})
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        db.add_all(User(username=f"user_{i}", email=f"user_{i}@example.com", age=30) for i in range(USERS))
+        db.commit()
+    return engine, SessionLocal
+
+
+def run(create, threads: int, orders: int) -> float:
+    items = [OrderCreate(user_id=i % USERS + 1, product_name=f"Product {i % 50}", quantity=1) for i in range(orders)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(create, items))
+    return orders / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--profile", default="production")
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"])
+    parser.add_argument("--max-batch", type=int, default=100)
+    parser.add_argument("--max-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        engine, SessionLocal = make_session_factory(
+            os.path.join(workdir, "single.db"), args.profile, args.synchronous, args.threads
+        )
+
+        def create_single(order):
+            with SessionLocal() as db:
+                return crud.create_order(db, order)
+
+        single = run(create_single, args.threads, args.orders)
+        engine.dispose()
+
+        engine, SessionLocal = make_session_factory(
+            os.path.join(workdir, "group.db"), args.profile, args.synchronous, args.threads
+        )
+        writer = GroupCommitWriter(SessionLocal, args.max_batch, args.max_latency_ms / 1000)
+        writer.start()
+        grouped = run(writer.create_order, args.threads, args.orders)
+        writer.stop()
+        engine.dispose()
+
+    print(f"потоков {args.threads}, synchronous={args.synchronous}")
+    print(f"commit на заказ    {single:>10.0f} заказов/с")
+    print(f"групповая фиксация {grouped:>10.0f} заказов/с ({grouped / single:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Бенчмарк сериализации страницы списка заказов: ORM-объекты через
+response_model (как было) против строк select(...) в байты через orjson.
+
+Запуск:
+    python -m benchmarks.bench_list_serialization --page 100 --rounds 500
+"""
+import argparse
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.api.responses import json_rows_response
+from src.database.crud import ORDER_COLUMNS
+from src.models.orm_models import Base, Order
+from src.models.pydantic_models import OrderResponse
+
+
+def seed(engine, page):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (id, username, email, age) VALUES (1, 'bench', 'bench@example.com', 30)")
+        conn.exec_driver_sql(
+            "INSERT INTO orders (user_id, product_name, quantity) VALUES (?, ?, ?)",
+            [(1, f"Product {i}", i % 10 + 1) for i in range(page)],
+        )
+
+
+def orm_path(session, page, adapter):
+    orders = session.scalars(select(Order).order_by(Order.id).limit(page)).all()
+    return adapter.dump_json(adapter.validate_python(orders, from_attributes=True))
+
+
+def rows_path(session, page, adapter):
+    rows = session.execute(select(*ORDER_COLUMNS).order_by(Order.id).limit(page)).all()
+    return json_rows_response(rows, OrderResponse).body
+
+
+def measure(session, func, page, rounds):
+    adapter = TypeAdapter(List[OrderResponse])
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(session, page, adapter)
+        # Как и в обработчике: каждая страница грузится в свежую сессию
+        session.expunge_all()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    seed(engine, args.page)
+
+    with Session(engine) as session:
+        assert orm_path(session, args.page, TypeAdapter(List[OrderResponse])) == \
+            rows_path(session, args.page, None)
+        before = measure(session, orm_path, args.page, args.rounds)
+        after = measure(session, rows_path, args.page, args.rounds)
+
+    print(f"страница {args.page} строк, {args.rounds} повторов")
+    print(f"ORM + response_model: {before:.3f} мс")
+    print(f"строки + orjson:      {after:.3f} мс  (x{before / after:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Накладные расходы метрик (MetricsMiddleware, TimedRoute и события диалекта движка).
+
+Одновременно поднимаются два процесса uvicorn на одинаковых временных
+базах — с METRICS_ENABLED=1 и METRICS_ENABLED=0 — и получают одинаковую
+последовательность запросов GET /users/{id}/orders и GET /orders,
+поочерёдно: каждый запрос обоим серверам, первым — то одному, то другому. Так
+фоновая нагрузка машины и смена частоты процессора приходятся на оба
+варианта поровну. Сравнивается процессорное время сервера на запрос
+(utime+stime из /proc), поэтому время клиента и сети в результат не
+попадает. С METRICS_ENABLED=0 нет ни middleware, ни слушателей движка,
+ни обёртки TimedRoute, то есть это честная база сравнения. Итог — медиана
+накладных расходов по раундам; бюджет — OVERHEAD_BUDGET_PERCENT.
+
+Запуск:
+    python -m benchmarks.bench_metrics_overhead --requests 5000 --rounds 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks.bench_async_load import free_port, seed, start_server
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+# Допустимые накладные расходы метрик по CPU сервера на запрос
+OVERHEAD_BUDGET_PERCENT = 2.0
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def start(metrics_enabled, workdir, args):
+    os.environ["METRICS_ENABLED"] = "1" if metrics_enabled else "0"
+    seed(workdir, args.users)
+    port = free_port()
+    return start_server(workdir, port, use_async=False), f"http://127.0.0.1:{port}"
+
+
+def measure(args):
+    """CPU сервера на запрос: (без метрик, с метриками) за один раунд."""
+    with tempfile.TemporaryDirectory() as plain_dir, tempfile.TemporaryDirectory() as instrumented_dir:
+        servers = [start(False, plain_dir, args), start(True, instrumented_dir, args)]
+        clients = [httpx.Client(base_url=base_url) for _, base_url in servers]
+        try:
+            paths = [f"/users/{i % args.users + 1}/orders" if i % 2 else "/orders?limit=20"
+                     for i in range(args.requests)]
+            for path in paths[:500]:
+                for client in clients:
+                    client.get(path)
+            started = [cpu_seconds(process.pid) for process, _ in servers]
+            for index, path in enumerate(paths):
+                # Первым запрос получает то один, то другой сервер
+                for client in (clients if index % 2 else clients[::-1]):
+                    assert client.get(path).status_code == 200
+            return tuple(
+                (cpu_seconds(process.pid) - before) / args.requests
+                for (process, _), before in zip(servers, started)
+            )
+        finally:
+            for client in clients:
+                client.close()
+            for process, _ in servers:
+                process.terminate()
+                process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+
+    overheads = []
+    for round_number in range(1, args.rounds + 1):
+        plain, instrumented = measure(args)
+        overheads.append((instrumented / plain - 1) * 100)
+        print(f"раунд {round_number}: без метрик {plain * 1e6:.1f} мкс, "
+              f"с метриками {instrumented * 1e6:.1f} мкс CPU сервера на запрос ({overheads[-1]:+.2f}%)")
+
+    overhead = statistics.median(overheads)
+    print(f"накладные расходы (медиана): {overhead:+.2f}% (бюджет {OVERHEAD_BUDGET_PERCENT:g}%)")
+    return 1 if overhead > OVERHEAD_BUDGET_PERCENT else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
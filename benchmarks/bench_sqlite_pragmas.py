@@ -0,0 +1,112 @@
+"""
+Пропускная способность SQLite под смешанной конкурентной нагрузкой
+для профилей PRAGMA (src.database.db.SQLITE_PRAGMA_PROFILES).
+
+Читатели выбирают заказы пользователя, писатели вставляют заказы
+с коммитом на каждую вставку — как POST /orders.
+
+Запуск:
+    python -m benchmarks.bench_sqlite_pragmas --readers 8 --writers 2 --duration 5
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src.database.db import SQLITE_PRAGMA_PROFILES, apply_sqlite_pragmas
+from src.models.orm_models import Base
+
+USERS = 1000
+
+USER_ORDERS_SQL = text("SELECT id, product_name, quantity FROM orders WHERE user_id = :user_id ORDER BY id")
+INSERT_ORDER_SQL = text("INSERT INTO orders (user_id, product_name, quantity) VALUES (:user_id, 'Product', 1)")
+
+
+def prepare(path, profile):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=32,
+    )
+    apply_sqlite_pragmas(engine, profile)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, email, age) VALUES (?, ?, ?, ?)",
+            [(i, f"user_{i}", f"user_{i}@example.com", 30) for i in range(1, USERS + 1)],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO orders (user_id, product_name, quantity) VALUES (?, 'Product', 1)",
+            [(i % USERS + 1,) for i in range(USERS * 20)],
+        )
+    return engine
+
+
+def run_profile(profile, args):
+    counters = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = prepare(os.path.join(tmp, "bench.db"), profile)
+        deadline = time.perf_counter() + args.duration
+
+        def reader(seed):
+            rnd = random.Random(seed)
+            done = 0
+            with engine.connect() as conn:
+                while time.perf_counter() < deadline:
+                    conn.execute(USER_ORDERS_SQL, {"user_id": rnd.randint(1, USERS)}).fetchall()
+                    conn.rollback()
+                    done += 1
+            with lock:
+                counters["reads"] += done
+
+        def writer(seed):
+            rnd = random.Random(seed)
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(INSERT_ORDER_SQL, {"user_id": rnd.randint(1, USERS)})
+                    done += 1
+                except OperationalError:
+                    errors += 1
+            with lock:
+                counters["writes"] += done
+                counters["errors"] += errors
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {name: value / args.duration for name, value in counters.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PRAGMA_PROFILES))
+    args = parser.parse_args()
+
+    print(f"читателей: {args.readers}, писателей: {args.writers}, длительность: {args.duration} с")
+    for profile in args.profiles:
+        result = run_profile(profile, args)
+        print(
+            f"{profile:>12}: чтений {result['reads']:>9.0f}/с, "
+            f"записей {result['writes']:>7.0f}/с, ошибок {result['errors']:>5.1f}/с"
+        )
+
+
+if __name__ == "__main__":
+    main()
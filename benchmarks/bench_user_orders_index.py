@@ -0,0 +1,82 @@
+"""
+Бенчмарк выборки заказов пользователя (get_user_orders) до и после индекса
+orders(user_id, id).
+
+Запуск:
+    python -m benchmarks.bench_user_orders_index --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from src.models.orm_models import Base
+
+USERS_PER_ORDERS = 20
+LOOKUPS = 200
+
+USER_ORDERS_SQL = text(
+    "SELECT id, user_id, product_name, quantity FROM orders "
+    "WHERE user_id = :user_id ORDER BY id"
+)
+
+
+def seed(engine, orders_count):
+    users_count = max(1, orders_count // USERS_PER_ORDERS)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO users (id, username, email, age) VALUES (?, ?, ?, ?)",
+            [(i, f"user_{i}", f"user_{i}@example.com", 30) for i in range(1, users_count + 1)],
+        )
+        rnd = random.Random(42)
+        conn.exec_driver_sql(
+            "INSERT INTO orders (user_id, product_name, quantity) VALUES (?, ?, ?)",
+            [(rnd.randint(1, users_count), f"Product {i % 1000}", 1) for i in range(orders_count)],
+        )
+    return users_count
+
+
+def measure(engine, users_count):
+    rnd = random.Random(7)
+    user_ids = [rnd.randint(1, users_count) for _ in range(LOOKUPS)]
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        for user_id in user_ids:
+            conn.execute(USER_ORDERS_SQL, {"user_id": user_id}).fetchall()
+        elapsed = time.perf_counter() - started
+    return elapsed / LOOKUPS * 1000
+
+
+def run(orders_count):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_orders_user_id_id")
+        users_count = seed(engine, orders_count)
+
+        before = measure(engine, users_count)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE INDEX ix_orders_user_id_id ON orders (user_id, id)")
+            conn.exec_driver_sql("ANALYZE")
+        after = measure(engine, users_count)
+        engine.dispose()
+    return before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'orders':>10} {'без индекса, мс':>16} {'с индексом, мс':>15} {'ускорение':>10}")
+    for size in args.sizes:
+        before, after = run(size)
+        print(f"{size:>10} {before:>16.3f} {after:>15.3f} {before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
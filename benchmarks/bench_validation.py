@@ -0,0 +1,119 @@
+"""
+Бенчмарк валидации UserCreate/OrderCreate: валидаций в секунду.
+
+Сравниваются:
+  legacy — прежние модели: валидаторы @validator в стиле pydantic v1
+           и re.match со строкой шаблона на каждый вызов;
+  models — текущие модели (field_validator, скомпилированный шаблон),
+           model_validate на каждый элемент;
+  batch  — текущие модели через validate_batch (TypeAdapter списка),
+           как в пакетных эндпоинтах.
+
+Запуск:
+    python -m benchmarks.bench_validation --items 10000 --rounds 5
+"""
+import argparse
+import re
+import time
+import warnings
+from typing import Any, Callable, Dict, List
+
+from pydantic import BaseModel, EmailStr
+
+from src.models.pydantic_models import OrderCreate, UserCreate, validate_batch
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from pydantic import validator
+
+    class LegacyUserCreate(BaseModel):
+        username: str
+        email: EmailStr
+        age: int
+
+        @validator('username')
+        def username_validator(cls, v):
+            if len(v) < 3:
+                raise ValueError('Имя пользователя должно содержать минимум 3 символа')
+            if not re.match(r'^[a-zA-Z0-9_]+$', v):
+                raise ValueError('Имя пользователя может содержать только буквы, цифры и нижнее подчеркивание')
+            return v
+
+        @validator('age')
+        def age_validator(cls, v):
+            if v <= 0 or v >= 100:
+                raise ValueError('Возраст должен быть больше 0 и меньше 100')
+            return v
+
+    class LegacyOrderCreate(BaseModel):
+        user_id: int
+        product_name: str
+        quantity: int
+
+        @validator('quantity')
+        def quantity_validator(cls, v):
+            if v <= 0:
+                raise ValueError('Количество должно быть больше 0')
+            return v
+
+
+def user_items(count: int) -> List[Dict[str, Any]]:
+    return [{"username": f"user_{i}", "email": f"user_{i}@example.com", "age": 18 + i % 60} for i in range(count)]
+
+
+def order_items(count: int) -> List[Dict[str, Any]]:
+    return [{"user_id": i % 1000 + 1, "product_name": f"Product {i % 500}", "quantity": i % 10 + 1}
+            for i in range(count)]
+
+
+def per_item(model):
+    def run(items):
+        for item in items:
+            try:
+                model.model_validate(item)
+            except ValueError:
+                pass
+    return run
+
+
+def batch(model):
+    return lambda items: validate_batch(model, items)
+
+
+def measure(func: Callable[[List[Dict[str, Any]]], Any], items: List[Dict[str, Any]], rounds: int) -> float:
+    """Лучшее из rounds значение валидаций в секунду."""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func(items)
+        best = min(best, time.perf_counter() - started)
+    return len(items) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--invalid-share", type=float, default=0.0,
+                        help="доля элементов с ошибкой (короткое имя / нулевое количество)")
+    args = parser.parse_args()
+
+    users = user_items(args.items)
+    orders = order_items(args.items)
+    for i in range(int(args.items * args.invalid_share)):
+        users[i]["username"] = "x"
+        orders[i]["quantity"] = 0
+
+    for name, items, legacy, current in (
+        ("UserCreate", users, LegacyUserCreate, UserCreate),
+        ("OrderCreate", orders, LegacyOrderCreate, OrderCreate),
+    ):
+        before = measure(per_item(legacy), items, args.rounds)
+        after = measure(per_item(current), items, args.rounds)
+        batched = measure(batch(current), items, args.rounds)
+        print(f"{name:<12} legacy {before:>10.0f}/с   models {after:>10.0f}/с ({after / before:.2f}x)   "
+              f"batch {batched:>10.0f}/с ({batched / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Масштабирование пропускной способности по числу воркеров python -m src.serve.
+
+Для каждого числа воркеров поднимается сервер на копии заполненной базы,
+и несколько процессов-клиентов (один процесс httpx упирается в своё ядро
+раньше сервера) в течение --duration секунд читают GET /users/{id} и
+GET /users/{id}/orders. Эффективность — rps(N) / (N * rps(1)); при
+линейном масштабировании она близка к 1, пока воркерам и клиентам
+хватает ядер.
+
+Запуск:
+    python -m benchmarks.bench_worker_scaling --workers 1 2 4 8 --clients 4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+from benchmarks.bench_async_load import free_port, load
+from benchmarks.run import start_serve
+from benchmarks.seed import SCALES, default_db_path, seed
+
+
+def _client(base_url: str, concurrency: int, duration: float, users: int) -> Tuple[float, int]:
+    return asyncio.run(load(base_url, concurrency, duration, users))
+
+
+def measure(workdir: str, workers: int, users: int, args) -> Tuple[float, int]:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    port = free_port()
+    process = start_serve(workdir, port, workers, env=env)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        with ProcessPoolExecutor(args.clients) as pool:
+            futures = [
+                pool.submit(_client, base_url, args.concurrency, args.duration, users)
+                for _ in range(args.clients)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        process.terminate()
+        process.wait()
+    return sum(rps for rps, _ in results), sum(errors for _, errors in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="процессов-клиентов")
+    parser.add_argument("--concurrency", type=int, default=50, help="соединений на процесс-клиент")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    args = parser.parse_args()
+
+    source_db = default_db_path(args.scale)
+    users, _ = seed(source_db, args.scale, verbose=True)
+    print(f"CPU: {os.cpu_count()}, клиентов: {args.clients} x {args.concurrency}, длительность: {args.duration} с")
+
+    baseline = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as workdir:
+            shutil.copyfile(source_db, os.path.join(workdir, "bench.db"))
+            rps, errors = measure(workdir, workers, users, args)
+        baseline = baseline or rps / workers
+        print(f"воркеров {workers:>3}: {rps:>9.1f} req/s, эффективность {rps / (workers * baseline):.2f}, ошибок: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Сравнение результатов benchmarks.run с сохранённым эталоном.
+
+Регрессией считается рост p95 или p99 либо падение пропускной
+способности больше чем на --threshold процентов, а также появление
+ошибок там, где в эталоне их не было. Сценарии, которых нет в одном из
+файлов, перечисляются, но регрессией не считаются. Код возврата 1,
+если найдена хотя бы одна регрессия, — команду можно ставить в CI.
+
+Запуск:
+    python -m benchmarks.compare benchmarks/baseline.json results.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, NamedTuple
+
+# Метрика -> True, если рост значения означает ухудшение
+COMPARED_METRICS = {
+    "p95_ms": True,
+    "p99_ms": True,
+    "rps": False,
+}
+
+
+class Regression(NamedTuple):
+    scenario: str
+    metric: str
+    baseline: float
+    current: float
+    change_pct: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.scenario}: {self.metric} {self.baseline:g} -> {self.current:g} "
+            f"({self.change_pct:+.1f}%)"
+        )
+
+
+def _change_pct(baseline: float, current: float) -> float:
+    if baseline == 0:
+        return 0.0 if current == 0 else float("inf")
+    return (current - baseline) / baseline * 100
+
+
+def find_regressions(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Regression]:
+    """Регрессии current относительно baseline; threshold — допуск в процентах."""
+    regressions = []
+    for name, base in baseline["scenarios"].items():
+        result = current["scenarios"].get(name)
+        if result is None:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            change = _change_pct(base[metric], result[metric])
+            worse = change if higher_is_worse else -change
+            if worse > threshold:
+                regressions.append(Regression(name, metric, base[metric], result[metric], change))
+        if result["errors"] and not base["errors"]:
+            regressions.append(Regression(name, "errors", 0, result["errors"], float("inf")))
+    return regressions
+
+
+def _mismatched_meta(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    keys = ("mode", "scale", "concurrency", "use_async_db", "workers")
+    return [
+        f"{key}: {baseline['meta'].get(key)} / {current['meta'].get(key)}"
+        for key in keys
+        if baseline["meta"].get(key) != current["meta"].get(key)
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="эталонные результаты (JSON)")
+    parser.add_argument("current", help="новые результаты (JSON)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="допуск в процентах")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    for mismatch in _mismatched_meta(baseline, current):
+        print(f"Внимание: условия прогонов различаются — {mismatch}")
+    for name in sorted(baseline["scenarios"].keys() ^ current["scenarios"].keys()):
+        where = "эталоне" if name in baseline["scenarios"] else "новом прогоне"
+        print(f"Сценарий {name} есть только в {where}")
+
+    regressions = find_regressions(baseline, current, args.threshold)
+    for regression in regressions:
+        print(f"Регрессия: {regression}")
+    if not regressions:
+        print(f"Регрессий нет (допуск {args.threshold:g}%)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
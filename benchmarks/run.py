@@ -0,0 +1,246 @@
+"""
+Нагрузочный прогон всех эндпоинтов API с сохранением результатов в JSON.
+
+База заполняется в заданном масштабе (benchmarks.seed) и копируется во
+временный каталог, чтобы пишущие сценарии не меняли эталонную базу и
+повторные прогоны шли на одинаковых данных. Каждый сценарий выполняется
+отдельно: concurrency клиентов делят между собой --requests запросов.
+
+Режимы:
+    asgi   — приложение в этом же процессе, httpx.ASGITransport без сети;
+             меряет сам обработчик, сериализацию и работу с БД
+    socket — сервер python -m src.serve с --workers воркерами, запросы
+             по TCP; добавляет HTTP-парсер, event loop сервера и
+             конкуренцию клиентов
+
+Для каждого сценария в JSON пишутся p50/p95/p99, среднее, пропускная
+способность (запросов в секунду) и число ошибок. Сравнение с эталоном:
+python -m benchmarks.compare.
+
+Запуск:
+    python -m benchmarks.run --scale 10k --mode asgi --output results.json
+    python -m benchmarks.run --scale 1m --mode socket --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks.bench_async_load import free_port
+from benchmarks.scenarios import Context, Scenario, select_scenarios
+from benchmarks.seed import SCALES, default_db_path, seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_FORMAT_VERSION = 1
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Процентиль q (0..100) по отсортированной выборке, линейная интерполяция."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """Сводка по сценарию; задержки в миллисекундах, пропускная способность — успешные запросы в секунду."""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "rps": round(len(values) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, ctx: Context,
+                       requests: int, concurrency: int, seed_value: int = 0) -> Dict[str, float]:
+    """
+    Выполняет requests запросов сценария силами concurrency клиентов.
+    Успешным считается ответ 2xx или 304 (условный GET); задержки
+    учитываются только для успешных.
+    """
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker(worker_id: int):
+        nonlocal errors, remaining
+        rnd = random.Random(seed_value * 100_003 + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = scenario.build(ctx, rnd)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if response.is_success or response.status_code == 304:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(min(concurrency, requests))))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_scenarios(client: httpx.AsyncClient, scenarios: List[Scenario], ctx: Context,
+                        requests: int, concurrency: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for index, scenario in enumerate(scenarios):
+        if warmup:
+            await run_scenario(client, scenario, ctx, warmup, concurrency, seed_value=-index - 1)
+        results[scenario.name] = await run_scenario(client, scenario, ctx, requests, concurrency, seed_value=index)
+        print(_format_line(scenario.name, results[scenario.name]), flush=True)
+    return results
+
+
+async def _run_asgi(db_path: str, scenarios: List[Scenario], ctx: Context, args) -> Dict[str, Dict[str, float]]:
+    # Настройки и engine создаются при импорте src.main, поэтому адрес базы
+    # задаётся в окружении до импорта
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from src.main import app
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=60) as client:
+            return await run_scenarios(client, scenarios, ctx, args.requests, args.concurrency, args.warmup)
+
+
+def start_serve(workdir: str, port: int, workers: int, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Запускает production-сервер (python -m src.serve) и ждёт готовности."""
+    env = dict(os.environ if env is None else env, PYTHONPATH=ROOT)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--backlog", "4096", "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("сервер завершился при запуске")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("сервер не запустился")
+
+
+def _run_socket(workdir: str, db_path: str, scenarios: List[Scenario], ctx: Context,
+                args) -> Dict[str, Dict[str, float]]:
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    port = free_port()
+    process = start_serve(workdir, port, args.workers)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+        async def drive():
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                return await run_scenarios(client, scenarios, ctx, args.requests, args.concurrency, args.warmup)
+
+        return asyncio.run(drive())
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_line(name: str, result: Dict[str, float]) -> str:
+    return (
+        f"{name:<26} p50 {result['p50_ms']:>8.2f} мс  p95 {result['p95_ms']:>8.2f} мс  "
+        f"p99 {result['p99_ms']:>8.2f} мс  {result['rps']:>9.1f} req/s  ошибок: {result['errors']}"
+    )
+
+
+def run(args) -> Dict[str, Any]:
+    scenarios = select_scenarios(args.scenario or [], include_writes=not args.read_only)
+    source_db = args.db or default_db_path(args.scale)
+    users, orders = seed(source_db, args.scale, verbose=True)
+    ctx = Context(users, orders)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "bench.db")
+        shutil.copyfile(source_db, db_path)
+        print(f"режим: {args.mode}, масштаб: {args.scale}, клиентов: {args.concurrency}, "
+              f"запросов на сценарий: {args.requests}")
+        if args.mode == "asgi":
+            scenario_results = asyncio.run(_run_asgi(db_path, scenarios, ctx, args))
+        else:
+            scenario_results = _run_socket(workdir, db_path, scenarios, ctx, args)
+
+    return {
+        "format": RESULTS_FORMAT_VERSION,
+        "meta": {
+            "mode": args.mode,
+            "scale": args.scale,
+            "users": users,
+            "orders": orders,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "use_async_db": args.use_async,
+            "workers": args.workers if args.mode == "socket" else None,
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "scenarios": scenario_results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--db", help="заполненная база (по умолчанию benchmarks/data/seed-<scale>.db)")
+    parser.add_argument("--mode", choices=["asgi", "socket"], default="asgi")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="запросов на сценарий")
+    parser.add_argument("--warmup", type=int, default=100, help="неучитываемых запросов перед сценарием")
+    parser.add_argument("--scenario", action="append", help="прогнать только этот сценарий (можно повторять)")
+    parser.add_argument("--read-only", action="store_true", help="пропустить сценарии с POST")
+    parser.add_argument("--use-async", action="store_true", help="асинхронный стек (USE_ASYNC_DB=1)")
+    parser.add_argument("--workers", type=int, default=1, help="воркеров сервера в режиме socket")
+    parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    if args.use_async:
+        os.environ["USE_ASYNC_DB"] = "1"
+    results = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Сценарии нагрузочного прогона: по одному на каждый эндпоинт API.
+
+Сценарий по генератору случайных чисел строит очередной запрос
+(метод, путь, параметры httpx). Идентификаторы берутся в пределах
+заполненной базы, имена создаваемых пользователей уникальны в прогоне.
+"""
+import itertools
+import json
+import uuid
+from random import Random
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from src.api.bulk import NDJSON_MEDIA_TYPE
+
+# (метод, путь, именованные аргументы httpx.AsyncClient.request)
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+class Context:
+    """Размер заполненной базы и счётчик для уникальных имён."""
+
+    def __init__(self, users: int, orders: int):
+        self.users = users
+        self.orders = orders
+        self.run_token = uuid.uuid4().hex[:8]
+        self._counter = itertools.count()
+
+    def user_id(self, rnd: Random) -> int:
+        return rnd.randint(1, self.users)
+
+    def order_id(self, rnd: Random) -> int:
+        return rnd.randint(1, self.orders)
+
+    def unique_name(self) -> str:
+        return f"bench_{self.run_token}_{next(self._counter)}"
+
+
+class Scenario(NamedTuple):
+    name: str
+    build: Callable[[Context, Random], Request]
+    # Сценарий меняет данные (POST)
+    write: bool = False
+
+
+def _new_user(ctx: Context) -> Dict[str, Any]:
+    name = ctx.unique_name()
+    return {"username": name, "email": f"{name}@example.com", "age": 30}
+
+
+def _new_order(ctx: Context, rnd: Random) -> Dict[str, Any]:
+    return {"user_id": ctx.user_id(rnd), "product_name": f"Product {rnd.randrange(500)}", "quantity": rnd.randint(1, 10)}
+
+
+def _ids(rnd: Random, pick: Callable[[Random], int], count: int) -> str:
+    return ",".join(str(pick(rnd)) for _ in range(count))
+
+
+def _window(rnd: Random, total: int, size: int) -> Tuple[int, int]:
+    """Диапазон [min_id, max_id] из size идентификаторов внутри 1..total."""
+    start = rnd.randint(1, max(1, total - size + 1))
+    return start, start + size - 1
+
+
+def _users_export(ctx: Context, rnd: Random) -> Request:
+    min_id, max_id = _window(rnd, ctx.users, 1000)
+    return "GET", "/users/export", {"params": {"min_id": min_id, "max_id": max_id}}
+
+
+def _orders_export(ctx: Context, rnd: Random) -> Request:
+    min_id, max_id = _window(rnd, ctx.orders, 1000)
+    return "GET", "/orders/export", {"params": {"min_id": min_id, "max_id": max_id, "format": "csv"}}
+
+
+def _users_bulk(ctx: Context, rnd: Random) -> Request:
+    body = "\n".join(json.dumps(_new_user(ctx)) for _ in range(100))
+    return "POST", "/users/bulk", {"content": body, "headers": {"Content-Type": NDJSON_MEDIA_TYPE}}
+
+
+def _orders_bulk(ctx: Context, rnd: Random) -> Request:
+    return "POST", "/orders/bulk", {"json": [_new_order(ctx, rnd) for _ in range(100)]}
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("root", lambda ctx, rnd: ("GET", "/", {})),
+    Scenario("user_get", lambda ctx, rnd: ("GET", f"/users/{ctx.user_id(rnd)}", {})),
+    Scenario("user_get_include_orders",
+             lambda ctx, rnd: ("GET", f"/users/{ctx.user_id(rnd)}", {"params": {"include": "orders"}})),
+    Scenario("users_list", lambda ctx, rnd: ("GET", "/users", {"params": {"limit": 100}})),
+    Scenario("users_lookup", lambda ctx, rnd: ("GET", "/users", {"params": {"ids": _ids(rnd, ctx.user_id, 50)}})),
+    Scenario("user_orders", lambda ctx, rnd: ("GET", f"/users/{ctx.user_id(rnd)}/orders", {})),
+    # Опрос без изменений: If-None-Match: * совпадает с любой записью, ответ 304
+    Scenario("user_orders_not_modified",
+             lambda ctx, rnd: ("GET", f"/users/{ctx.user_id(rnd)}/orders", {"headers": {"If-None-Match": "*"}})),
+    Scenario("user_stats", lambda ctx, rnd: ("GET", f"/users/{ctx.user_id(rnd)}/stats", {})),
+    Scenario("users_export", _users_export),
+    Scenario("order_get", lambda ctx, rnd: ("GET", f"/orders/{ctx.order_id(rnd)}", {})),
+    Scenario("order_get_include_user",
+             lambda ctx, rnd: ("GET", f"/orders/{ctx.order_id(rnd)}", {"params": {"include": "user"}})),
+    Scenario("orders_list", lambda ctx, rnd: ("GET", "/orders", {"params": {"limit": 100}})),
+    Scenario("orders_lookup",
+             lambda ctx, rnd: ("GET", "/orders", {"params": {"ids": _ids(rnd, ctx.order_id, 50)}})),
+    Scenario("orders_search_user",
+             lambda ctx, rnd: ("GET", "/orders/search",
+                               {"params": {"user_id": ctx.user_id(rnd), "min_quantity": 2, "sort": "-id"}})),
+    Scenario("orders_search_product",
+             lambda ctx, rnd: ("GET", "/orders/search",
+                               {"params": {"product_prefix": f"Product {rnd.randrange(500)}", "limit": 50}})),
+    Scenario("orders_search_text",
+             lambda ctx, rnd: ("GET", "/orders/search", {"params": {"q": str(rnd.randrange(500)), "limit": 50}})),
+    Scenario("orders_stats", lambda ctx, rnd: ("GET", "/orders/stats", {"params": {"limit": 100}})),
+    Scenario("orders_export", _orders_export),
+    Scenario("cache_stats", lambda ctx, rnd: ("GET", "/cache/stats", {})),
+    Scenario("metrics", lambda ctx, rnd: ("GET", "/metrics", {})),
+    Scenario("user_create", lambda ctx, rnd: ("POST", "/users", {"json": _new_user(ctx)}), write=True),
+    Scenario("users_bulk", _users_bulk, write=True),
+    Scenario("order_create", lambda ctx, rnd: ("POST", "/orders", {"json": _new_order(ctx, rnd)}), write=True),
+    Scenario("orders_bulk", _orders_bulk, write=True),
+]
+
+
+def select_scenarios(names: List[str], include_writes: bool = True) -> List[Scenario]:
+    """Сценарии по именам (пустой список — все); неизвестное имя — ValueError."""
+    by_name = {scenario.name: scenario for scenario in SCENARIOS}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Неизвестные сценарии: {', '.join(unknown)}")
+    selected = [by_name[name] for name in names] if names else SCENARIOS
+    return [scenario for scenario in selected if include_writes or not scenario.write]
@@ -0,0 +1,127 @@
+"""
+Заполнение базы SQLite для бенчмарков: пользователи и заказы в заданном
+масштабе. Строки вставляются пачками через executemany без ORM, сводные
+таблицы заказов пересчитываются в конце.
+
+Готовая база переиспользуется: повторный запуск с тем же масштабом
+ничего не вставляет, если файл уже заполнен.
+
+Запуск:
+    python -m benchmarks.seed --scale 1m --db benchmarks/data/seed-1m.db
+"""
+import argparse
+import os
+import random
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from src.database.migrate import upgrade
+from src.database.summary import rebuild_summary
+
+# Масштаб -> число заказов; пользователей в ORDERS_PER_USER раз меньше
+SCALES: Dict[str, int] = {
+    "tiny": 1_000,
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+ORDERS_PER_USER = 10
+PRODUCTS = 500
+SEED_CHUNK = 50_000
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def scale_sizes(scale: str) -> Tuple[int, int]:
+    """(пользователей, заказов) для именованного масштаба."""
+    if scale not in SCALES:
+        raise ValueError(f"Неизвестный масштаб {scale}; доступны: {', '.join(SCALES)}")
+    orders = SCALES[scale]
+    return max(1, orders // ORDERS_PER_USER), orders
+
+
+def default_db_path(scale: str) -> str:
+    return os.path.join(DATA_DIR, f"seed-{scale}.db")
+
+
+def _user_rows(count: int) -> Iterator[Tuple]:
+    for user_id in range(1, count + 1):
+        yield user_id, f"user_{user_id}", f"user_{user_id}@example.com", 18 + user_id % 60
+
+
+def _order_rows(count: int, users: int) -> Iterator[Tuple]:
+    rnd = random.Random(42)
+    for _ in range(count):
+        yield rnd.randint(1, users), f"Product {rnd.randrange(PRODUCTS)}", rnd.randint(1, 10)
+
+
+def _chunks(rows: Iterator[Tuple], size: int = SEED_CHUNK) -> Iterator[List[Tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _seeded_sizes(engine) -> Tuple[int, int]:
+    with engine.connect() as conn:
+        users = conn.exec_driver_sql("SELECT COUNT(*) FROM users").scalar()
+        orders = conn.exec_driver_sql("SELECT COUNT(*) FROM orders").scalar()
+    return users, orders
+
+
+def seed(db_path: str, scale: str, verbose: bool = False) -> Tuple[int, int]:
+    """
+    Создаёт и заполняет базу по пути db_path; возвращает (пользователей, заказов).
+    Уже заполненная до нужного масштаба база не трогается.
+    """
+    users, orders = scale_sizes(scale)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    engine = create_engine(f"sqlite:///{db_path}")
+    upgrade(engine)
+
+    if _seeded_sizes(engine) == (users, orders):
+        engine.dispose()
+        return users, orders
+    if _seeded_sizes(engine) != (0, 0):
+        engine.dispose()
+        raise RuntimeError(f"База {db_path} заполнена для другого масштаба; удалите её")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        # Журнал и fsync не нужны: при сбое базу проще заполнить заново
+        conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        for chunk in _chunks(_user_rows(users)):
+            conn.exec_driver_sql("INSERT INTO users (id, username, email, age) VALUES (?, ?, ?, ?)", chunk)
+        inserted = 0
+        for chunk in _chunks(_order_rows(orders, users)):
+            conn.exec_driver_sql("INSERT INTO orders (user_id, product_name, quantity) VALUES (?, ?, ?)", chunk)
+            inserted += len(chunk)
+            if verbose and inserted % 1_000_000 < SEED_CHUNK:
+                print(f"  заказов: {inserted:,}")
+    with Session(engine) as db:
+        rebuild_summary(db)
+    engine.dispose()
+
+    if verbose:
+        print(f"База {db_path}: {users:,} пользователей, {orders:,} заказов за {time.perf_counter() - started:.1f} с")
+    return users, orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--db", help="путь к файлу базы (по умолчанию benchmarks/data/seed-<scale>.db)")
+    args = parser.parse_args()
+    seed(args.db or default_db_path(args.scale), args.scale, verbose=True)
+
+
+if __name__ == "__main__":
+    main()
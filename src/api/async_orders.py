@@ -0,0 +1,184 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from src.models.pydantic_models import OrderCreate, OrderResponse, OrderWithUserResponse
+from src.models.orm_models import Order
+from src.config import get_settings
+from src.database.db import get_async_db
+from src.cache import Cache, get_cache, order_key
+from src.database.crud import (
+    ORDER_COLUMNS, by_ids_statements, insert_order_statement, order_version_statement, user_exists_statement
+)
+from src.database.group_commit import GroupCommitWriter, get_order_writer
+from src.database.summary import record_orders
+from src.api.pagination import resolve_after_id, set_next_cursor
+from src.api.lookup import lookup_response, parse_ids
+from src.api.embedding import (
+    OrderInclude, embedded_list_response, embedded_response, reject_include_with_ids, with_user
+)
+from src.api.responses import JSON_MEDIA_TYPE, json_row, json_rows_response
+from src.api.etags import ETAG_HEADER, etag, etag_matches, not_modified, pack_cached, unpack_cached, with_etag
+from src.api.idempotency import IDEMPOTENCY_KEY_HEADER, IDEMPOTENCY_KEY_MAX_LENGTH, create_order_once
+
+# Асинхронные версии обработчиков из src/api/orders.py (см. async_users.py)
+router = APIRouter(
+    prefix="/orders",
+    tags=["orders"],
+    include_in_schema=False,
+    responses={404: {"description": "Заказ не найден"}}
+)
+
+
+async def get_async_order_db(
+        request: Request,
+        writer: Optional[GroupCommitWriter] = Depends(get_order_writer)
+):
+    """
+    Асинхронная сессия для POST /orders, как orders.get_order_db: заказ без
+    Idempotency-Key при групповой фиксации пишет поток-писатель, поэтому
+    слот сессии на время ожидания пачки не занимается — зависимость отдаёт None.
+    """
+    if writer is not None and IDEMPOTENCY_KEY_HEADER not in request.headers:
+        yield None
+        return
+    async with asynccontextmanager(get_async_db)() as db:
+        yield db
+
+
+@router.post(
+    "",
+    response_model=OrderResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_order(
+        order: OrderCreate,
+        idempotency_key: Optional[str] = Header(
+            default=None, alias=IDEMPOTENCY_KEY_HEADER, min_length=1, max_length=IDEMPOTENCY_KEY_MAX_LENGTH
+        ),
+        db: Optional[AsyncSession] = Depends(get_async_order_db, scope="function"),
+        cache: Cache = Depends(get_cache),
+        writer: Optional[GroupCommitWriter] = Depends(get_order_writer)
+):
+    # Кеш общий с синхронным роутером: те же ключи, что в orders.create_order
+    if idempotency_key is not None:
+        return await db.run_sync(create_order_once, order, idempotency_key, get_settings().idempotency_ttl, cache)
+    if writer is not None:
+        result = await writer.create_order_async(order)
+        if result.status != "created":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        cache.delete(order_key(result.id))
+        return OrderResponse(id=result.id, **order.model_dump())
+    try:
+        row = (await db.execute(insert_order_statement(order))).one()
+        facts = [(row.user_id, row.product_name, row.quantity)]
+        await db.run_sync(lambda session: record_orders(session, facts))
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        if await db.scalar(user_exists_statement(order.user_id)) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        raise
+    cache.delete(order_key(row.id))
+    return row
+
+
+@router.get(
+    "/{order_id:int}",
+    response_model=OrderResponse
+)
+async def get_order(
+        order_id: int,
+        include: Optional[OrderInclude] = None,
+        if_none_match: Optional[str] = Header(default=None),
+        db: AsyncSession = Depends(get_async_db, scope="function"),
+        cache: Cache = Depends(get_cache)
+):
+    if include is OrderInclude.user:
+        versions = (await db.execute(order_version_statement(order_id))).first()
+        if versions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Заказ не найден"
+            )
+        tag = etag("o", order_id, versions.version, "u", versions.user_version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+        statement = with_user(select(Order).where(Order.id == order_id))
+        db_order = (await db.scalars(statement)).first()
+        return with_etag(embedded_response(db_order, OrderWithUserResponse), tag)
+
+    # Кеш общий с синхронным роутером: тот же ключ и формат, что в orders.get_order
+    key = order_key(order_id)
+    cached = unpack_cached(cache.get(key))
+    if cached is None and if_none_match is not None:
+        version = await db.scalar(select(Order.version).where(Order.id == order_id))
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Заказ не найден"
+            )
+        tag = etag("o", order_id, version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+    if cached is None:
+        row = (await db.execute(select(*ORDER_COLUMNS, Order.version).where(Order.id == order_id))).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Заказ не найден"
+            )
+        cached = etag("o", order_id, row.version), json_row(row, OrderResponse)
+        cache.set(key, pack_cached(*cached))
+    tag, body = cached
+    if etag_matches(if_none_match, tag):
+        return not_modified(tag)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers={ETAG_HEADER: tag})
+
+
+@router.get(
+    "",
+    response_model=List[OrderResponse]
+)
+async def get_all_orders(
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        ids: Optional[str] = None,
+        include: Optional[OrderInclude] = None,
+        db: AsyncSession = Depends(get_async_db, scope="function")
+):
+    if ids is not None:
+        reject_include_with_ids(include)
+        order_ids = parse_ids(ids)
+        found = {}
+        for statement in by_ids_statements(ORDER_COLUMNS, Order.id, order_ids):
+            found.update((row.id, row) for row in await db.execute(statement))
+        return lookup_response(order_ids, found, OrderResponse, "order")
+
+    query = select(Order) if include else select(*ORDER_COLUMNS)
+    query = query.order_by(Order.id)
+    start_id = resolve_after_id(after_id, cursor)
+    if start_id is not None:
+        query = query.where(Order.id > start_id)
+    else:
+        query = query.offset(skip)
+
+    if include is OrderInclude.user:
+        orders = (await db.scalars(with_user(query.limit(limit)))).all()
+        response = embedded_list_response(orders, OrderWithUserResponse)
+    else:
+        orders = (await db.execute(query.limit(limit))).all()
+        response = json_rows_response(orders, OrderResponse)
+    set_next_cursor(response, orders, limit)
+    return response
@@ -0,0 +1,181 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
+
+from src.models.pydantic_models import UserCreate, UserResponse, UserWithOrdersResponse, OrderResponse
+from src.models.orm_models import User
+from src.database.db import get_async_db
+from src.cache import Cache, get_cache, user_key
+from src.database.crud import (
+    USER_COLUMNS, by_ids_statements, insert_user_statement, orders_from_user_rows, user_orders_statement,
+    user_version_statement
+)
+from src.api.pagination import resolve_after_id, set_next_cursor
+from src.api.lookup import lookup_response, parse_ids
+from src.api.embedding import (
+    UserInclude, embedded_list_response, embedded_response, reject_include_with_ids, with_orders
+)
+from src.api.responses import JSON_MEDIA_TYPE, json_row, json_rows_response
+from src.api.etags import ETAG_HEADER, etag, etag_matches, not_modified, pack_cached, unpack_cached, with_etag
+
+# Асинхронные версии обработчиков из src/api/users.py.
+# Роутер подключается перед синхронным и скрыт из схемы OpenAPI:
+# пути и ответы совпадают, а всё, что здесь не обработано
+# (например, нечисловой user_id), уходит в синхронный роутер.
+router = APIRouter(
+    prefix="/users",
+    tags=["users"],
+    include_in_schema=False,
+    responses={404: {"description": "Пользователь не найден"}}
+)
+
+
+@router.post(
+    "",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_user(
+        user: UserCreate,
+        db: AsyncSession = Depends(get_async_db, scope="function"),
+        cache: Cache = Depends(get_cache)
+):
+
+    try:
+        row = (await db.execute(insert_user_statement(user))).one()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Пользователь с таким username или email уже существует"
+        )
+    # Кеш общий с синхронным роутером: те же ключи, что в users.create_user
+    cache.delete(user_key(row.id))
+    return row
+
+
+@router.get(
+    "/{user_id:int}",
+    response_model=UserResponse
+)
+async def get_user(
+        user_id: int,
+        include: Optional[UserInclude] = None,
+        if_none_match: Optional[str] = Header(default=None),
+        db: AsyncSession = Depends(get_async_db, scope="function"),
+        cache: Cache = Depends(get_cache)
+):
+
+    if include is UserInclude.orders:
+        versions = (await db.execute(user_version_statement(user_id))).first()
+        if versions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        tag = etag("u", user_id, versions.version, "o", versions.orders_version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+        statement = with_orders(select(User).where(User.id == user_id))
+        db_user = (await db.scalars(statement)).first()
+        return with_etag(embedded_response(db_user, UserWithOrdersResponse), tag)
+
+    # Кеш общий с синхронным роутером: тот же ключ и формат, что в users.get_user
+    key = user_key(user_id)
+    cached = unpack_cached(cache.get(key))
+    if cached is None and if_none_match is not None:
+        version = await db.scalar(select(User.version).where(User.id == user_id))
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        tag = etag("u", user_id, version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+    if cached is None:
+        row = (await db.execute(select(*USER_COLUMNS, User.version).where(User.id == user_id))).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        cached = etag("u", user_id, row.version), json_row(row, UserResponse)
+        cache.set(key, pack_cached(*cached))
+    tag, body = cached
+    if etag_matches(if_none_match, tag):
+        return not_modified(tag)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers={ETAG_HEADER: tag})
+
+
+@router.get(
+    "",
+    response_model=List[UserResponse]
+)
+async def get_all_users(
+        skip: int = 0,
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        ids: Optional[str] = None,
+        include: Optional[UserInclude] = None,
+        db: AsyncSession = Depends(get_async_db, scope="function")
+):
+
+    if ids is not None:
+        reject_include_with_ids(include)
+        user_ids = parse_ids(ids)
+        found = {}
+        for statement in by_ids_statements(USER_COLUMNS, User.id, user_ids):
+            found.update((row.id, row) for row in await db.execute(statement))
+        return lookup_response(user_ids, found, UserResponse, "user")
+
+    query = select(User) if include else select(*USER_COLUMNS)
+    query = query.order_by(User.id)
+    start_id = resolve_after_id(after_id, cursor)
+    if start_id is not None:
+        query = query.where(User.id > start_id)
+    else:
+        query = query.offset(skip)
+
+    if include is UserInclude.orders:
+        users = (await db.scalars(with_orders(query.limit(limit)))).all()
+        response = embedded_list_response(users, UserWithOrdersResponse)
+    else:
+        users = (await db.execute(query.limit(limit))).all()
+        response = json_rows_response(users, UserResponse)
+    set_next_cursor(response, users, limit)
+    return response
+
+
+@router.get(
+    "/{user_id:int}/orders",
+    response_model=List[OrderResponse]
+)
+async def get_user_orders(
+        user_id: int,
+        if_none_match: Optional[str] = Header(default=None),
+        db: AsyncSession = Depends(get_async_db, scope="function")
+):
+
+    if if_none_match is not None:
+        versions = (await db.execute(user_version_statement(user_id))).first()
+        if versions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        tag = etag("uo", user_id, versions.orders_version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+    rows = (await db.execute(user_orders_statement(user_id))).all()
+    orders = orders_from_user_rows(rows)
+    if orders is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден"
+        )
+    return with_etag(json_rows_response(orders, OrderResponse), etag("uo", user_id, rows[0].orders_version))
@@ -0,0 +1,93 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Tuple, Type
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel
+
+from src.models.pydantic_models import BulkCreateResponse, BulkItemResult, validate_batch
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Максимальное число элементов в одном пакетном запросе
+BULK_MAX_ITEMS = 50_000
+
+
+def bulk_openapi_extra(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Описание тела запроса для OpenAPI: JSON-массив или NDJSON-поток."""
+    schema = {"type": "array", "items": model.model_json_schema()}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": schema},
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "description": "Один JSON-объект на строку"}},
+            },
+        }
+    }
+
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[Any]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+async def _read_raw_items(request: Request) -> AsyncIterator[Any]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type == NDJSON_MEDIA_TYPE:
+        async for item in _iter_ndjson(request):
+            yield item
+        return
+
+    payload = json.loads(await request.body())
+    if not isinstance(payload, list):
+        raise _bad_request("Ожидается JSON-массив")
+    for item in payload:
+        yield item
+
+
+async def _enumerate(iterator: AsyncIterator[Any]) -> AsyncIterator[Tuple[int, Any]]:
+    index = 0
+    async for item in iterator:
+        yield index, item
+        index += 1
+
+
+async def read_bulk_items(request: Request, model: Type[BaseModel]) -> Tuple[Dict[int, BaseModel], Dict[int, BulkItemResult]]:
+    """
+    Читает тело пакетного запроса (JSON-массив или NDJSON) и валидирует
+    каждый элемент моделью model.
+
+    Возвращает валидные элементы и ошибки валидации, разложенные по индексу
+    элемента в запросе. Невалидный JSON отклоняет весь запрос целиком.
+    """
+    raw_items = []
+    try:
+        async for index, raw in _enumerate(_read_raw_items(request)):
+            if index >= BULK_MAX_ITEMS:
+                raise _bad_request(f"Не более {BULK_MAX_ITEMS} элементов в одном запросе")
+            raw_items.append(raw)
+    except ValueError:
+        raise _bad_request("Некорректный JSON в теле запроса")
+
+    items, errors = validate_batch(model, raw_items)
+    results = {
+        index: BulkItemResult(index=index, status="invalid", error="; ".join(err["msg"] for err in item_errors))
+        for index, item_errors in errors.items()
+    }
+    return items, results
+
+
+def bulk_response(items: List[BulkItemResult]) -> BulkCreateResponse:
+    created = sum(1 for item in items if item.status == "created")
+    return BulkCreateResponse(created=created, failed=len(items) - created, items=items)
@@ -0,0 +1,60 @@
+import time
+from enum import Enum
+from typing import Any, Optional, Sequence, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql import Select
+
+from src.api.responses import JSON_MEDIA_TYPE
+from src.metrics import record_serialization
+from src.models.orm_models import Order, User
+from src.models.pydantic_models import list_adapter
+
+
+class UserInclude(str, Enum):
+    orders = "orders"
+
+
+class OrderInclude(str, Enum):
+    user = "user"
+
+
+def reject_include_with_ids(include: Optional[Enum]) -> None:
+    """Пакетное чтение (?ids=) возвращает записи без вложенных связей."""
+    if include is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Параметр include нельзя использовать вместе с ids"
+        )
+
+
+def with_orders(statement: Select) -> Select:
+    """
+    Пользователи вместе с заказами: selectinload догружает заказы всей
+    страницы вторым запросом WHERE user_id IN (...), то есть ровно два
+    запроса вместо одного на каждого пользователя.
+    """
+    return statement.options(selectinload(User.orders))
+
+
+def with_user(statement: Select) -> Select:
+    """Заказы вместе с пользователем: JOIN в том же запросе (связь многие-к-одному)."""
+    return statement.options(joinedload(Order.user))
+
+
+def embedded_response(obj: Any, model: Type[BaseModel]) -> Response:
+    """Сериализует ORM-объект с уже загруженными связями по вложенной схеме model."""
+    started = time.perf_counter()
+    body = model.model_validate(obj).model_dump_json().encode()
+    record_serialization(time.perf_counter() - started)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE)
+
+
+def embedded_list_response(objects: Sequence[Any], model: Type[BaseModel]) -> Response:
+    adapter = list_adapter(model)
+    started = time.perf_counter()
+    body = adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+    record_serialization(time.perf_counter() - started)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,65 @@
+"""
+Условные GET: сильные ETag из версий строк и ответ 304 на If-None-Match.
+
+ETag строится только из id и версий (users.version, orders.version,
+users.orders_version), поэтому проверить If-None-Match можно одним
+поиском версии по первичному ключу — без чтения и сериализации строк.
+Порядок чтения везде один: сначала версия, потом данные. Если между
+ними запись успела изменить данные, ответ новее своего ETag, и клиент
+просто получит 200 при следующем запросе; 304 на изменённые данные
+невозможен.
+"""
+from typing import Optional, Tuple
+
+from fastapi import Response, status
+
+ETAG_HEADER = "ETag"
+
+
+def etag(*parts) -> str:
+    """Сильный ETag из частей: etag("u", 1, 3) -> '"u.1.3"'."""
+    return '"' + ".".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """
+    Совпадает ли ETag с заголовком If-None-Match. Для If-None-Match
+    действует слабое сравнение (RFC 9110), поэтому префикс W/ не мешает;
+    "*" совпадает с любой существующей записью.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+
+def not_modified(tag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={ETAG_HEADER: tag})
+
+
+def with_etag(response: Response, tag: str) -> Response:
+    response.headers[ETAG_HEADER] = tag
+    return response
+
+
+def pack_cached(tag: str, body: bytes) -> bytes:
+    """
+    Запись кеша ответов: ETag и тело вместе, чтобы попадание в кеш
+    отвечало и на условный запрос без обращения к базе.
+    """
+    return tag.encode("ascii") + b"\n" + body
+
+
+def unpack_cached(value: Optional[bytes]) -> Optional[Tuple[str, bytes]]:
+    """(ETag, тело) из записи кеша; записи старого формата (без ETag) — промах."""
+    if value is None or not value.startswith(b'"'):
+        return None
+    tag, _, body = value.partition(b"\n")
+    return tag.decode("ascii"), body
@@ -0,0 +1,104 @@
+import csv
+import io
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from src.api.bulk import NDJSON_MEDIA_TYPE
+from src.api.responses import dumps, model_fields
+
+CSV_MEDIA_TYPE = "text/csv"
+
+# Сколько строк драйвер отдаёт за раз и сколько строк уходит в один кусок ответа
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+_MEDIA_TYPES = {
+    ExportFormat.ndjson: NDJSON_MEDIA_TYPE,
+    ExportFormat.csv: CSV_MEDIA_TYPE,
+}
+
+
+def export_openapi_responses(model: Type[BaseModel]) -> Dict[int, Any]:
+    """Описание ответа для OpenAPI: поток NDJSON или CSV."""
+    return {
+        200: {
+            "description": "Поток записей",
+            "content": {
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "description": f"{model.__name__}, по объекту на строку"}},
+                CSV_MEDIA_TYPE: {"schema": {"type": "string", "description": "CSV с заголовком"}},
+            },
+        }
+    }
+
+
+def id_range(statement: Select, id_column, min_id: Optional[int], max_id: Optional[int]) -> Select:
+    """Фильтр по диапазону id включительно; границы необязательны."""
+    if min_id is not None:
+        statement = statement.where(id_column >= min_id)
+    if max_id is not None:
+        statement = statement.where(id_column <= max_id)
+    return statement
+
+
+def _ndjson_chunks(partitions, fields) -> Iterator[bytes]:
+    for rows in partitions:
+        yield b"".join(dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+
+def _csv_chunks(partitions, fields) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(fields)
+    for rows in partitions:
+        writer.writerows(row[:len(fields)] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_rows(db: Session, statement: Select, model: Type[BaseModel],
+                export_format: ExportFormat) -> Iterator[bytes]:
+    """Генератор кусков выгрузки: по одному куску на пачку из EXPORT_BATCH_SIZE строк."""
+    fields = model_fields(model)
+    # Одно выражение SELECT читается одним курсором: все строки относятся
+    # к одному снимку базы, сколько бы ни длилась выгрузка. yield_per
+    # включает потоковое чтение (серверный курсор там, где он есть),
+    # поэтому в памяти держится не больше одной пачки строк.
+    result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        partitions = result.partitions()
+        if export_format is ExportFormat.csv:
+            yield from _csv_chunks(partitions, fields)
+        else:
+            yield from _ndjson_chunks(partitions, fields)
+    finally:
+        result.close()
+
+
+def export_response(db: Session, statement: Select, model: Type[BaseModel],
+                    export_format: ExportFormat, filename: str) -> StreamingResponse:
+    """
+    Потоковая выгрузка результата statement в NDJSON или CSV.
+
+    Колонки statement должны идти в порядке полей model. Сессия должна
+    жить до конца отправки ответа, поэтому обработчики выгрузки берут
+    get_read_db с областью запроса, а не scope="function".
+    """
+    extension = "csv" if export_format is ExportFormat.csv else "ndjson"
+    return StreamingResponse(
+        stream_rows(db, statement, model, export_format),
+        media_type=_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
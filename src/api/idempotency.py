@@ -0,0 +1,84 @@
+import hashlib
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.api.responses import JSON_MEDIA_TYPE, json_row
+from src.cache import Cache, order_key
+from src.database import crud
+from src.database.idempotency import delete_key, find_key, is_expired, store_key
+from src.models.orm_models import IdempotencyKey
+from src.models.pydantic_models import OrderCreate, OrderResponse
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# Отмечает ответ, выданный из сохранённого, а не созданный заново
+REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def request_hash(order: OrderCreate) -> str:
+    payload = json.dumps(order.model_dump(), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def replay_response(stored: IdempotencyKey, expected_hash: str) -> Response:
+    if stored.request_hash != expected_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Ключ Idempotency-Key уже использован с другим телом запроса"
+        )
+    return Response(
+        content=stored.response_body,
+        status_code=stored.status_code,
+        media_type=JSON_MEDIA_TYPE,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def create_order_once(db: Session, order: OrderCreate, key: str, ttl: float,
+                      cache: Optional[Cache] = None) -> Response:
+    """
+    Создаёт заказ не больше одного раза на ключ.
+
+    Ответ записывается под ключом в той же транзакции, что и заказ: либо
+    есть и заказ, и ключ, либо ничего. Повтор с тем же ключом получает
+    сохранённый ответ без записи. Если тот же ключ одновременно пришёл в
+    другой воркер, вставка ключа упрётся в первичный ключ таблицы, вся
+    транзакция (вместе с заказом) откатится, и вернётся ответ победителя.
+
+    Синхронная функция: асинхронный обработчик вызывает её через run_sync.
+    """
+    expected_hash = request_hash(order)
+    stored = find_key(db, key)
+    if stored is not None and not is_expired(stored, ttl):
+        return replay_response(stored, expected_hash)
+
+    created = {}
+
+    def remember(row):
+        if stored is not None:
+            # Просроченный, но ещё не удалённый ключ освобождается для нового запроса
+            delete_key(db, key)
+        created["body"] = json_row(row, OrderResponse)
+        store_key(db, key, expected_hash, status.HTTP_201_CREATED, created["body"])
+
+    try:
+        row = crud.create_order(db, order, on_insert=remember)
+    except IntegrityError:
+        # Нарушен первичный ключ idempotency_keys (ключ записал
+        # параллельный запрос), внешний ключ на users или другое ограничение
+        stored = find_key(db, key)
+        if stored is not None:
+            return replay_response(stored, expected_hash)
+        if db.scalar(crud.user_exists_statement(order.user_id)) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        raise
+    if cache is not None:
+        cache.delete(order_key(row.id))
+    return Response(content=created["body"], status_code=status.HTTP_201_CREATED, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,53 @@
+from typing import Dict, List, Sequence, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+
+from src.api.responses import JSON_MEDIA_TYPE, dumps, model_fields
+
+# Максимальное число id в одном запросе ?ids=...
+LOOKUP_MAX_IDS = 5000
+
+
+def parse_ids(ids: str) -> List[int]:
+    """
+    Разбирает параметр ids вида "3,1,2" с сохранением порядка и повторов.
+    При пустом списке, нечисловых значениях или превышении LOOKUP_MAX_IDS — 400.
+    """
+    try:
+        values = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Параметр ids должен содержать целые числа через запятую"
+        )
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Параметр ids не должен быть пустым"
+        )
+    if len(values) > LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"В параметре ids не больше {LOOKUP_MAX_IDS} значений"
+        )
+    return values
+
+
+def lookup_response(ids: Sequence[int], found: Dict[int, Sequence],
+                    model: Type[BaseModel], key: str) -> Response:
+    """
+    Ответ пакетного чтения: по элементу на каждый запрошенный id в порядке
+    запроса, с признаком found и данными записи под ключом key (null, если
+    записи нет). Формат совпадает с UserLookupResult / OrderLookupResult.
+    """
+    fields = model_fields(model)
+    items = []
+    for record_id in ids:
+        row = found.get(record_id)
+        items.append({
+            "id": record_id,
+            "found": row is not None,
+            key: dict(zip(fields, row)) if row is not None else None,
+        })
+    return Response(content=dumps(items), media_type=JSON_MEDIA_TYPE)
@@ -1,19 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from contextlib import asynccontextmanager
+from typing import List, Optional, Union
 
-from src.models.pydantic_models import OrderCreate, OrderResponse
-from src.models.orm_models import User, Order
-from src.database.db import get_db
+from src.models.pydantic_models import (
+    OrderCreate, OrderResponse, OrderWithUserResponse, OrderLookupResult, BulkCreateResponse,
+    ProductOrderStatsResponse, UserOrderStatsResponse
+)
+from src.models.orm_models import Order
+from src.config import get_settings
+from src.database.db import get_read_db, get_write_db
+from src.cache import Cache, get_cache, order_key
+from src.database import crud
+from src.database.crud import ORDER_COLUMNS, bulk_create_orders, order_version_statement
+from src.database.group_commit import GroupCommitWriter, get_order_writer
+from src.database.summary import OrderStatsGroup, group_stats_statement
+from src.database.fulltext import fulltext_supported
+from src.database.order_search import OrderSearch, OrderSort, SearchError, default_sort, search_statement
+from src.api.bulk import bulk_openapi_extra, bulk_response, read_bulk_items
+from src.api.pagination import (
+    decode_product_cursor, decode_rank_cursor, resolve_after_id, set_next_cursor, set_next_product_cursor,
+    set_next_rank_cursor,
+)
+from src.api.responses import JSON_MEDIA_TYPE, json_row, json_rows_response
+from src.api.lookup import lookup_response, parse_ids
+from src.api.embedding import (
+    OrderInclude, embedded_list_response, embedded_response, reject_include_with_ids, with_user
+)
+from src.api.export import ExportFormat, export_openapi_responses, export_response, id_range
+from src.api.etags import ETAG_HEADER, etag, etag_matches, not_modified, pack_cached, unpack_cached, with_etag
+from src.api.idempotency import IDEMPOTENCY_KEY_HEADER, IDEMPOTENCY_KEY_MAX_LENGTH, create_order_once
+from src.metrics import route_class
 
 # Создаем роутер для заказов
 router = APIRouter(
     prefix="/orders",
     tags=["orders"],
+    route_class=route_class(get_settings()),
     responses={404: {"description": "Заказ не найден"}}
 )
 
 
+async def get_order_db(
+        request: Request,
+        writer: Optional[GroupCommitWriter] = Depends(get_order_writer)
+):
+    """
+    Сессия для POST /orders. При групповой фиксации заказ без Idempotency-Key
+    пишет поток-писатель, и запросу не нужны ни слот сессии, ни соединение:
+    зависимость отдаёт None вместо сессии get_write_db.
+    """
+    if writer is not None and IDEMPOTENCY_KEY_HEADER not in request.headers:
+        yield None
+        return
+    async with asynccontextmanager(get_write_db)() as db:
+        yield db
+
+
+def _insert_order(db: Session, order: OrderCreate):
+    # Существование пользователя проверяет внешний ключ при вставке;
+    # пользователь ищется отдельно, только если вставка не удалась
+    try:
+        return crud.create_order(db, order)
+    except IntegrityError:
+        if db.scalar(crud.user_exists_statement(order.user_id)) is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        raise
+
+
 @router.post(
     "",
     response_model=OrderResponse,
@@ -21,9 +82,14 @@ router = APIRouter(
     summary="Создать новый заказ",
     description="Создание нового заказа для указанного пользователя"
 )
-def create_order(
+async def create_order(
         order: OrderCreate,
-        db: Session = Depends(get_db)
+        idempotency_key: Optional[str] = Header(
+            default=None, alias=IDEMPOTENCY_KEY_HEADER, min_length=1, max_length=IDEMPOTENCY_KEY_MAX_LENGTH
+        ),
+        db: Optional[Session] = Depends(get_order_db, scope="function"),
+        cache: Cache = Depends(get_cache),
+        writer: Optional[GroupCommitWriter] = Depends(get_order_writer)
 ):
     """
     Создаёт новый заказ с предоставленными данными:
@@ -33,69 +99,310 @@ def create_order(
     - **quantity**: количество (больше 0)
 
     Возвращает созданный заказ с присвоенным id.
+
+    С заголовком `Idempotency-Key` повтор запроса с тем же ключом (в пределах
+    срока хранения ключа) возвращает тот же ответ с заголовком
+    `Idempotent-Replayed: true` и не создаёт второй заказ. Тот же ключ с другим
+    телом запроса — ошибка 422.
     """
-    # Проверяем существование пользователя
-    user = db.query(User).filter(User.id == order.user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Пользователь не найден"
+    if idempotency_key is not None:
+        return await run_in_threadpool(
+            create_order_once, db, order, idempotency_key, get_settings().idempotency_ttl, cache
         )
-
-    db_order = Order(
-        user_id=order.user_id,
-        product_name=order.product_name,
-        quantity=order.quantity
-    )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    if writer is not None:
+        # Заказ записывается пачкой вместе с заказами параллельных запросов;
+        # ответ — после фиксации пачки. Обработчик асинхронный: ожидание
+        # пачки не занимает поток пула
+        result = await writer.create_order_async(order)
+        if result.status != "created":
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        cache.delete(order_key(result.id))
+        return OrderResponse(id=result.id, **order.model_dump())
+    db_order = await run_in_threadpool(_insert_order, db, order)
+    cache.delete(order_key(db_order.id))
     return db_order
 
 
+@router.post(
+    "/bulk",
+    response_model=BulkCreateResponse,
+    summary="Создать заказы пакетом",
+    description="Создание множества заказов одной транзакцией из JSON-массива или NDJSON-потока",
+    openapi_extra=bulk_openapi_extra(OrderCreate)
+)
+async def create_orders_bulk(
+        request: Request,
+        db: Session = Depends(get_write_db, scope="function"),
+        cache: Cache = Depends(get_cache)
+):
+    """
+    Создаёт заказы пакетом. Тело запроса — JSON-массив объектов заказа
+    или NDJSON (`Content-Type: application/x-ndjson`), по объекту на строку.
+
+    Все валидные заказы вставляются одной транзакцией. Для каждого элемента
+    возвращается результат с его индексом в запросе: `created` и id заказа,
+    `invalid` при ошибке валидации или `user_not_found`, если пользователя нет.
+    """
+    items, results = await read_bulk_items(request, OrderCreate)
+    created = await run_in_threadpool(bulk_create_orders, db, items, results)
+    cache.delete(*(order_key(item.id) for item in created if item.id is not None))
+    return bulk_response(created)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses=export_openapi_responses(OrderResponse),
+    summary="Выгрузить заказы",
+    description="Потоковая выгрузка заказов в NDJSON или CSV"
+)
+def export_orders(
+        user_id: Optional[int] = None,
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        format: ExportFormat = ExportFormat.ndjson,
+        db: Session = Depends(get_read_db)
+):
+    """
+    Выгружает заказы одним потоком, упорядоченными по id:
+
+    - **user_id**: только заказы указанного пользователя
+    - **min_id**, **max_id**: диапазон id заказов (включительно)
+    - **format**: `ndjson` (по объекту на строку) или `csv` (с заголовком)
+
+    Все строки читаются одним запросом, то есть из одного снимка базы,
+    а память сервера не зависит от размера таблицы.
+    """
+    statement = id_range(select(*ORDER_COLUMNS).order_by(Order.id), Order.id, min_id, max_id)
+    if user_id is not None:
+        statement = statement.where(Order.user_id == user_id)
+    return export_response(db, statement, OrderResponse, format, "orders")
+
+
+@router.get(
+    "/stats",
+    response_model=Union[List[ProductOrderStatsResponse], List[UserOrderStatsResponse]],
+    summary="Получить статистику заказов",
+    description="Количество заказов и суммарное количество товара по группам"
+)
+def get_order_stats(
+        group_by: OrderStatsGroup = OrderStatsGroup.product_name,
+        skip: int = 0,
+        limit: int = 100,
+        db: Session = Depends(get_read_db, scope="function")
+):
+    """
+    Получает статистику заказов, сгруппированную по полю group_by:
+
+    - **group_by**: `product_name` (по товарам) или `user_id` (по пользователям)
+    - **skip**, **limit**: пагинация по группам, упорядоченным по ключу
+
+    Данные читаются из сводных таблиц, которые обновляются при создании
+    заказов, поэтому запрос не обходит таблицу orders.
+    """
+    statement = group_stats_statement(group_by).offset(skip).limit(limit)
+    model = ProductOrderStatsResponse if group_by is OrderStatsGroup.product_name else UserOrderStatsResponse
+    return json_rows_response(db.execute(statement).all(), model)
+
+
+@router.get(
+    "/search",
+    response_model=List[OrderResponse],
+    summary="Найти заказы",
+    description="Поиск заказов по пользователю, названию товара и количеству"
+)
+def search_orders(
+        user_id: Optional[int] = None,
+        product_prefix: Optional[str] = Query(default=None, min_length=1, max_length=100),
+        min_quantity: Optional[int] = None,
+        max_quantity: Optional[int] = None,
+        q: Optional[str] = Query(default=None, min_length=1, max_length=200),
+        sort: Optional[OrderSort] = None,
+        limit: int = Query(default=100, ge=1, le=1000),
+        cursor: Optional[str] = None,
+        db: Session = Depends(get_read_db, scope="function")
+):
+    """
+    Ищет заказы по фильтрам:
+
+    - **user_id**: заказы указанного пользователя
+    - **product_prefix**: название товара начинается с этой строки (с учётом регистра)
+    - **min_quantity**, **max_quantity**: диапазон количества (включительно);
+      только вместе с другими фильтрами
+    - **q**: слова в названии товара, в любом порядке и регистре
+      (полнотекстовый поиск; с `product_prefix` не сочетается)
+    - **sort**: `id` (по возрастанию), `-id` (по убыванию), `product`
+      (по названию товара, затем по id; только для `product_prefix` без
+      `user_id`, и для него это единственная сортировка) или `rank`
+      (сначала самые релевантные, только с `q`); по умолчанию `rank` с `q`,
+      `product` для `product_prefix` без `user_id` и `id` в остальных случаях
+    - **limit**: размер страницы (до 1000)
+    - **cursor**: курсор из заголовка `X-Next-Cursor` предыдущей страницы
+
+    Нужен хотя бы один из фильтров `user_id`, `product_prefix` и `q`:
+    каждое разрешённое сочетание выполняется по индексу, без обхода всей
+    таблицы. Курсор следующей страницы возвращается в заголовке `X-Next-Cursor`.
+    """
+    search = OrderSearch(user_id, product_prefix, min_quantity, max_quantity, q)
+    if sort is None:
+        sort = default_sort(search)
+    if q is not None and not fulltext_supported(db.get_bind()):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Полнотекстовый поиск доступен только для SQLite"
+        )
+    after_score = after_product = None
+    if sort is OrderSort.rank and cursor is not None:
+        after_score, after_id = decode_rank_cursor(cursor)
+    elif sort is OrderSort.product and cursor is not None:
+        after_product, after_id = decode_product_cursor(cursor)
+    else:
+        after_id = resolve_after_id(None, cursor)
+    try:
+        statement = search_statement(search, sort, after_id, limit, after_score, after_product)
+    except SearchError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    orders = db.execute(statement).all()
+    response = json_rows_response(orders, OrderResponse)
+    if sort is OrderSort.rank:
+        set_next_rank_cursor(response, orders, limit)
+    elif sort is OrderSort.product:
+        set_next_product_cursor(response, orders, limit)
+    else:
+        set_next_cursor(response, orders, limit)
+    return response
+
+
 @router.get(
     "/{order_id}",
-    response_model=OrderResponse,
+    response_model=Union[OrderResponse, OrderWithUserResponse],
     summary="Получить данные заказа",
     description="Получение данных заказа по указанному ID"
 )
 def get_order(
         order_id: int,
-        db: Session = Depends(get_db)
+        include: Optional[OrderInclude] = None,
+        if_none_match: Optional[str] = Header(default=None),
+        db: Session = Depends(get_read_db, scope="function"),
+        cache: Cache = Depends(get_cache)
 ):
     """
     Получает данные заказа по указанному ID:
 
     - **order_id**: ID заказа (целое число)
+    - **include**: `user` — добавить в ответ данные пользователя
 
     Возвращает данные заказа или 404, если заказ не найден.
+    Сериализованный ответ без include кешируется; создание заказа сбрасывает его ключ.
+
+    Ответ содержит заголовок `ETag`; запрос с `If-None-Match`, совпавшим
+    с текущим ETag, получает 304 без тела.
     """
-    db_order = db.query(Order).filter(Order.id == order_id).first()
-    if db_order is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Заказ не найден"
-        )
-    return db_order
+    if include is OrderInclude.user:
+        versions = db.execute(order_version_statement(order_id)).first()
+        if versions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Заказ не найден"
+            )
+        tag = etag("o", order_id, versions.version, "u", versions.user_version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+        db_order = db.scalars(with_user(select(Order).where(Order.id == order_id))).first()
+        return with_etag(embedded_response(db_order, OrderWithUserResponse), tag)
+
+    key = order_key(order_id)
+    cached = unpack_cached(cache.get(key))
+    if cached is None and if_none_match is not None:
+        # Условный запрос мимо кеша: сначала только версия строки
+        version = db.scalar(select(Order.version).where(Order.id == order_id))
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Заказ не найден"
+            )
+        tag = etag("o", order_id, version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+    if cached is None:
+        row = db.execute(select(*ORDER_COLUMNS, Order.version).where(Order.id == order_id)).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Заказ не найден"
+            )
+        cached = etag("o", order_id, row.version), json_row(row, OrderResponse)
+        cache.set(key, pack_cached(*cached))
+    tag, body = cached
+    if etag_matches(if_none_match, tag):
+        return not_modified(tag)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers={ETAG_HEADER: tag})
 
 
 @router.get(
     "",
-    response_model=List[OrderResponse],
+    response_model=Union[List[OrderResponse], List[OrderWithUserResponse], List[OrderLookupResult]],
     summary="Получить список всех заказов",
     description="Получение списка всех заказов в системе"
 )
 def get_all_orders(
         skip: int = 0,
         limit: int = 100,
-        db: Session = Depends(get_db)
+        after_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        ids: Optional[str] = None,
+        include: Optional[OrderInclude] = None,
+        db: Session = Depends(get_read_db, scope="function")
 ):
     """
     Получает список всех заказов с возможностью пагинации:
 
     - **skip**: количество пропускаемых записей (для пагинации)
     - **limit**: максимальное количество возвращаемых записей
+    - **after_id**: вернуть заказы с id больше указанного (keyset-пагинация)
+    - **cursor**: непрозрачный курсор из заголовка `X-Next-Cursor` предыдущей страницы
+
+    Если передан `after_id` или `cursor`, `skip` игнорируется и страница
+    выбирается по первичному ключу за постоянное время. Курсор следующей
+    страницы возвращается в заголовке `X-Next-Cursor`.
+
+    - **ids**: id заказов через запятую (не больше 5000) — пакетное чтение
+
+    С `ids` пагинация не применяется: возвращается по элементу
+    `{"id", "found", "order"}` на каждый id в порядке запроса,
+    для отсутствующих заказов `found` равно false, а `order` — null.
+
+    - **include**: `user` — добавить к каждому заказу данные пользователя
+      (загружаются тем же запросом через JOIN; с `ids` не сочетается)
 
     Возвращает список заказов.
     """
-    return db.query(Order).offset(skip).limit(limit).all()
\ No newline at end of file
+    if ids is not None:
+        reject_include_with_ids(include)
+        order_ids = parse_ids(ids)
+        found = crud.rows_by_ids(db, ORDER_COLUMNS, Order.id, order_ids)
+        return lookup_response(order_ids, found, OrderResponse, "order")
+
+    query = select(Order) if include else select(*ORDER_COLUMNS)
+    query = query.order_by(Order.id)
+    start_id = resolve_after_id(after_id, cursor)
+    if start_id is not None:
+        query = query.where(Order.id > start_id)
+    else:
+        query = query.offset(skip)
+
+    if include is OrderInclude.user:
+        orders = db.scalars(with_user(query.limit(limit))).all()
+        response = embedded_list_response(orders, OrderWithUserResponse)
+    else:
+        # Строки сериализуются напрямую, без OrderResponse на каждую запись
+        orders = db.execute(query.limit(limit)).all()
+        response = json_rows_response(orders, OrderResponse)
+    set_next_cursor(response, orders, limit)
+    return response
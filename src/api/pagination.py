@@ -0,0 +1,110 @@
+import base64
+import binascii
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+
+# Заголовок, в котором клиенту возвращается курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_CURSOR_PREFIX = "id:"
+_RANK_CURSOR_PREFIX = "rank:"
+_PRODUCT_CURSOR_PREFIX = "product:"
+
+
+def encode_cursor(last_id: int) -> str:
+    """Упаковывает id последней записи страницы в непрозрачный курсор."""
+    raw = f"{_CURSOR_PREFIX}{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Распаковывает курсор обратно в id; при ошибке формата возвращает 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith(_CURSOR_PREFIX):
+            raise ValueError(raw)
+        return int(raw[len(_CURSOR_PREFIX):])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
+
+
+def encode_rank_cursor(score: float, last_id: int) -> str:
+    """Курсор сортировки по релевантности: score и id последней записи страницы."""
+    raw = f"{_RANK_CURSOR_PREFIX}{score!r}:{last_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith(_RANK_CURSOR_PREFIX):
+            raise ValueError(raw)
+        score, last_id = raw[len(_RANK_CURSOR_PREFIX):].rsplit(":", 1)
+        return float(score), int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
+
+
+def encode_product_cursor(product_name: str, last_id: int) -> str:
+    """Курсор сортировки по названию товара: id и название последней записи страницы."""
+    raw = f"{_PRODUCT_CURSOR_PREFIX}{last_id}:{product_name}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_product_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        if not raw.startswith(_PRODUCT_CURSOR_PREFIX):
+            raise ValueError(raw)
+        # Название идёт последним: двоеточия в нём не мешают разбору
+        last_id, product_name = raw[len(_PRODUCT_CURSOR_PREFIX):].split(":", 1)
+        return product_name, int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
+
+
+def resolve_after_id(after_id: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """
+    Определяет id, после которого начинается страница в режиме keyset-пагинации.
+
+    Возвращает None, если клиент не передал ни after_id, ни cursor —
+    тогда используется старая пагинация через skip/limit.
+    """
+    if cursor is not None:
+        return decode_cursor(cursor)
+    return after_id
+
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """
+    Выставляет курсор следующей страницы, если текущая страница заполнена.
+
+    На последней (неполной) странице заголовок не выставляется.
+    """
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
+
+
+def set_next_rank_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Как set_next_cursor, но для сортировки по релевантности (у строк есть score)."""
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_rank_cursor(items[-1].score, items[-1].id)
+
+
+def set_next_product_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Как set_next_cursor, но для сортировки по названию товара."""
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_product_cursor(items[-1].product_name, items[-1].id)
@@ -0,0 +1,65 @@
+import json
+import time
+from typing import Any, Iterable, Sequence, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from src.metrics import record_serialization
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Сериализует dict/list в компактный JSON (UTF-8, без пробелов) —
+    тот же формат, что отдаёт FastAPI для response_model.
+    При отсутствии orjson используется стандартный json.
+    """
+    started = time.perf_counter()
+    if orjson is not None:
+        body = orjson.dumps(content)
+    else:
+        body = json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+    record_serialization(time.perf_counter() - started)
+    return body
+
+
+def model_fields(model: Type[BaseModel]) -> Tuple[str, ...]:
+    """Имена полей схемы ответа в порядке объявления (порядок ключей в JSON)."""
+    return tuple(model.model_fields)
+
+
+def row_to_dict(row: Sequence, model: Type[BaseModel]) -> dict:
+    """
+    Строка результата select(...) -> dict с ключами полей model.
+
+    Колонки в запросе должны идти в порядке полей модели; лишние
+    колонки в конце строки (например, служебный owner_id) отбрасываются.
+    """
+    return dict(zip(model_fields(model), row))
+
+
+def json_row(row: Sequence, model: Type[BaseModel]) -> bytes:
+    return dumps(row_to_dict(row, model))
+
+
+def json_rows_response(rows: Iterable[Sequence], model: Type[BaseModel]) -> Response:
+    """
+    Быстрый путь для списков: строки из БД сериализуются сразу в байты,
+    без создания и проверки Pydantic-объекта на каждую запись.
+    response_model обработчика остаётся только для схемы OpenAPI.
+    """
+    fields = model_fields(model)
+    body = dumps([dict(zip(fields, row)) for row in rows])
+    return Response(content=body, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,347 @@
+"""
+Обработчики пользователей и заказов при шардировании (SHARD_URLS, см.
+src/database/sharding.py).
+
+Подключаются вместо src/api/users.py и src/api/orders.py и покрывают
+пути, у которых есть user_id или id: создание и чтение пользователя, его
+заказы, создание и чтение заказа, а также списки пользователей и заказов
+— запросом ко всем шардам и слиянием страниц по id (keyset-пагинация).
+
+Остальное работает с одной базой и при шардировании отклоняется явно,
+а не молча: пакетная загрузка, выгрузка, поиск и статистика отвечают 501,
+заголовок Idempotency-Key — 501 (повтор без дедупликации создал бы второй
+заказ), параметры списков skip, ids и include — 400. Условные GET и кеш
+ответов не подключаются: If-None-Match игнорируется, ответ всегда 200.
+"""
+import heapq
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import Row, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.models.pydantic_models import OrderCreate, OrderResponse, UserCreate, UserResponse
+from src.models.orm_models import Order, User
+from src.config import get_settings
+from src.database import crud
+from src.database.crud import (
+    ORDER_COLUMNS, USER_COLUMNS, USER_DUPLICATE_ERROR, USER_NOT_FOUND_ERROR, orders_from_user_rows,
+    user_orders_statement,
+)
+from src.database.sharding import (
+    WRITE_ATTEMPTS, Shard, ShardRouter, SlotMoving, WrongShard, claim_slot, get_shard_router, owns_slot,
+    slot_of,
+)
+from src.api.idempotency import IDEMPOTENCY_KEY_HEADER
+from src.api.pagination import resolve_after_id, set_next_cursor
+from src.api.responses import JSON_MEDIA_TYPE, json_row, json_rows_response
+from src.metrics import route_class
+
+users_router = APIRouter(
+    prefix="/users",
+    tags=["users"],
+    route_class=route_class(get_settings()),
+    responses={404: {"description": "Пользователь не найден"}}
+)
+
+orders_router = APIRouter(
+    prefix="/orders",
+    tags=["orders"],
+    route_class=route_class(get_settings()),
+    responses={404: {"description": "Заказ не найден"}}
+)
+
+# Сколько секунд клиенту ждать перед повтором записи в переносимый слот
+SLOT_MOVING_RETRY_AFTER = 1
+
+
+def _slot_moving() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Данные пользователя переносятся на другой шард, повторите запрос позже",
+        headers={"Retry-After": str(SLOT_MOVING_RETRY_AFTER)},
+    )
+
+
+def _not_found(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+def _not_supported(what: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        detail=f"{what} не поддерживается при шардировании",
+    )
+
+
+def reject_list_params(**params) -> None:
+    """
+    skip, ids и include списков при шардировании не поддерживаются.
+    FastAPI молча отбрасывает незнакомые параметры, и клиент с ?skip=N
+    получал бы первую страницу, поэтому они объявлены и дают 400.
+    """
+    given = [name for name, value in params.items() if value]
+    if given:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Параметры {', '.join(given)} не поддерживаются при шардировании; "
+                   f"для страниц используйте cursor или after_id"
+        )
+
+
+def _add_unsupported_route(router: APIRouter, method: str, path: str, name: str, what: str) -> None:
+    async def not_supported():
+        raise _not_supported(what)
+
+    router.add_api_route(path, not_supported, methods=[method], name=name, include_in_schema=False)
+
+
+# Маршруты одной базы без шардированной версии отвечают 501, а не 404 или
+# 422 от соседних /{user_id} и /{order_id}: регистрируются раньше них
+for _router, _method, _path, _name, _what in (
+        (users_router, "POST", "/bulk", "create_users_bulk", "Пакетное создание пользователей"),
+        (users_router, "GET", "/export", "export_users", "Выгрузка пользователей"),
+        (users_router, "GET", "/{user_id}/stats", "get_user_stats", "Статистика заказов пользователя"),
+        (orders_router, "POST", "/bulk", "create_orders_bulk", "Пакетное создание заказов"),
+        (orders_router, "GET", "/export", "export_orders", "Выгрузка заказов"),
+        (orders_router, "GET", "/stats", "get_order_stats", "Статистика заказов"),
+        (orders_router, "GET", "/search", "search_orders", "Поиск заказов"),
+):
+    _add_unsupported_route(_router, _method, _path, _name, _what)
+
+
+def fetch(router: ShardRouter, entity_id: int, statement) -> List[Row]:
+    """
+    Строки statement из шарда пользователя или заказа entity_id. Пустой
+    результат верен, только если шард владеет слотом: иначе карта
+    устарела, и запрос повторяется на новом владельце.
+    """
+    def read(db: Session) -> List[Row]:
+        rows = db.execute(statement).all()
+        if not rows and not owns_slot(db, slot_of(entity_id)):
+            raise WrongShard(slot_of(entity_id))
+        return rows
+
+    return router.run(entity_id, read)
+
+
+def scatter_page(router: ShardRouter, columns, id_column, start_id: Optional[int], limit: int) -> List[Row]:
+    """
+    Первые limit строк после start_id по всем шардам. Каждый шард отдаёт
+    свои первые limit строк — среди них все строки общей страницы.
+    Пока слот переносится, его строки есть в двух шардах; копии одинаковы
+    и отбрасываются по id.
+    """
+    statement = select(*columns).order_by(id_column).limit(limit)
+    if start_id is not None:
+        statement = statement.where(id_column > start_id)
+
+    def read(shard: Shard) -> List[Row]:
+        with shard.session_factory() as db:
+            return db.execute(statement).all()
+
+    page = []
+    for row in heapq.merge(*router.scatter(read), key=lambda row: row.id):
+        if page and page[-1].id == row.id:
+            continue
+        page.append(row)
+        if len(page) == limit:
+            break
+    return page
+
+
+@users_router.post(
+    "",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создать нового пользователя",
+    description="Создание нового пользователя с указанными данными"
+)
+def create_user(
+        user: UserCreate,
+        router: ShardRouter = Depends(get_shard_router)
+):
+
+    # Уникальные индексы username и email действуют внутри шарда, поэтому
+    # сначала проверяются все шарды. Одновременное создание одинаковых
+    # пользователей в разных шардах эта проверка не исключает
+    def exists(shard: Shard) -> bool:
+        with shard.session_factory() as db:
+            return db.scalar(
+                select(User.id).where((User.username == user.username) | (User.email == user.email)).limit(1)
+            ) is not None
+
+    if any(router.scatter(exists)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=USER_DUPLICATE_ERROR)
+    for attempt in range(WRITE_ATTEMPTS):
+        # Новый id — новый случайный слот: переносимый слот просто обходится
+        user_id = router.new_user_id()
+
+        def write(db: Session) -> Row:
+            return crud.create_user(db, user, user_id, on_insert=lambda row: claim_slot(db, slot_of(user_id)))
+
+        try:
+            return router.run(user_id, write)
+        except SlotMoving:
+            continue
+        except IntegrityError:
+            if not fetch(router, user_id, select(User.id).where(User.id == user_id)):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=USER_DUPLICATE_ERROR)
+            # Совпадение id с другим процессом: повтор с новым id
+            if attempt == WRITE_ATTEMPTS - 1:
+                raise
+    # Сюда доходят, только если каждая попытка попала в переносимый слот
+    raise _slot_moving()
+
+
+@users_router.get(
+    "/{user_id}",
+    response_model=UserResponse,
+    summary="Получить данные пользователя",
+    description="Получение данных пользователя по указанному ID"
+)
+def get_user(
+        user_id: int,
+        router: ShardRouter = Depends(get_shard_router)
+):
+
+    rows = fetch(router, user_id, select(*USER_COLUMNS).where(User.id == user_id))
+    if not rows:
+        raise _not_found(USER_NOT_FOUND_ERROR)
+    return Response(content=json_row(rows[0], UserResponse), media_type=JSON_MEDIA_TYPE)
+
+
+@users_router.get(
+    "",
+    response_model=List[UserResponse],
+    summary="Получить список всех пользователей",
+    description="Получение списка пользователей всех шардов по возрастанию id"
+)
+def get_all_users(
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        skip: Optional[int] = Query(default=None, include_in_schema=False),
+        ids: Optional[str] = Query(default=None, include_in_schema=False),
+        include: Optional[str] = Query(default=None, include_in_schema=False),
+        router: ShardRouter = Depends(get_shard_router)
+):
+
+    reject_list_params(skip=skip, ids=ids, include=include)
+    users = scatter_page(router, USER_COLUMNS, User.id, resolve_after_id(after_id, cursor), limit)
+    response = json_rows_response(users, UserResponse)
+    set_next_cursor(response, users, limit)
+    return response
+
+
+@users_router.get(
+    "/{user_id}/orders",
+    response_model=List[OrderResponse],
+    summary="Получить заказы пользователя",
+    description="Получение списка всех заказов указанного пользователя"
+)
+def get_user_orders(
+        user_id: int,
+        router: ShardRouter = Depends(get_shard_router)
+):
+
+    # Заказы пользователя лежат в его шарде: запрос к одному шарду
+    orders = orders_from_user_rows(fetch(router, user_id, user_orders_statement(user_id)))
+    if orders is None:
+        raise _not_found(USER_NOT_FOUND_ERROR)
+    return json_rows_response(orders, OrderResponse)
+
+
+@orders_router.post(
+    "",
+    response_model=OrderResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создать новый заказ",
+    description="Создание нового заказа для указанного пользователя"
+)
+def create_order(
+        order: OrderCreate,
+        idempotency_key: Optional[str] = Header(default=None, alias=IDEMPOTENCY_KEY_HEADER, include_in_schema=False),
+        router: ShardRouter = Depends(get_shard_router)
+):
+
+    # Ключи идемпотентности хранятся в одной базе и не переносятся вместе
+    # со слотом; без дедупликации повтор клиента создал бы второй заказ
+    if idempotency_key is not None:
+        raise _not_supported(f"Заголовок {IDEMPOTENCY_KEY_HEADER}")
+    slot = slot_of(order.user_id)
+    for attempt in range(WRITE_ATTEMPTS):
+        # id заказа несёт слот пользователя: заказ попадает в его шард
+        order_id = router.new_order_id(order.user_id)
+
+        def write(db: Session) -> Optional[Row]:
+            if db.scalar(select(User.id).where(User.id == order.user_id)) is None:
+                if not owns_slot(db, slot):
+                    raise WrongShard(slot)
+                return None
+            return crud.create_order(db, order, on_insert=lambda row: claim_slot(db, slot), order_id=order_id)
+
+        try:
+            row = router.run(order.user_id, write)
+        except SlotMoving:
+            raise _slot_moving()
+        except IntegrityError:
+            # Пользователь проверен выше, значит, id совпал с id другого процесса
+            if attempt == WRITE_ATTEMPTS - 1:
+                raise
+            continue
+        if row is None:
+            raise _not_found(USER_NOT_FOUND_ERROR)
+        return row
+
+
+@orders_router.get(
+    "/{order_id}",
+    response_model=OrderResponse,
+    summary="Получить информацию о заказе",
+    description="Получение информации о заказе по его ID"
+)
+def get_order(
+        order_id: int,
+        router: ShardRouter = Depends(get_shard_router)
+):
+
+    # Шард заказа определяется по слоту в его id
+    rows = fetch(router, order_id, select(*ORDER_COLUMNS).where(Order.id == order_id))
+    if not rows:
+        raise _not_found("Заказ не найден")
+    return Response(content=json_row(rows[0], OrderResponse), media_type=JSON_MEDIA_TYPE)
+
+
+@orders_router.get(
+    "",
+    response_model=List[OrderResponse],
+    summary="Получить список всех заказов",
+    description="Получение списка заказов всех шардов по возрастанию id"
+)
+def get_all_orders(
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        skip: Optional[int] = Query(default=None, include_in_schema=False),
+        ids: Optional[str] = Query(default=None, include_in_schema=False),
+        include: Optional[str] = Query(default=None, include_in_schema=False),
+        router: ShardRouter = Depends(get_shard_router)
+):
+    """
+    Заказы всех шардов по возрастанию id (примерно в порядке создания:
+    старшие биты id — время):
+
+    - **limit**: максимальное количество возвращаемых записей
+    - **after_id**: вернуть заказы с id больше указанного
+    - **cursor**: непрозрачный курсор из заголовка `X-Next-Cursor` предыдущей страницы
+
+    Каждый шард читает не больше limit заказов по первичному ключу,
+    страницы шардов сливаются по id. skip, ids и include — ошибка 400.
+    """
+    reject_list_params(skip=skip, ids=ids, include=include)
+    orders = scatter_page(router, ORDER_COLUMNS, Order.id, resolve_after_id(after_id, cursor), limit)
+    response = json_rows_response(orders, OrderResponse)
+    set_next_cursor(response, orders, limit)
+    return response
@@ -1,15 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List
+from typing import List, Optional, Union
 
-from src.models.pydantic_models import UserCreate, UserResponse, OrderResponse
-from src.models.orm_models import User, Order
-from src.database.db import get_db
+from src.models.pydantic_models import (
+    UserCreate, UserResponse, UserWithOrdersResponse, UserLookupResult, OrderResponse, BulkCreateResponse,
+    UserOrderStatsResponse
+)
+from src.models.orm_models import User
+from src.config import get_settings
+from src.database.db import get_read_db, get_write_db
+from src.cache import Cache, get_cache, user_key
+from src.database import crud
+from src.database.crud import (
+    USER_COLUMNS, bulk_create_users, orders_from_user_rows, user_orders_statement, user_version_statement
+)
+from src.database.summary import user_stats_statement
+from src.api.bulk import bulk_openapi_extra, bulk_response, read_bulk_items
+from src.api.pagination import resolve_after_id, set_next_cursor
+from src.api.responses import JSON_MEDIA_TYPE, json_row, json_rows_response
+from src.api.lookup import lookup_response, parse_ids
+from src.api.embedding import (
+    UserInclude, embedded_list_response, embedded_response, reject_include_with_ids, with_orders
+)
+from src.api.export import ExportFormat, export_openapi_responses, export_response, id_range
+from src.api.etags import ETAG_HEADER, etag, etag_matches, not_modified, pack_cached, unpack_cached, with_etag
+from src.metrics import route_class
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
+    route_class=route_class(get_settings()),
     responses={404: {"description": "Пользователь не найден"}}
 )
 
@@ -23,60 +47,154 @@ router = APIRouter(
 )
 def create_user(
         user: UserCreate,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_write_db, scope="function"),
+        cache: Cache = Depends(get_cache)
 ):
 
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        age=user.age
-    )
     try:
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return db_user
+        db_user = crud.create_user(db, user)
     except IntegrityError:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Пользователь с таким username или email уже существует"
         )
+    cache.delete(user_key(db_user.id))
+    return db_user
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkCreateResponse,
+    summary="Создать пользователей пакетом",
+    description="Создание множества пользователей одной транзакцией из JSON-массива или NDJSON-потока",
+    openapi_extra=bulk_openapi_extra(UserCreate)
+)
+async def create_users_bulk(
+        request: Request,
+        db: Session = Depends(get_write_db, scope="function"),
+        cache: Cache = Depends(get_cache)
+):
+
+    items, results = await read_bulk_items(request, UserCreate)
+    created = await run_in_threadpool(bulk_create_users, db, items, results)
+    cache.delete(*(user_key(item.id) for item in created if item.id is not None))
+    return bulk_response(created)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses=export_openapi_responses(UserResponse),
+    summary="Выгрузить пользователей",
+    description="Потоковая выгрузка пользователей в NDJSON или CSV"
+)
+def export_users(
+        min_id: Optional[int] = None,
+        max_id: Optional[int] = None,
+        format: ExportFormat = ExportFormat.ndjson,
+        db: Session = Depends(get_read_db)
+):
+
+    statement = id_range(select(*USER_COLUMNS).order_by(User.id), User.id, min_id, max_id)
+    return export_response(db, statement, UserResponse, format, "users")
 
 
 @router.get(
     "/{user_id}",
-    response_model=UserResponse,
+    response_model=Union[UserResponse, UserWithOrdersResponse],
     summary="Получить данные пользователя",
     description="Получение данных пользователя по указанному ID"
 )
 def get_user(
         user_id: int,
-        db: Session = Depends(get_db)
+        include: Optional[UserInclude] = None,
+        if_none_match: Optional[str] = Header(default=None),
+        db: Session = Depends(get_read_db, scope="function"),
+        cache: Cache = Depends(get_cache)
 ):
 
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if db_user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Пользователь не найден"
-        )
-    return db_user
+    if include is UserInclude.orders:
+        # Ответ с заказами не кешируется: его меняет и создание заказа
+        versions = db.execute(user_version_statement(user_id)).first()
+        if versions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        tag = etag("u", user_id, versions.version, "o", versions.orders_version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+        db_user = db.scalars(with_orders(select(User).where(User.id == user_id))).first()
+        return with_etag(embedded_response(db_user, UserWithOrdersResponse), tag)
+
+    key = user_key(user_id)
+    cached = unpack_cached(cache.get(key))
+    if cached is None and if_none_match is not None:
+        # Условный запрос мимо кеша: сначала только версия строки
+        version = db.scalar(select(User.version).where(User.id == user_id))
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        tag = etag("u", user_id, version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+    if cached is None:
+        row = db.execute(select(*USER_COLUMNS, User.version).where(User.id == user_id)).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        cached = etag("u", user_id, row.version), json_row(row, UserResponse)
+        cache.set(key, pack_cached(*cached))
+    tag, body = cached
+    if etag_matches(if_none_match, tag):
+        return not_modified(tag)
+    return Response(content=body, media_type=JSON_MEDIA_TYPE, headers={ETAG_HEADER: tag})
 
 
 @router.get(
     "",
-    response_model=List[UserResponse],
+    response_model=Union[List[UserResponse], List[UserWithOrdersResponse], List[UserLookupResult]],
     summary="Получить список всех пользователей",
     description="Получение списка всех пользователей в системе"
 )
 def get_all_users(
         skip: int = 0,
         limit: int = 100,
-        db: Session = Depends(get_db)
+        after_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        ids: Optional[str] = None,
+        include: Optional[UserInclude] = None,
+        db: Session = Depends(get_read_db, scope="function")
 ):
 
-    return db.query(User).offset(skip).limit(limit).all()
+    if ids is not None:
+        reject_include_with_ids(include)
+        # Пакетное чтение: один IN-запрос на пачку id вместо запроса на каждого пользователя
+        user_ids = parse_ids(ids)
+        found = crud.rows_by_ids(db, USER_COLUMNS, User.id, user_ids)
+        return lookup_response(user_ids, found, UserResponse, "user")
+
+    query = select(User) if include else select(*USER_COLUMNS)
+    query = query.order_by(User.id)
+    start_id = resolve_after_id(after_id, cursor)
+    if start_id is not None:
+        # Keyset-пагинация: поиск по первичному ключу вместо пропуска skip строк
+        query = query.where(User.id > start_id)
+    else:
+        query = query.offset(skip)
+
+    if include is UserInclude.orders:
+        users = db.scalars(with_orders(query.limit(limit))).all()
+        response = embedded_list_response(users, UserWithOrdersResponse)
+    else:
+        users = db.execute(query.limit(limit)).all()
+        response = json_rows_response(users, UserResponse)
+    set_next_cursor(response, users, limit)
+    return response
 
 
 @router.get(
@@ -87,13 +205,47 @@ def get_all_users(
 )
 def get_user_orders(
         user_id: int,
-        db: Session = Depends(get_db)
+        if_none_match: Optional[str] = Header(default=None),
+        db: Session = Depends(get_read_db, scope="function")
+):
+
+    if if_none_match is not None:
+        versions = db.execute(user_version_statement(user_id)).first()
+        if versions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Пользователь не найден"
+            )
+        tag = etag("uo", user_id, versions.orders_version)
+        if etag_matches(if_none_match, tag):
+            return not_modified(tag)
+    rows = db.execute(user_orders_statement(user_id)).all()
+    orders = orders_from_user_rows(rows)
+    if orders is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден"
+        )
+    # Версия списка прочитана тем же запросом, что и заказы
+    return with_etag(json_rows_response(orders, OrderResponse), etag("uo", user_id, rows[0].orders_version))
+
+
+@router.get(
+    "/{user_id}/stats",
+    response_model=UserOrderStatsResponse,
+    summary="Получить статистику заказов пользователя",
+    description="Количество заказов и суммарное количество товара пользователя"
+)
+def get_user_stats(
+        user_id: int,
+        db: Session = Depends(get_read_db, scope="function")
 ):
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    # Поиск по первичному ключу в сводной таблице вместо обхода заказов
+    row = db.execute(user_stats_statement(user_id)).first()
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Пользователь не найден"
         )
-    return db.query(Order).filter(Order.user_id == user_id).all()
\ No newline at end of file
+    return Response(content=json_row(row, UserOrderStatsResponse), media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from src.config import Settings, get_settings
+
+
+class CacheStats:
+    """Счётчики попаданий, промахов и вытеснений (потокобезопасные)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, hits: int = 0, misses: int = 0, evictions: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def as_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class Cache:
+    """
+    Базовый интерфейс кеша сериализованных ответов: ключ -> байты JSON.
+    Реализация по умолчанию ничего не хранит (кеш выключен).
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[bytes]:
+        self.stats.record(misses=1)
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        pass
+
+    def delete(self, *keys: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class LRUCache(Cache):
+    """
+    Кеш в памяти процесса: LRU с ограничением числа записей и TTL.
+    Вытеснением считается как удаление по размеру, так и по истечении TTL.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.stats.record(hits=1)
+                    return value
+                del self._data[key]
+                self.stats.record(misses=1, evictions=1)
+                return None
+        self.stats.record(misses=1)
+        return None
+
+    def set(self, key: str, value: bytes) -> None:
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.stats.record(evictions=evicted)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisCache(Cache):
+    """
+    Кеш в Redis (или любом сервере с протоколом Redis).
+
+    client — объект с методами get/set(ex=...)/delete, как у redis.Redis;
+    в тестах вместо него подставляется локальная подделка.
+    Вытеснения выполняет сам сервер, поэтому счётчик evictions здесь не растёт.
+    """
+
+    def __init__(self, client, ttl: float = 60.0, prefix: str = ""):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.stats.record(misses=1)
+        else:
+            self.stats.record(hits=1)
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self.client.set(self.prefix + key, value, ex=max(1, int(self.ttl)))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+
+def create_cache(settings: Settings) -> Cache:
+    if settings.cache_backend == "memory":
+        return LRUCache(max_size=settings.cache_max_size, ttl=settings.cache_ttl)
+    if settings.cache_backend == "redis":
+        import redis
+        client = redis.Redis.from_url(settings.cache_redis_url)
+        return RedisCache(client, ttl=settings.cache_ttl, prefix=settings.cache_key_prefix)
+    if settings.cache_backend == "none":
+        return Cache()
+    raise ValueError(f"Неизвестный бэкенд кеша: {settings.cache_backend}")
+
+
+_cache: Optional[Cache] = None
+
+
+def get_cache() -> Cache:
+    """Зависимость FastAPI: общий для процесса экземпляр кеша."""
+    global _cache
+    if _cache is None:
+        _cache = create_cache(get_settings())
+    return _cache
+
+
+def user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def order_key(order_id: int) -> str:
+    return f"order:{order_id}"
@@ -1,71 +1,105 @@
-import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 
-from src.database.db import Base, get_db
-from src.main import app
-from src.models.orm_models import User, Order
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+class Settings(BaseSettings):
+    """
+    Настройки сервиса. Значения берутся из переменных окружения
+    (без учёта регистра, например DATABASE_URL) и файла .env.
+    """
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
-    Base.metadata.create_all(engine)
+    # База данных
+    database_url: str = "sqlite:///./test.db"
+    # Если не задан, выводится из database_url (sqlite -> aiosqlite, postgresql -> asyncpg)
+    async_database_url: Optional[str] = None
+    use_async_db: bool = False
+    # Реплики для чтения синхронными GET-обработчиками, в окружении — JSON:
+    # READ_REPLICA_URLS='["sqlite:///./replica-1.db"]'; запись — в database_url
+    read_replica_urls: List[str] = Field(default_factory=list)
+    # Как часто проверять здоровье реплик (0 — только при старте)
+    replica_health_interval: float = Field(default=5.0, ge=0)
+    # Сколько секунд после записи клиента его чтения идут в основную базу
+    read_your_writes_window: float = Field(default=5.0, ge=0)
+    # Шарды пользователей и заказов: имя -> URL, в окружении — JSON:
+    # SHARD_URLS='{"s0": "sqlite:///./shard-0.db", "s1": "sqlite:///./shard-1.db"}'.
+    # Если заданы, database_url не используется (src/database/sharding.py)
+    shard_urls: Dict[str, str] = Field(default_factory=dict)
+    # Как часто перечитывать карту слотов шардов
+    shard_map_refresh_interval: float = Field(default=5.0, gt=0)
 
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = TestingSessionLocal()
+    # Пул соединений; pool_size по умолчанию равен threadpool_size,
+    # чтобы каждому потоку обработчиков хватало соединения
+    pool_size: Optional[int] = Field(default=None, ge=1)
+    max_overflow: int = Field(default=10, ge=0)
+    pool_timeout: float = Field(default=30.0, gt=0)
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
 
-    try:
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(engine)
+    # SQLite
+    sqlite_pragma_profile: str = "production"
+    # Точечные переопределения PRAGMA, в окружении — JSON: SQLITE_PRAGMAS='{"cache_size": -20000}'
+    sqlite_pragmas: Dict[str, Any] = Field(default_factory=dict)
 
+    # Сервер
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # Число процессов-воркеров; если не задано — по числу доступных CPU
+    workers: Optional[int] = Field(default=None, ge=1)
+    # Event loop и HTTP-парсер uvicorn: auto — uvloop/httptools, если установлены
+    server_loop: str = "auto"
+    server_http: str = "auto"
+    # Очередь ещё не принятых соединений (listen backlog)
+    backlog: int = Field(default=2048, ge=1)
+    # Сколько секунд держать простаивающее keep-alive соединение
+    keep_alive_timeout: int = Field(default=5, ge=1)
+    # Сколько секунд после SIGTERM ждать завершения начатых запросов
+    graceful_timeout: int = Field(default=30, ge=1)
+    # Размер пула потоков, в котором FastAPI выполняет синхронные обработчики
+    threadpool_size: int = Field(default=40, ge=1)
 
-@pytest.fixture(scope="function")
-def client(db_session):
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    # Кеш ответов GET /users/{id} и GET /orders/{id}: memory | redis | none
+    cache_backend: str = "memory"
+    cache_max_size: int = Field(default=10_000, ge=1)
+    cache_ttl: float = Field(default=60.0, gt=0)
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_key_prefix: str = "uos:"
 
-    app.dependency_overrides[get_db] = override_get_db
+    # Метрики запросов (/metrics); заголовок Server-Timing — только по
+    # запросу: его сборка и отправка на каждый ответ заметно дороже самих метрик
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = False
 
-    with TestClient(app) as test_client:
-        yield test_client
+    # Idempotency-Key в POST /orders: сколько секунд хранится ответ
+    # и как часто удалять просроченные ключи (0 — не удалять из сервиса)
+    idempotency_ttl: float = Field(default=86400.0, gt=0)
+    idempotency_purge_interval: float = Field(default=3600.0, ge=0)
 
-    app.dependency_overrides.clear()
+    # Групповая фиксация POST /orders: заказы из параллельных запросов
+    # записываются одной транзакцией — по group_commit_max_batch штук или
+    # спустя group_commit_max_latency_ms после первого заказа пачки
+    group_commit_enabled: bool = False
+    group_commit_max_batch: int = Field(default=100, ge=1)
+    group_commit_max_latency_ms: float = Field(default=5.0, ge=0)
 
+    @property
+    def effective_pool_size(self) -> int:
+        return self.pool_size or self.threadpool_size
 
-@pytest.fixture(scope="function")
-def test_user(db_session):
-    user = User(
-        username="testuser",
-        email="test@example.com",
-        age=30
-    )
-    db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
-    return user
+    @property
+    def effective_workers(self) -> int:
+        if self.workers:
+            return self.workers
+        # Учитываем ограничение процесса по CPU (taskset, cgroup cpuset), где оно доступно
+        if hasattr(os, "sched_getaffinity"):
+            return max(1, len(os.sched_getaffinity(0)))
+        return os.cpu_count() or 1
 
 
-@pytest.fixture(scope="function")
-def test_order(db_session, test_user):
-    order = Order(
-        user_id=test_user.id,
-        product_name="Test Product",
-        quantity=1
-    )
-    db_session.add(order)
-    db_session.commit()
-    db_session.refresh(order)
-    return order
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
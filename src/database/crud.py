@@ -0,0 +1,257 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Row, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Insert, Select
+
+from src.database.summary import record_orders
+from src.models.orm_models import User, Order
+from src.models.pydantic_models import BulkItemResult, OrderCreate, UserCreate
+
+# Размер пачки для IN (...): держимся ниже лимита параметров SQLite (999 в старых сборках)
+IN_CHUNK_SIZE = 500
+
+# Сколько раз повторять пакетную вставку, если параллельная запись
+# нарушила уникальность между проверкой и INSERT
+BULK_INSERT_RETRIES = 3
+
+USER_DUPLICATE_ERROR = "Пользователь с таким username или email уже существует"
+USER_NOT_FOUND_ERROR = "Пользователь не найден"
+
+
+USER_COLUMNS = (User.id, User.username, User.email, User.age)
+ORDER_COLUMNS = (Order.id, Order.user_id, Order.product_name, Order.quantity)
+
+
+def insert_user_statement(user: UserCreate, user_id: Optional[int] = None) -> Insert:
+    """user_id — заранее выданный id (шардирование); по умолчанию id назначает база."""
+    values = {"username": user.username, "email": user.email, "age": user.age}
+    if user_id is not None:
+        values["id"] = user_id
+    return insert(User).values(**values).returning(*USER_COLUMNS)
+
+
+def insert_order_statement(order: OrderCreate, order_id: Optional[int] = None) -> Insert:
+    """
+    INSERT ... RETURNING вместо add/commit/refresh: одно выражение на заказ.
+    Существование пользователя проверяет внешний ключ orders.user_id.
+    order_id — заранее выданный id, как в insert_user_statement.
+    """
+    values = {"user_id": order.user_id, "product_name": order.product_name, "quantity": order.quantity}
+    if order_id is not None:
+        values["id"] = order_id
+    return insert(Order).values(**values).returning(*ORDER_COLUMNS)
+
+
+def user_orders_statement(user_id: int) -> Select:
+    """
+    Заказы пользователя и признак его существования одним запросом:
+    LEFT JOIN от users даёт ноль строк, если пользователя нет,
+    и одну строку с пустым заказом, если заказов нет.
+    Служебные owner_id и orders_version (для ETag) идут последними,
+    чтобы строки совпадали по порядку колонок с ORDER_COLUMNS.
+    """
+    return (
+        select(*ORDER_COLUMNS, User.id.label("owner_id"), User.orders_version)
+        .outerjoin(Order, Order.user_id == User.id)
+        .where(User.id == user_id)
+        .order_by(Order.id)
+    )
+
+
+def user_exists_statement(user_id: int) -> Select:
+    """
+    Поиск пользователя по первичному ключу. Вставка заказа его не делает:
+    запрос нужен только после IntegrityError, чтобы отличить отсутствующего
+    пользователя от других нарушений ограничений.
+    """
+    return select(User.id).where(User.id == user_id)
+
+
+def user_version_statement(user_id: int) -> Select:
+    """Версии пользователя и его списка заказов (If-None-Match): поиск по первичному ключу."""
+    return select(User.version, User.orders_version).where(User.id == user_id)
+
+
+def order_version_statement(order_id: int) -> Select:
+    """Версии заказа и его пользователя (If-None-Match): два поиска по первичным ключам."""
+    return (
+        select(Order.version, User.version.label("user_version"))
+        .join(User, Order.user_id == User.id)
+        .where(Order.id == order_id)
+    )
+
+
+def orders_from_user_rows(rows: Sequence[Row]) -> Optional[List[Row]]:
+    """Разбирает результат user_orders_statement; None — пользователя нет."""
+    if not rows:
+        return None
+    return [row for row in rows if row.id is not None]
+
+
+def create_user(db: Session, user: UserCreate, user_id: Optional[int] = None, on_insert=None) -> Row:
+    """
+    Вставляет пользователя; IntegrityError при нарушении уникальности.
+    user_id и on_insert — как у create_order.
+    """
+    try:
+        row = db.execute(insert_user_statement(user, user_id)).one()
+        if on_insert is not None:
+            on_insert(row)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    return row
+
+
+def create_order(db: Session, order: OrderCreate, on_insert=None, order_id: Optional[int] = None) -> Row:
+    """
+    Вставляет заказ и обновляет сводки заказов той же транзакцией;
+    IntegrityError, если пользователя не существует. on_insert(row)
+    вызывается после вставки в той же транзакции. order_id — заранее
+    выданный id (шардирование).
+    """
+    try:
+        row = db.execute(insert_order_statement(order, order_id)).one()
+        record_orders(db, [(row.user_id, row.product_name, row.quantity)])
+        if on_insert is not None:
+            on_insert(row)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise
+    return row
+
+
+def get_user_orders(db: Session, user_id: int) -> Optional[List[Row]]:
+    return orders_from_user_rows(db.execute(user_orders_statement(user_id)).all())
+
+
+def chunked(values: Sequence, size: int = IN_CHUNK_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def by_ids_statements(columns: Sequence, id_column, ids: Sequence[int]) -> Iterable[Select]:
+    """
+    Запросы WHERE id IN (...) для пакетного чтения по списку id:
+    повторы убираются, список режется на пачки по IN_CHUNK_SIZE.
+    """
+    for chunk in chunked(list(dict.fromkeys(ids)), IN_CHUNK_SIZE):
+        yield select(*columns).where(id_column.in_(chunk))
+
+
+def rows_by_ids(db: Session, columns: Sequence, id_column, ids: Sequence[int]) -> Dict[int, Row]:
+    """Строки с указанными id; отсутствующих id в словаре нет."""
+    found = {}
+    for statement in by_ids_statements(columns, id_column, ids):
+        found.update((row.id, row) for row in db.execute(statement))
+    return found
+
+
+def _existing_user_keys(db: Session, usernames: List[str], emails: List[str]) -> Tuple[Set[str], Set[str]]:
+    taken_usernames, taken_emails = set(), set()
+    for names in chunked(usernames):
+        taken_usernames.update(db.scalars(select(User.username).where(User.username.in_(names))))
+    for addresses in chunked(emails):
+        taken_emails.update(db.scalars(select(User.email).where(User.email.in_(addresses))))
+    return taken_usernames, taken_emails
+
+
+def _existing_user_ids(db: Session, user_ids: List[int]) -> Set[int]:
+    found = set()
+    for ids in chunked(user_ids):
+        found.update(db.scalars(select(User.id).where(User.id.in_(ids))))
+    return found
+
+
+def _insert_returning_ids(db: Session, model, rows: List[Dict]) -> List[int]:
+    """
+    Многострочный INSERT ... RETURNING id; id возвращаются в порядке строк.
+    """
+    if not rows:
+        return []
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.scalars(statement, rows))
+
+
+def _bulk_create(db: Session, results: Dict[int, BulkItemResult], plan,
+                 on_insert=None) -> List[BulkItemResult]:
+    """
+    Общая часть пакетной вставки: plan() отбирает строки для вставки и
+    заполняет ошибки в results, затем всё вставляется одной транзакцией.
+    on_insert(rows) вызывается после вставки в той же транзакции.
+    При гонке с параллельной записью транзакция повторяется целиком.
+    """
+    for attempt in range(BULK_INSERT_RETRIES):
+        rejected = {}
+        indexes, model, rows = plan(rejected)
+        try:
+            ids = _insert_returning_ids(db, model, rows)
+            if on_insert is not None and rows:
+                on_insert(rows)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            if attempt == BULK_INSERT_RETRIES - 1:
+                raise
+            continue
+
+        results.update(rejected)
+        for index, new_id in zip(indexes, ids):
+            results[index] = BulkItemResult(index=index, status="created", id=new_id)
+        return [results[index] for index in sorted(results)]
+
+
+def bulk_create_users(db: Session, items: Dict[int, UserCreate],
+                      results: Dict[int, BulkItemResult]) -> List[BulkItemResult]:
+    """
+    Вставляет валидные элементы пакета одной транзакцией.
+
+    items — валидные элементы по их индексу в запросе, results — уже
+    известные ошибки (например, валидации). Конфликты уникальности, в том
+    числе внутри самого пакета, отмечаются статусом duplicate.
+    """
+    def plan(rejected):
+        taken_usernames, taken_emails = _existing_user_keys(
+            db,
+            list({user.username for user in items.values()}),
+            list({user.email for user in items.values()}),
+        )
+        indexes, rows = [], []
+        for index, user in items.items():
+            if user.username in taken_usernames or user.email in taken_emails:
+                rejected[index] = BulkItemResult(index=index, status="duplicate", error=USER_DUPLICATE_ERROR)
+                continue
+            taken_usernames.add(user.username)
+            taken_emails.add(user.email)
+            indexes.append(index)
+            rows.append({"username": user.username, "email": user.email, "age": user.age})
+        return indexes, User, rows
+
+    return _bulk_create(db, results, plan)
+
+
+def bulk_create_orders(db: Session, items: Dict[int, OrderCreate],
+                       results: Dict[int, BulkItemResult]) -> List[BulkItemResult]:
+    """
+    Вставляет валидные заказы пакета одной транзакцией; заказы
+    несуществующих пользователей отмечаются статусом user_not_found.
+    """
+    def plan(rejected):
+        known_users = _existing_user_ids(db, list({order.user_id for order in items.values()}))
+        indexes, rows = [], []
+        for index, order in items.items():
+            if order.user_id not in known_users:
+                rejected[index] = BulkItemResult(index=index, status="user_not_found", error=USER_NOT_FOUND_ERROR)
+                continue
+            indexes.append(index)
+            rows.append({"user_id": order.user_id, "product_name": order.product_name, "quantity": order.quantity})
+        return indexes, Order, rows
+
+    def update_summary(rows):
+        record_orders(db, ((row["user_id"], row["product_name"], row["quantity"]) for row in rows))
+
+    return _bulk_create(db, results, plan, on_insert=update_summary)
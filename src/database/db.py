@@ -1,36 +1,323 @@
-from sqlalchemy import create_engine
+import asyncio
+import os
+import re
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+import anyio
+from fastapi import Request
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from src.config import Settings, get_settings
+from src.database.replicas import PRIMARY_COOKIE, Replica, ReplicaPool, pinned_to_primary
+from src.metrics import instrument_engine, record_session_wait, registry
+# Единственный declarative Base живёт в моделях; здесь он реэкспортируется
+# для кода, который импортирует Base из db
+from src.models.orm_models import Base  # noqa: F401
+# Регистрирует создание orders_fts вместе с таблицей orders в create_all
+import src.database.fulltext  # noqa: F401
+
+settings = get_settings()
+
+DATABASE_URL = settings.database_url
+
+# Асинхронный стек подключается только по явному флагу
+USE_ASYNC_DB = settings.use_async_db
+
+# Асинхронные драйверы по бэкенду URL
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+# Наборы PRAGMA, которые применяются к каждому соединению SQLite.
+# default — только проверка внешних ключей (поведение без тюнинга),
+# production — WAL (читатели не блокируются писателем), synchronous=NORMAL
+# (в WAL-режиме безопасно при сбое процесса), кеш страниц и mmap.
+SQLITE_PRAGMA_PROFILES = {
+    "default": {
+        "foreign_keys": "ON",
+    },
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        "cache_size": -64000,  # в КиБ: 64 МБ кеша страниц
+        "mmap_size": 268435456,  # 256 МБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # мс
+    },
+}
+
+SQLITE_PRAGMA_PROFILE = settings.sqlite_pragma_profile
+
+_PRAGMA_VALUE_RE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def sqlite_pragmas(profile: str, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Собирает PRAGMA профиля с учётом точечных переопределений."""
+    if profile not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(f"Неизвестный профиль PRAGMA: {profile}")
+    pragmas = dict(SQLITE_PRAGMA_PROFILES[profile])
+    pragmas.update(overrides or {})
+    for name, value in pragmas.items():
+        # PRAGMA не поддерживает параметры, поэтому значения проверяем сами
+        if not _PRAGMA_VALUE_RE.match(name) or not _PRAGMA_VALUE_RE.match(str(value)):
+            raise ValueError(f"Некорректная PRAGMA: {name}={value}")
+    return pragmas
+
 
-DATABASE_URL = "sqlite:///./test.db"
+def apply_sqlite_pragmas(engine: Engine, profile: Optional[str] = None,
+                         overrides: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Применяет профиль PRAGMA к каждому новому соединению пула.
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    Большинство PRAGMA (foreign_keys, cache_size, synchronous...) действуют
+    только на текущее соединение, поэтому выставляются в событии connect.
+    Для других СУБД ничего не делает.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    if profile is None:
+        profile = SQLITE_PRAGMA_PROFILE
+        overrides = {**settings.sqlite_pragmas, **(overrides or {})}
+    pragmas = sqlite_pragmas(profile, overrides)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def is_sqlite_memory(url: str) -> bool:
+    parsed = make_url(url)
+    database = parsed.database or ""
+    return database in ("", ":memory:") or parsed.query.get("mode") == "memory"
+
+
+def engine_options(url: str, settings: Settings) -> Dict[str, Any]:
+    """
+    Параметры create_engine/create_async_engine для бэкенда из url.
+
+    - SQLite в памяти: StaticPool — одно соединение на процесс, иначе
+      каждое новое соединение видело бы свою пустую базу;
+    - файл SQLite: пул размером с пул потоков обработчиков, чтобы потоки
+      не ждали соединений (recycle и pre-ping для файла не нужны);
+    - серверные СУБД: QueuePool с pre-ping и recycle из настроек.
+    Для асинхронных драйверов SQLAlchemy сам подменяет QueuePool
+    на AsyncAdaptedQueuePool, поэтому класс пула там не указываем.
+    """
+    parsed = make_url(url)
+    pool_args = {
+        "pool_size": settings.effective_pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+    }
+    if not parsed.get_dialect().is_async:
+        pool_args["poolclass"] = QueuePool
+
+    if parsed.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        if is_sqlite_memory(url):
+            options["poolclass"] = StaticPool
+        else:
+            options.update(pool_args)
+        return options
+
+    return {
+        **pool_args,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+    }
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, settings))
+apply_sqlite_pragmas(engine)
+if settings.metrics_enabled:
+    instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
 
+def create_replica_engine(url: str) -> Engine:
+    replica_engine = create_engine(url, **engine_options(url, settings))
+    apply_sqlite_pragmas(replica_engine)
+    if settings.metrics_enabled:
+        instrument_engine(replica_engine)
+    return replica_engine
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+replica_pool = ReplicaPool([
+    Replica(make_url(url).render_as_string(hide_password=True), create_replica_engine(url))
+    for url in settings.read_replica_urls
+])
+
+
+# Ограничители числа одновременных сессий, по одному на event loop
+_session_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, anyio.CapacityLimiter]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _get_session_slots() -> anyio.CapacityLimiter:
+    loop = asyncio.get_running_loop()
+    slots = _session_slots.get(loop)
+    if slots is None:
+        slots = anyio.CapacityLimiter(settings.effective_pool_size + settings.max_overflow)
+        _session_slots[loop] = slots
+    return slots
+
+
+async def get_write_db():
+    """
+    Сессия основной базы для синхронных обработчиков записи.
+
+    Подключается как Depends(get_write_db, scope="function"), чтобы соединение
+    возвращалось в пул сразу после обработчика, а не после отправки ответа.
+
+    Слот берётся в event loop до того, как обработчик попадёт в пул потоков:
+    без ограничения потоки пула стояли бы в очереди за соединениями, а
+    запросы без сессии — за этими потоками. Ожидание слота попадает в
+    метрику db_session_wait_seconds, ожидание потока — в threadpool_wait_seconds.
+    """
+    started = time.perf_counter()
+    async with _get_session_slots():
+        record_session_wait(time.perf_counter() - started)
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+async def get_read_db(request: Request):
+    """
+    Сессия для синхронных обработчиков чтения: реплика из replica_pool
+    по кругу, а если реплик нет, все нездоровы или клиент недавно писал
+    (cookie PRIMARY_COOKIE) — основная база. Ограничение слотов то же,
+    что у get_write_db.
+    """
+    started = time.perf_counter()
+    async with _get_session_slots():
+        record_session_wait(time.perf_counter() - started)
+        replica = None
+        if replica_pool and not pinned_to_primary(
+                request.cookies.get(PRIMARY_COOKIE), settings.read_your_writes_window):
+            replica = replica_pool.choose()
+        db = (replica.session_factory if replica is not None else SessionLocal)()
+        if settings.metrics_enabled:
+            registry.read_sessions.inc((replica.name if replica is not None else "primary",))
+        try:
+            yield db
+        except OperationalError as exc:
+            # Реплика недоступна или без нужной схемы: следующие чтения
+            # идут на другие, пока фоновая проверка не вернёт её
+            if replica is not None:
+                replica_pool.mark_down(replica, str(exc.orig))
+            raise
+        finally:
+            db.close()
+
+
+def to_async_url(url: str) -> str:
+    """
+    Переводит URL базы данных на асинхронный драйвер по бэкенду:
+    sqlite[+pysqlite] -> sqlite+aiosqlite, postgresql[+psycopg2] -> postgresql+asyncpg.
+
+    URL с асинхронным драйвером (aiosqlite, asyncpg, psycopg_async...)
+    возвращается без изменений.
+    """
+    parsed = make_url(url)
+    if parsed.get_dialect().is_async:
+        return url
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Нет асинхронного драйвера для {parsed.drivername}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def async_database_url() -> str:
+    """URL асинхронного стека; вычисляется только при его включении."""
+    return settings.async_database_url or to_async_url(DATABASE_URL)
+
+
+_async_engine = None
+_async_session_local = None
+
+
+def get_async_engine():
+    """
+    Лениво создаёт AsyncEngine: модуль sqlalchemy.ext.asyncio и драйверы
+    aiosqlite/asyncpg нужны только при включённом асинхронном стеке.
+    """
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url = async_database_url()
+        _async_engine = create_async_engine(url, **engine_options(url, settings))
+        apply_sqlite_pragmas(_async_engine.sync_engine)
+        if settings.metrics_enabled:
+            instrument_engine(_async_engine.sync_engine)
+    return _async_engine
+
+
+def _dispose_engines_after_fork() -> None:
+    """
+    Соединения пула, открытые до fork, принадлежат родителю: если потомок
+    возьмёт их из унаследованного пула, два процесса будут писать в один
+    сокет или файловый дескриптор. dispose(close=False) забывает их в
+    потомке, не закрывая, — закрытие оборвало бы соединения родителя.
+    """
+    engine.dispose(close=False)
+    replica_pool.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+
+
+# uvicorn запускает воркеры через spawn, и каждый создаёт engine заново;
+# хук нужен серверам, которые форкают уже импортированное приложение
+# (gunicorn --preload, multiprocessing с fork)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+
+def get_async_sessionmaker():
+    global _async_session_local
+    if _async_session_local is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_session_local = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_local
+
+
+async def get_async_db():
+    # Тот же лимит, что и для синхронных сессий: запросы сверх размера пула
+    # ждут слота, а не упираются в pool_timeout при выдаче соединения
+    started = time.perf_counter()
+    async with _get_session_slots():
+        record_session_wait(time.perf_counter() - started)
+        async with get_async_sessionmaker()() as db:
+            yield db
 
 
 def init_db():
-    from src.models.orm_models import Base
-    Base.metadata.create_all(bind=engine)
+    from src.database.migrate import upgrade
+    upgrade(engine)
 
 
 def get_test_db():
     test_engine = create_engine("sqlite:///:memory:")
     TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
-    from src.models.orm_models import Base
     Base.metadata.create_all(bind=test_engine)
 
     db = TestSessionLocal()
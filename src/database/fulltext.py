@@ -0,0 +1,100 @@
+"""
+Полнотекстовый поиск заказов по product_name (SQLite FTS5).
+
+orders_fts — FTS5-таблица с внешним содержимым (content='orders'): она
+хранит только инвертированный индекс слов, а текст читает из orders по
+rowid = orders.id. Индекс обновляют триггеры на вставку, удаление и
+изменение названия в orders, в той же транзакции, что и сама запись.
+
+Таблица и триггеры создаются миграцией v0005, а в базах из
+Base.metadata.create_all (тесты) — вместе с таблицей orders. Для других
+СУБД полнотекстовый поиск не создаётся.
+
+Пересборка индекса по orders (например, после загрузки данных в обход
+триггеров):
+    python -m src.database.fulltext rebuild
+"""
+import argparse
+import re
+import sys
+from typing import Optional, Union
+
+from sqlalchemy import DDL, column, event, table
+from sqlalchemy.engine import Connection, Engine
+
+from src.models.orm_models import Order
+
+FTS_TABLE = "orders_fts"
+
+# rowid — id заказа; MATCH по таблице ищет во всех её колонках
+orders_fts = table(FTS_TABLE, column("rowid"), column("product_name"))
+
+CREATE_STATEMENTS = (
+    # unicode61 приводит к нижнему регистру и по умолчанию снимает диакритику
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"product_name, content='orders', content_rowid='id', tokenize='unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON orders BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, product_name) VALUES (new.id, new.product_name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON orders BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name) VALUES ('delete', old.id, old.product_name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF product_name ON orders BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name) VALUES ('delete', old.id, old.product_name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, product_name) VALUES (new.id, new.product_name); END",
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+for _statement in CREATE_STATEMENTS:
+    event.listen(Order.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Order.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite")
+)
+
+
+def match_query(text: str) -> Optional[str]:
+    """
+    Запрос FTS5 из пользовательской строки: каждое слово в кавычках,
+    слова через пробел (все должны встретиться). Операторы и кавычки
+    FTS5 из ввода не проходят. None — в строке нет слов.
+    """
+    words = _WORD_RE.findall(text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words)
+
+
+def is_fts_table(name: str) -> bool:
+    """Сама FTS-таблица или её служебные таблицы (orders_fts_data и т. п.)."""
+    return name == FTS_TABLE or name.startswith(f"{FTS_TABLE}_")
+
+
+def fulltext_supported(bind: Union[Connection, Engine]) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def rebuild_fulltext(conn: Connection) -> None:
+    """Пересобирает индекс orders_fts по текущему содержимому orders."""
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args(argv)
+
+    from src.database.db import engine
+    from src.database.migrate import check_schema_version
+    check_schema_version(engine)
+
+    with engine.begin() as conn:
+        if not fulltext_supported(conn):
+            print(f"Полнотекстовый поиск не поддерживается для {conn.dialect.name}")
+            return 1
+        rebuild_fulltext(conn)
+    print(f"Индекс {FTS_TABLE} пересобран")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
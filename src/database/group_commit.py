@@ -0,0 +1,171 @@
+"""
+Групповая фиксация вставок заказов (group commit).
+
+Каждый POST /orders по отдельности — это своя транзакция и свой commit,
+а в SQLite commit — это fsync и очередь за единственной блокировкой
+записи. В режиме group_commit_enabled обработчики ставят заказ в очередь
+процесса, и поток-писатель записывает накопившиеся заказы одной
+транзакцией через crud.bulk_create_orders: не больше
+group_commit_max_batch заказов и не дольше group_commit_max_latency_ms
+ожидания после первого заказа пачки.
+
+Гарантии те же, что и у отдельного commit: обработчик отвечает только
+после фиксации транзакции с его заказом, поэтому подтверждённый заказ
+переживает сбой процесса в той же мере (зависит от PRAGMA synchronous).
+Заказ несуществующего пользователя отклоняется сам по себе и не мешает
+остальным заказам пачки; ошибка записи или фиксации пачки достаётся
+всем её запросам, и ни один из её заказов не записан.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.config import Settings
+from src.database.crud import bulk_create_orders
+from src.metrics import registry
+from src.models.pydantic_models import BulkItemResult, OrderCreate
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending(NamedTuple):
+    order: OrderCreate
+    future: "Future[BulkItemResult]"
+
+
+# Метка остановки в очереди: всё, что поставлено до неё, будет записано
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Поток-писатель с очередью заказов. Результат заказа — BulkItemResult
+    со статусом created и id либо user_not_found; исключение пачки
+    передаётся каждому её запросу.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_batch: int = 100,
+                 max_latency: float = 0.005):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Дописывает уже принятые заказы и останавливает поток."""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, order: OrderCreate) -> "Future[BulkItemResult]":
+        future = Future()
+        # Под замком: заказ не может попасть в очередь после метки остановки
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("Групповая фиксация остановлена")
+            self._queue.put(_Pending(order, future))
+        return future
+
+    def create_order(self, order: OrderCreate) -> BulkItemResult:
+        """Для синхронных обработчиков: ждёт фиксации пачки с заказом."""
+        return self.submit(order).result()
+
+    async def create_order_async(self, order: OrderCreate) -> BulkItemResult:
+        # Отмена ожидания (клиент ушёл) снимает заказ, если пачка ещё не начата
+        return await asyncio.wrap_future(self.submit(order))
+
+    def _next_batch(self) -> Tuple[List[_Pending], bool]:
+        """Следующая пачка и признак остановки; ждёт первый заказ сколько угодно."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch:
+            try:
+                # Сначала забираем то, что уже накопилось, за время прошлой записи
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            # Отменённые до начала записи заказы не пишутся
+            batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch: List[_Pending]) -> None:
+        started = time.perf_counter()
+        results = {}
+        try:
+            with self.session_factory() as db:
+                bulk_create_orders(db, {index: item.order for index, item in enumerate(batch)}, results)
+        except Exception as exc:
+            # Транзакция пачки откатилась целиком: ни один заказ не записан
+            logger.warning("Не удалось записать пачку из %s заказов: %r", len(batch), exc)
+            for item in batch:
+                item.future.set_exception(exc)
+            return
+        registry.group_commit_batch.observe((), len(batch))
+        registry.group_commit_time.observe((), time.perf_counter() - started)
+        for index, item in enumerate(batch):
+            item.future.set_result(results[index])
+
+
+_writer: Optional[GroupCommitWriter] = None
+
+
+def start_order_writer(session_factory: Callable[[], Session], settings: Settings) -> Optional[GroupCommitWriter]:
+    """Запускает писатель процесса, если групповая фиксация включена."""
+    global _writer
+    if not settings.group_commit_enabled:
+        return None
+    _writer = GroupCommitWriter(
+        session_factory,
+        max_batch=settings.group_commit_max_batch,
+        max_latency=settings.group_commit_max_latency_ms / 1000,
+    )
+    _writer.start()
+    return _writer
+
+
+def stop_order_writer() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def get_order_writer() -> Optional[GroupCommitWriter]:
+    """Зависимость FastAPI: писатель процесса или None, если режим выключен."""
+    return _writer
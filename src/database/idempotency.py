@@ -0,0 +1,111 @@
+"""
+Хранилище ключей Idempotency-Key (таблица idempotency_keys).
+
+Ключ живёт idempotency_ttl секунд; просроченные ключи удаляются
+периодической задачей сервиса (purge_periodically) или вручную:
+    python -m src.database.idempotency purge
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from src.models.orm_models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Сколько ключей удаляется одним DELETE: короткие транзакции не держат
+# блокировку записи надолго
+PURGE_BATCH_SIZE = 1000
+
+
+def is_expired(stored: IdempotencyKey, ttl: float, now: Optional[float] = None) -> bool:
+    return stored.created_at < (time.time() if now is None else now) - ttl
+
+
+def find_key(db: Session, key: str) -> Optional[IdempotencyKey]:
+    return db.scalars(select(IdempotencyKey).where(IdempotencyKey.key == key)).first()
+
+
+def store_key(db: Session, key: str, request_hash: str, status_code: int, body: bytes) -> None:
+    """
+    Записывает ответ под ключом; не фиксирует транзакцию. Если ключ уже
+    записан параллельным запросом, уникальный индекс даёт IntegrityError
+    (в PostgreSQL — после того, как та транзакция зафиксирована).
+    """
+    db.execute(insert(IdempotencyKey).values(
+        key=key,
+        request_hash=request_hash,
+        status_code=status_code,
+        response_body=body,
+        created_at=time.time(),
+    ))
+
+
+def delete_key(db: Session, key: str) -> None:
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+
+
+def purge_expired(db: Session, ttl: float, now: Optional[float] = None) -> int:
+    """Удаляет просроченные ключи пачками по PURGE_BATCH_SIZE; возвращает число удалённых."""
+    cutoff = (time.time() if now is None else now) - ttl
+    total = 0
+    while True:
+        batch = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.created_at < cutoff)
+            .limit(PURGE_BATCH_SIZE)
+            .scalar_subquery()
+        )
+        deleted = db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(batch))).rowcount
+        db.commit()
+        total += deleted
+        if deleted < PURGE_BATCH_SIZE:
+            return total
+
+
+async def purge_periodically(session_factory: Callable[[], Session], ttl: float, interval: float) -> None:
+    """
+    Фоновая задача lifespan: раз в interval секунд удаляет просроченные
+    ключи. Запускается в каждом воркере; параллельные удаления безопасны.
+    """
+    from starlette.concurrency import run_in_threadpool
+
+    def purge() -> int:
+        with session_factory() as db:
+            return purge_expired(db, ttl)
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            deleted = await run_in_threadpool(purge)
+        except Exception:
+            logger.exception("Не удалось удалить просроченные ключи идемпотентности")
+            continue
+        if deleted:
+            logger.info("Удалено просроченных ключей идемпотентности: %s", deleted)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["purge"])
+    parser.parse_args(argv)
+
+    from src.config import get_settings
+    from src.database.db import SessionLocal, engine
+    from src.database.migrate import check_schema_version
+    check_schema_version(engine)
+
+    with SessionLocal() as db:
+        deleted = purge_expired(db, get_settings().idempotency_ttl)
+    print(f"Удалено просроченных ключей: {deleted}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Версионированные миграции схемы.
+
+Миграции — модули src/database/migrations/vNNNN_<имя>.py с функцией
+upgrade(conn); первая строка docstring модуля — описание. Применённые
+версии записываются в таблицу schema_version. Каждая миграция идёт
+отдельной транзакцией вместе с записью о себе, поэтому прерванный
+прогон не оставляет схему в промежуточном состоянии (в SQLite и
+PostgreSQL DDL транзакционен), а повторный — продолжает с места сбоя.
+
+Миграции запускаются один раз на выкладку, до старта сервиса:
+    python -m src.database.migrate upgrade
+    python -m src.database.migrate status
+
+Сам сервис при старте только сверяет версию и пишет в лог расхождения
+индексов с моделями (check_schema_version).
+"""
+import argparse
+import importlib
+import logging
+import pkgutil
+import re
+import sys
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+from src.database import migrations
+from src.database.schema import check_index_drift
+
+logger = logging.getLogger(__name__)
+
+_MODULE_RE = re.compile(r"^v(\d{4})_\w+$")
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    """Схема базы старше, чем нужно приложению."""
+
+
+class Migration(NamedTuple):
+    version: int
+    module: str
+
+
+def discover_migrations() -> List[Migration]:
+    """
+    Миграции по возрастанию версии. Модули находятся по именам файлов
+    и не импортируются: проверке версии при старте хватает номеров.
+    """
+    found = []
+    for info in pkgutil.iter_modules(migrations.__path__):
+        match = _MODULE_RE.match(info.name)
+        if match:
+            found.append(Migration(int(match.group(1)), f"{migrations.__name__}.{info.name}"))
+    found.sort()
+    versions = [migration.version for migration in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Повторяющиеся номера миграций: {versions}")
+    return found
+
+
+def head_version() -> int:
+    """Версия схемы, которую ожидает код (номер последней миграции)."""
+    found = discover_migrations()
+    return found[-1].version if found else 0
+
+
+def current_version(conn: Connection) -> int:
+    """Версия схемы базы; 0 — миграции не применялись."""
+    if not inspect(conn).has_table(schema_version.name):
+        return 0
+    return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(engine: Engine, target: Optional[int] = None) -> List[int]:
+    """
+    Применяет недостающие миграции до target (по умолчанию — до последней).
+    Возвращает номера применённых миграций.
+    """
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        version = current_version(conn)
+
+    applied = []
+    for migration in discover_migrations():
+        if migration.version <= version or (target is not None and migration.version > target):
+            continue
+        module = importlib.import_module(migration.module)
+        description = (module.__doc__ or migration.module).strip().splitlines()[0]
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            # Первичный ключ не даст двум параллельным прогонам записать
+            # одну версию дважды: второй откатится целиком
+            conn.execute(schema_version.insert().values(
+                version=migration.version,
+                description=description,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        logger.info("Применена миграция %04d: %s", migration.version, description)
+        applied.append(migration.version)
+    return applied
+
+
+def check_schema_version(engine: Engine) -> int:
+    """
+    Проверка при старте: запрос к schema_version и сверка индексов.
+
+    Схема старше кода — SchemaVersionError: обработчики упали бы на
+    отсутствующих таблицах и колонках. Схема новее кода (откат выкладки
+    после миграции) — только предупреждение: миграции пишутся так, чтобы
+    предыдущая версия сервиса продолжала работать. Для схемы ровно
+    версии кода расхождения индексов с моделями пишутся в лог
+    (check_index_drift) — старт они не останавливают.
+    """
+    head = head_version()
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < head:
+        raise SchemaVersionError(
+            f"Схема базы версии {version}, приложению нужна {head}; "
+            f"выполните python -m src.database.migrate upgrade"
+        )
+    if version > head:
+        logger.warning("Схема базы версии %s новее кода (%s)", version, head)
+    else:
+        check_index_drift(engine)
+    return version
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["upgrade", "status"])
+    parser.add_argument("--target", type=int, help="применить миграции только до этой версии")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from src.database.db import engine
+    from src.database.schema import find_index_drift
+    from src.database.summary import check_summary_initialized
+
+    if args.command == "upgrade":
+        applied = upgrade(engine, args.target)
+        if not applied:
+            print("Новых миграций нет")
+
+    with engine.connect() as conn:
+        version = current_version(conn)
+    print(f"Версия схемы: {version}, последняя миграция: {head_version()}")
+    problems = find_index_drift(engine)
+    for problem in problems:
+        print(f"Расхождение схемы: {problem}")
+    if version:
+        check_summary_initialized(engine)
+    return 1 if problems or version < head_version() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
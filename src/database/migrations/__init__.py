@@ -0,0 +1,8 @@
+"""
+Миграции схемы: vNNNN_<имя>.py, применяются по возрастанию номера
+(см. src/database/migrate.py).
+
+Таблицы в миграциях описываются снимком на момент миграции, а не
+импортом ORM-моделей: модели меняются, а уже применённая миграция
+должна делать то же, что и в день написания.
+"""
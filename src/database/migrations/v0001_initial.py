@@ -0,0 +1,65 @@
+"""Начальная схема: users, orders, сводки заказов
+
+Базы, созданные до появления миграций через Base.metadata.create_all,
+принимаются как есть: существующие таблицы и индексы пропускаются,
+недостающие создаются. Если сводные таблицы создаются на базе, где уже
+есть заказы, они сразу заполняются по orders.
+"""
+from sqlalchemy import Column, ForeignKey, Index, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("username", String(50), unique=True, nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+    Column("age", Integer, nullable=False),
+)
+
+orders = Table(
+    "orders", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("product_name", String(100), nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Index("ix_orders_user_id_id", "user_id", "id"),
+)
+
+user_order_stats = Table(
+    "user_order_stats", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("order_count", Integer, nullable=False, default=0),
+    Column("total_quantity", Integer, nullable=False, default=0),
+)
+
+product_order_stats = Table(
+    "product_order_stats", metadata,
+    Column("product_name", String(100), primary_key=True),
+    Column("order_count", Integer, nullable=False, default=0),
+    Column("total_quantity", Integer, nullable=False, default=0),
+)
+
+
+def _backfill_summary(conn: Connection) -> None:
+    conn.execute(user_order_stats.insert().from_select(
+        ["user_id", "order_count", "total_quantity"],
+        select(orders.c.user_id, func.count(orders.c.id), func.sum(orders.c.quantity)).group_by(orders.c.user_id),
+    ))
+    conn.execute(product_order_stats.insert().from_select(
+        ["product_name", "order_count", "total_quantity"],
+        select(orders.c.product_name, func.count(orders.c.id), func.sum(orders.c.quantity))
+        .group_by(orders.c.product_name),
+    ))
+
+
+def upgrade(conn: Connection) -> None:
+    summary_existed = inspect(conn).has_table(product_order_stats.name)
+    metadata.create_all(conn, checkfirst=True)
+    # create_all не добавляет индексы в уже существующие таблицы
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    if not summary_existed:
+        _backfill_summary(conn)
@@ -0,0 +1,19 @@
+"""Таблица idempotency_keys для заголовка Idempotency-Key"""
+from sqlalchemy import Column, Float, Index, Integer, LargeBinary, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+idempotency_keys = Table(
+    "idempotency_keys", metadata,
+    Column("key", String(255), primary_key=True),
+    Column("request_hash", String(64), nullable=False),
+    Column("status_code", Integer, nullable=False),
+    Column("response_body", LargeBinary, nullable=False),
+    Column("created_at", Float, nullable=False),
+    Index("ix_idempotency_keys_created_at", "created_at"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn)
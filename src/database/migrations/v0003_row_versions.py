@@ -0,0 +1,30 @@
+"""Версии строк users/orders и версия списка заказов пользователя для ETag
+
+Существующие строки получают версию 1, а orders_version — число уже
+сделанных заказов пользователя (из сводки user_order_stats). Колонки,
+которые уже есть (база создана через create_all по текущим моделям),
+пропускаются.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+
+COLUMNS = (
+    ("users", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("users", "orders_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("orders", "version", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    inspector = inspect(conn)
+    added = set()
+    for table, column, definition in COLUMNS:
+        if column in {existing["name"] for existing in inspector.get_columns(table)}:
+            continue
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        added.add((table, column))
+    if ("users", "orders_version") in added:
+        conn.exec_driver_sql(
+            "UPDATE users SET orders_version = COALESCE("
+            "(SELECT order_count FROM user_order_stats WHERE user_order_stats.user_id = users.id), 0)"
+        )
@@ -0,0 +1,17 @@
+"""Индекс orders(product_name, id) для поиска заказов по началу названия товара"""
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+orders = Table(
+    "orders", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("product_name", String(100), nullable=False),
+)
+
+ix_orders_product_name_id = Index("ix_orders_product_name_id", orders.c.product_name, orders.c.id)
+
+
+def upgrade(conn: Connection) -> None:
+    ix_orders_product_name_id.create(conn, checkfirst=True)
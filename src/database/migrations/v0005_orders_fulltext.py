@@ -0,0 +1,26 @@
+"""Полнотекстовый индекс orders_fts по product_name (SQLite FTS5) и триггеры синхронизации
+
+Индекс сразу заполняется по уже существующим заказам. На других СУБД
+миграция ничего не делает.
+"""
+from sqlalchemy.engine import Connection
+
+STATEMENTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5("
+    "product_name, content='orders', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS orders_fts_ai AFTER INSERT ON orders BEGIN "
+    "INSERT INTO orders_fts(rowid, product_name) VALUES (new.id, new.product_name); END",
+    "CREATE TRIGGER IF NOT EXISTS orders_fts_ad AFTER DELETE ON orders BEGIN "
+    "INSERT INTO orders_fts(orders_fts, rowid, product_name) VALUES ('delete', old.id, old.product_name); END",
+    "CREATE TRIGGER IF NOT EXISTS orders_fts_au AFTER UPDATE OF product_name ON orders BEGIN "
+    "INSERT INTO orders_fts(orders_fts, rowid, product_name) VALUES ('delete', old.id, old.product_name); "
+    "INSERT INTO orders_fts(rowid, product_name) VALUES (new.id, new.product_name); END",
+)
+
+
+def upgrade(conn: Connection) -> None:
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in STATEMENTS:
+        conn.exec_driver_sql(statement)
+    conn.exec_driver_sql("INSERT INTO orders_fts(orders_fts) VALUES ('rebuild')")
@@ -0,0 +1,29 @@
+"""Таблица shard_slots и 64-битные id пользователей и заказов для шардирования
+
+В SQLite INTEGER уже 64-битный, меняется только PostgreSQL: id и
+ссылки на пользователя переводятся в BIGINT.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+shard_slots = Table(
+    "shard_slots", metadata,
+    Column("slot", Integer, primary_key=True, autoincrement=False),
+    Column("state", String(16), nullable=False, server_default="active"),
+)
+
+BIGINT_COLUMNS = (
+    ("users", "id"),
+    ("orders", "id"),
+    ("orders", "user_id"),
+    ("user_order_stats", "user_id"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn)
+    if conn.dialect.name == "postgresql":
+        for table, column in BIGINT_COLUMNS:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT")
@@ -0,0 +1,218 @@
+"""
+Поиск заказов (GET /orders/search): фильтры, полнотекстовый поиск по
+названию товара, сортировка по id, названию товара или релевантности и
+keyset-пагинация.
+
+Разрешены только сочетания фильтров из SEARCH_PLANS. У каждого есть
+объявленный индекс, по которому ищутся строки (индекс модели Order или
+полнотекстовый orders_fts), поэтому ни один разрешённый поиск не обходит
+таблицу orders целиком. Индекс задаёт и допустимые сортировки: страница
+читается в порядке индекса, без сортировки всех найденных строк (кроме
+rank — релевантность считается для каждого совпадения). Это проверяется
+через EXPLAIN QUERY PLAN в tests/unit/test_order_search.py. Фильтр по
+количеству сам по себе почти ничего не отсекает и поэтому допускается
+только вместе с другими.
+
+Релевантность — bm25 из FTS5 (меньше — лучше). Она зависит от
+статистики всего индекса, поэтому новые заказы, добавленные между
+запросами страниц, могут сдвинуть границу страницы при сортировке rank.
+"""
+from enum import Enum
+from typing import Dict, FrozenSet, NamedTuple, Optional, Union
+
+from sqlalchemy import and_, func, literal_column, or_, select, union_all
+from sqlalchemy.sql import CompoundSelect, Select
+
+from src.database.crud import ORDER_COLUMNS
+from src.database.fulltext import FTS_TABLE, match_query, orders_fts
+from src.models.orm_models import Order
+
+
+class OrderSort(str, Enum):
+    id = "id"
+    id_desc = "-id"
+    # По названию товара, затем по id: порядок индекса ix_orders_product_name_id
+    product = "product"
+    # По релевантности полнотекстового поиска, только вместе с q
+    rank = "rank"
+
+
+USER_ID = "user_id"
+PRODUCT_PREFIX = "product_prefix"
+QUANTITY = "quantity"
+TEXT = "q"
+
+# Разрешённое сочетание фильтров -> индекс, с которого начинается поиск
+SEARCH_PLANS: Dict[FrozenSet[str], str] = {
+    frozenset({USER_ID}): "ix_orders_user_id_id",
+    frozenset({USER_ID, QUANTITY}): "ix_orders_user_id_id",
+    frozenset({USER_ID, PRODUCT_PREFIX}): "ix_orders_user_id_id",
+    frozenset({USER_ID, PRODUCT_PREFIX, QUANTITY}): "ix_orders_user_id_id",
+    frozenset({PRODUCT_PREFIX}): "ix_orders_product_name_id",
+    frozenset({PRODUCT_PREFIX, QUANTITY}): "ix_orders_product_name_id",
+    frozenset({TEXT}): FTS_TABLE,
+    frozenset({TEXT, USER_ID}): FTS_TABLE,
+    frozenset({TEXT, QUANTITY}): FTS_TABLE,
+    frozenset({TEXT, USER_ID, QUANTITY}): FTS_TABLE,
+}
+
+# Индекс -> сортировки, которые он отдаёт без отдельной сортировки строк
+INDEX_SORTS: Dict[str, FrozenSet[OrderSort]] = {
+    "ix_orders_user_id_id": frozenset({OrderSort.id, OrderSort.id_desc}),
+    "ix_orders_product_name_id": frozenset({OrderSort.product}),
+    FTS_TABLE: frozenset({OrderSort.id, OrderSort.id_desc, OrderSort.rank}),
+}
+
+
+class SearchError(ValueError):
+    """Недопустимые параметры поиска; обработчик отвечает 400 с этим текстом."""
+
+
+class OrderSearch(NamedTuple):
+    user_id: Optional[int] = None
+    # Начало названия товара, с учётом регистра
+    product_prefix: Optional[str] = None
+    min_quantity: Optional[int] = None
+    max_quantity: Optional[int] = None
+    # Слова, которые должны встретиться в названии товара (полнотекстовый поиск)
+    q: Optional[str] = None
+
+    def filters(self) -> FrozenSet[str]:
+        active = set()
+        if self.user_id is not None:
+            active.add(USER_ID)
+        if self.product_prefix is not None:
+            active.add(PRODUCT_PREFIX)
+        if self.min_quantity is not None or self.max_quantity is not None:
+            active.add(QUANTITY)
+        if self.q is not None:
+            active.add(TEXT)
+        return frozenset(active)
+
+
+def search_index(search: OrderSearch) -> str:
+    """Индекс для сочетания фильтров поиска; SearchError, если сочетание не разрешено."""
+    filters = search.filters()
+    if not filters:
+        raise SearchError("Укажите хотя бы один фильтр: user_id, product_prefix или q")
+    index = SEARCH_PLANS.get(filters)
+    if index is None:
+        if filters == {QUANTITY}:
+            raise SearchError("Фильтр по количеству используется только вместе с user_id, product_prefix или q")
+        raise SearchError("Фильтры q и product_prefix нельзя использовать вместе")
+    if search.q is not None and match_query(search.q) is None:
+        raise SearchError("В запросе q нет ни одного слова")
+    if (search.min_quantity is not None and search.max_quantity is not None
+            and search.min_quantity > search.max_quantity):
+        raise SearchError("min_quantity не может быть больше max_quantity")
+    return index
+
+
+def default_sort(search: OrderSearch) -> OrderSort:
+    """Сортировка без параметра sort: rank с q, иначе первая доступная по индексу поиска."""
+    if search.q is not None:
+        return OrderSort.rank
+    if SEARCH_PLANS.get(search.filters()) == "ix_orders_product_name_id":
+        return OrderSort.product
+    return OrderSort.id
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Наименьшая строка, которая больше всех строк с началом prefix:
+    'Lap' -> 'Laq'. Пара условий >= prefix и < границы — это диапазон по
+    индексу; LIKE 'Lap%' в SQLite по умолчанию не учитывает регистр и
+    индекс с обычным сравнением не использует. None — границы нет.
+    """
+    chars = list(prefix)
+    while chars:
+        last = ord(chars.pop())
+        if last < 0x10FFFF:
+            return "".join(chars) + chr(last + 1)
+    return None
+
+
+def search_statement(search: OrderSearch, sort: OrderSort = OrderSort.id,
+                     after_id: Optional[int] = None, limit: int = 100,
+                     after_score: Optional[float] = None,
+                     after_product: Optional[str] = None) -> Union[Select, CompoundSelect]:
+    """
+    Запрос страницы поиска. Сочетание фильтров проверяется заранее
+    (search_index). after_id — id последнего заказа предыдущей страницы
+    (при сортировке rank — вместе с его релевантностью after_score, при
+    сортировке product — с названием товара after_product): следующая
+    страница начинается после него в порядке сортировки.
+    С q в строках запроса последней колонкой идёт релевантность score.
+    """
+    index = search_index(search)
+    if sort is OrderSort.rank and search.q is None:
+        raise SearchError("Сортировка rank доступна только вместе с q")
+    if sort not in INDEX_SORTS[index]:
+        if sort is OrderSort.product:
+            raise SearchError("Сортировка product доступна только для product_prefix без user_id и q")
+        raise SearchError("Для product_prefix без user_id доступна только сортировка product")
+
+    if search.q is not None:
+        # Строки находит FTS-индекс, orders читается по первичному ключу;
+        # сортировка по id — по rowid индекса, без отдельной сортировки
+        score = func.bm25(literal_column(FTS_TABLE))
+        statement = (
+            select(*ORDER_COLUMNS, score.label("score"))
+            .select_from(orders_fts)
+            .join(Order, Order.id == orders_fts.c.rowid)
+            .where(literal_column(FTS_TABLE).op("MATCH")(match_query(search.q)))
+        )
+        id_column = orders_fts.c.rowid
+    else:
+        statement = select(*ORDER_COLUMNS)
+        id_column = Order.id
+    if search.user_id is not None:
+        statement = statement.where(Order.user_id == search.user_id)
+    # Страница после курсора сортировки product начинается с названия
+    # курсора, а не с начала префикса
+    product_cursor = sort is OrderSort.product and after_id is not None and after_product is not None
+    if search.product_prefix is not None:
+        upper = prefix_upper_bound(search.product_prefix)
+        if product_cursor and not (search.product_prefix <= after_product
+                                   and (upper is None or after_product < upper)):
+            # Курсор другого запроса: молча начать с первой страницы нельзя,
+            # клиент листал бы её по кругу
+            raise SearchError("Курсор не соответствует product_prefix")
+        if not product_cursor:
+            statement = statement.where(Order.product_name >= search.product_prefix)
+        if upper is not None:
+            statement = statement.where(Order.product_name < upper)
+    if search.min_quantity is not None:
+        statement = statement.where(Order.quantity >= search.min_quantity)
+    if search.max_quantity is not None:
+        statement = statement.where(Order.quantity <= search.max_quantity)
+
+    if sort is OrderSort.rank:
+        if after_id is not None and after_score is not None:
+            statement = statement.where(or_(
+                score > after_score,
+                and_(score == after_score, id_column > after_id),
+            ))
+        statement = statement.order_by(score, id_column)
+    elif sort is OrderSort.product:
+        if product_cursor:
+            # (product_name, id) > курсора — двумя диапазонами индекса,
+            # которые сливаются без сортировки: по сравнению пары значений
+            # SQLite ищет только по product_name и перебрал бы все заказы
+            # с тем же названием до курсора
+            compound = union_all(
+                statement.where(Order.product_name == after_product, Order.id > after_id),
+                statement.where(Order.product_name > after_product),
+            )
+            columns = compound.selected_columns
+            return compound.order_by(columns.product_name, columns.id).limit(limit)
+        statement = statement.order_by(Order.product_name, Order.id)
+    elif sort is OrderSort.id_desc:
+        if after_id is not None:
+            statement = statement.where(id_column < after_id)
+        statement = statement.order_by(id_column.desc())
+    else:
+        if after_id is not None:
+            statement = statement.where(id_column > after_id)
+        statement = statement.order_by(id_column)
+    return statement.limit(limit)
@@ -0,0 +1,156 @@
+"""
+Чтение с реплик: GET-обработчики берут сессию get_read_db, запись идёт
+в основную базу через get_write_db.
+
+ReplicaPool раздаёт реплики по кругу (round-robin) и пропускает
+нездоровые. Реплика здорова, если к ней можно подключиться и её схема не
+старше кода; проверка выполняется при старте и затем фоном раз в
+replica_health_interval секунд. Реплика, на которой запрос упал с
+OperationalError, выключается сразу и возвращается следующей успешной
+проверкой. Если здоровых реплик нет, чтение идёт в основную базу.
+
+Реплики отстают от основной базы на время репликации, поэтому после
+записи клиента его чтения read_your_writes_window секунд идут в основную
+базу (read-your-writes): ReadYourWritesMiddleware ставит на успешный
+ответ POST/PUT/PATCH/DELETE cookie со временем окончания окна. Клиент без
+cookie (или другой клиент) может какое-то время не видеть чужую запись.
+Кеш ответов заполняется и при чтении с реплики, поэтому такая отставшая
+копия может прожить в кеше до cache_ttl после инвалидации записью.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Optional, Sequence
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.migrate import current_version, head_version
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_COOKIE = "uos_primary_until"
+
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class Replica:
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.healthy = True
+
+
+class ReplicaPool:
+    """Реплики для чтения с выбором по кругу среди здоровых."""
+
+    def __init__(self, replicas: Sequence[Replica] = ()):
+        self.replicas: List[Replica] = list(replicas)
+        self._lock = threading.Lock()
+        self._next = 0
+        self._head: Optional[int] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """Следующая здоровая реплика; None — здоровых нет, читать из основной базы."""
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+                if replica.healthy:
+                    return replica
+        return None
+
+    def mark_down(self, replica: Replica, reason: str) -> None:
+        if replica.healthy:
+            logger.warning("Реплика %s выключена: %s", replica.name, reason)
+        replica.healthy = False
+
+    def mark_up(self, replica: Replica) -> None:
+        if not replica.healthy:
+            logger.info("Реплика %s снова доступна", replica.name)
+        replica.healthy = True
+
+    def check(self, replica: Replica) -> bool:
+        """Проверка здоровья: соединение и версия схемы не старше кода."""
+        if self._head is None:
+            self._head = head_version()
+        try:
+            with replica.engine.connect() as conn:
+                version = current_version(conn)
+        except Exception as exc:
+            self.mark_down(replica, str(exc))
+            return False
+        if version < self._head:
+            self.mark_down(replica, f"схема версии {version}, нужна {self._head}")
+            return False
+        self.mark_up(replica)
+        return True
+
+    def check_all(self) -> int:
+        """Проверяет все реплики; возвращает число здоровых."""
+        return sum(self.check(replica) for replica in self.replicas)
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+
+
+async def check_periodically(pool: ReplicaPool, interval: float) -> None:
+    """Фоновая задача lifespan: проверка реплик раз в interval секунд."""
+    from starlette.concurrency import run_in_threadpool
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(pool.check_all)
+        except Exception:
+            logger.exception("Не удалось проверить реплики")
+
+
+def pinned_to_primary(cookie: Optional[str], window: float, now: Optional[float] = None) -> bool:
+    """
+    Идут ли чтения клиента в основную базу по cookie PRIMARY_COOKIE.
+    Значение дальше окна в будущем (подделанное) не принимается.
+    """
+    if not cookie:
+        return False
+    try:
+        until = float(cookie)
+    except ValueError:
+        return False
+    now = time.time() if now is None else now
+    return now < until <= now + window
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI-middleware: успешный ответ на запрос записи получает cookie
+    PRIMARY_COOKIE, и следующие window секунд get_read_db отдаёт этому
+    клиенту сессию основной базы.
+    """
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.window
+                cookie = (
+                    f"{PRIMARY_COOKIE}={until:.3f}; Max-Age={int(self.window) + 1}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
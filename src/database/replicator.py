@@ -0,0 +1,51 @@
+"""
+Локальный репликатор SQLite для разработки и тестов: раз в --interval
+секунд копирует основную базу в файлы реплик через backup API SQLite.
+
+Копия согласованная (снимок одной транзакции чтения), но полная: время
+копирования растёт с размером базы, и реплика отстаёт на интервал плюс
+это время. Рабочим репликам нужна потоковая репликация СУБД (для
+SQLite — например, LiteFS); этот инструмент лишь даёт read_replica_urls
+что читать на одной машине.
+
+Запуск:
+    python -m src.database.replicator ./test.db ./replica-1.db ./replica-2.db --interval 1
+    READ_REPLICA_URLS='["sqlite:///./replica-1.db", "sqlite:///./replica-2.db"]' python -m src.main
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from typing import Sequence
+
+# Страниц за шаг backup: между шагами запись в основную базу не ждёт
+BACKUP_PAGES_PER_STEP = 1024
+
+
+def replicate(source_path: str, replica_paths: Sequence[str]) -> None:
+    """Копирует базу source_path в каждую из replica_paths."""
+    with closing(sqlite3.connect(source_path)) as source:
+        for path in replica_paths:
+            with closing(sqlite3.connect(path)) as replica:
+                source.backup(replica, pages=BACKUP_PAGES_PER_STEP)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="файл основной базы")
+    parser.add_argument("replicas", nargs="+", help="файлы реплик")
+    parser.add_argument("--interval", type=float, default=1.0, help="секунд между копиями")
+    parser.add_argument("--once", action="store_true", help="скопировать один раз и выйти")
+    args = parser.parse_args(argv)
+
+    while True:
+        started = time.perf_counter()
+        replicate(args.source, args.replicas)
+        if args.once:
+            return 0
+        time.sleep(max(0.0, args.interval - (time.perf_counter() - started)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Онлайн-решардинг: перенос слотов (пользователей с их заказами) между
+шардами, пока сервис работает.
+
+Целевое распределение — консистентное кольцо из шардов SHARD_URLS без
+выводимых (--drain). Переносятся слоты, чей владелец не совпадает с
+владельцем по кольцу: добавление шарда переносит на него около 1/N
+слотов, вывод шарда — все его слоты на остальные.
+
+Перенос слота:
+1. пользователи слота, их заказы и сводки копируются в целевой шард,
+   запись в слот продолжает идти в источник;
+2. слот в источнике помечается moving: запись в него получает 503,
+   чтение идёт из источника;
+3. докопируются заказы, появившиеся после шага 1, и перезаписываются
+   версии пользователей и их сводки;
+4. слот назначается целевому шарду и снимается с источника; сервисы
+   узнают об этом при обновлении карты или сразу по WrongShard.
+Запись в слот недоступна только на шагах 2–4. После всех переносов и
+паузы --grace (чтобы сервисы успели перечитать карту) из каждого шарда
+удаляются строки слотов, которыми он не владеет. Прерванный запуск
+доделывается повторным: копирование пропускает уже перенесённые строки.
+Новый шард добавляется в SHARD_URLS сервисов (и мигрируется) до
+решардинга, выводимый убирается оттуда после.
+
+Запуск:
+    python -m src.database.reshard --dry-run
+    python -m src.database.reshard
+    python -m src.database.reshard --drain s2
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Iterable, List, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from src.database.crud import chunked
+from src.database.sharding import (
+    SLOT_ACTIVE, SLOT_MOVING, SLOTS, HashRing, Shard, ShardingError, ShardRouter, slot_expression, slot_of,
+)
+from src.database.summary import move_product_totals
+from src.models.orm_models import Order, ShardSlot, User, UserOrderStats
+
+logger = logging.getLogger(__name__)
+
+# (слот, шард-источник, целевой шард)
+Move = Tuple[int, str, str]
+
+
+def plan_moves(router: ShardRouter, drain: Sequence[str] = ()) -> List[Move]:
+    """Переносы, после которых слоты распределены по кольцу без шардов drain."""
+    names = [name for name in router.shards if name not in drain]
+    if not names:
+        raise ShardingError("Нельзя вывести все шарды")
+    ring = HashRing(names)
+    owners = router.current_owners()
+    return [
+        (slot, owner, ring.owner(slot))
+        for slot, owner in sorted(owners.items())
+        if owner != ring.owner(slot)
+    ]
+
+
+def _slot_user_ids(db: Session, slot: int) -> List[int]:
+    return list(db.scalars(select(User.id).where(slot_expression(User.id) == slot)))
+
+
+def _existing_ids(db: Session, id_column, ids: Sequence[int]) -> Set[int]:
+    found = set()
+    for chunk in chunked(ids):
+        found.update(db.scalars(select(id_column).where(id_column.in_(chunk))))
+    return found
+
+
+def _rows(db: Session, model, column, ids: Sequence[int]) -> List[dict]:
+    rows = []
+    for chunk in chunked(ids):
+        rows.extend(dict(row) for row in db.execute(select(model.__table__).where(column.in_(chunk))).mappings())
+    return rows
+
+
+def copy_slot(source: Shard, target: Shard, slot: int, final: bool) -> int:
+    """
+    Копирует в target строки слота, которых там нет; final — ещё и
+    перезаписывает версии пользователей и их сводки. Возвращает число
+    скопированных заказов.
+    """
+    with source.session_factory() as src, target.session_factory() as dst:
+        user_ids = _slot_user_ids(src, slot)
+        users = _rows(src, User, User.id, user_ids)
+        present_users = _existing_ids(dst, User.id, user_ids)
+        new_users = [row for row in users if row["id"] not in present_users]
+        if new_users:
+            dst.execute(insert(User), new_users)
+        if final and present_users:
+            users_table = User.__table__
+            dst.execute(
+                update(users_table)
+                .where(users_table.c.id == bindparam("b_id"))
+                .values(version=bindparam("b_version"), orders_version=bindparam("b_orders_version")),
+                [{"b_id": row["id"], "b_version": row["version"], "b_orders_version": row["orders_version"]}
+                 for row in users if row["id"] in present_users],
+            )
+
+        orders = _rows(src, Order, Order.user_id, user_ids)
+        present_orders = _existing_ids(dst, Order.id, [row["id"] for row in orders])
+        new_orders = [row for row in orders if row["id"] not in present_orders]
+        if new_orders:
+            dst.execute(insert(Order), new_orders)
+            move_product_totals(dst, [(row["user_id"], row["product_name"], row["quantity"]) for row in new_orders], 1)
+
+        # Сводки пользователей переносятся строками целиком
+        stats = _rows(src, UserOrderStats, UserOrderStats.user_id, user_ids)
+        for chunk in chunked(user_ids):
+            dst.execute(delete(UserOrderStats).where(UserOrderStats.user_id.in_(chunk)))
+        if stats:
+            dst.execute(insert(UserOrderStats), stats)
+        dst.commit()
+    return len(new_orders)
+
+
+def _set_state(shard: Shard, slot: int, state: str) -> None:
+    # В SQLite UPDATE ждёт блокировку записи, то есть конца начатых
+    # транзакций записи в шард; после него claim_slot видит новое состояние
+    with shard.engine.begin() as conn:
+        conn.execute(update(ShardSlot).where(ShardSlot.slot == slot).values(state=state))
+
+
+def move_slot(router: ShardRouter, slot: int, source_name: str, target_name: str) -> int:
+    """Переносит слот; возвращает число перенесённых заказов."""
+    source, target = router.shards[source_name], router.shards[target_name]
+    copied = copy_slot(source, target, slot, final=False)
+    _set_state(source, slot, SLOT_MOVING)
+    try:
+        copied += copy_slot(source, target, slot, final=True)
+        with target.engine.begin() as conn:
+            if conn.scalar(select(ShardSlot.slot).where(ShardSlot.slot == slot)) is None:
+                conn.execute(insert(ShardSlot).values(slot=slot, state=SLOT_ACTIVE))
+    except Exception:
+        # Скопированное в цель удалит финальная очистка: слотом она не владеет
+        _set_state(source, slot, SLOT_ACTIVE)
+        raise
+    with source.engine.begin() as conn:
+        conn.execute(delete(ShardSlot).where(ShardSlot.slot == slot))
+    return copied
+
+
+def finish_interrupted(router: ShardRouter) -> int:
+    """
+    Снимает слоты moving с шардов-источников, если перенос прервался
+    после назначения слота цели. Возвращает число таких слотов.
+    """
+    finished = 0
+    for slot, states in router.load_owners().items():
+        if SLOT_ACTIVE not in states.values():
+            continue
+        for name, state in states.items():
+            if state == SLOT_MOVING:
+                with router.shards[name].engine.begin() as conn:
+                    conn.execute(delete(ShardSlot).where(ShardSlot.slot == slot))
+                finished += 1
+    return finished
+
+
+def _delete_users(db: Session, user_ids: Iterable[int]) -> int:
+    deleted = 0
+    for chunk in chunked(list(user_ids)):
+        facts = db.execute(
+            select(Order.user_id, Order.product_name, Order.quantity).where(Order.user_id.in_(chunk))
+        ).all()
+        move_product_totals(db, facts, -1)
+        db.execute(delete(Order).where(Order.user_id.in_(chunk)))
+        db.execute(delete(UserOrderStats).where(UserOrderStats.user_id.in_(chunk)))
+        db.execute(delete(User).where(User.id.in_(chunk)))
+        db.commit()
+        deleted += len(facts)
+    return deleted
+
+
+def delete_unowned(router: ShardRouter) -> int:
+    """
+    Удаляет из каждого шарда пользователей (с заказами и сводками) из
+    слотов, которыми шард не владеет. Полный проход по users каждого
+    шарда. Возвращает число удалённых заказов.
+    """
+    deleted = 0
+    owners = router.current_owners()
+    if len(owners) < SLOTS:
+        # Без полной карты «чужими» оказались бы строки неназначенных слотов
+        raise ShardingError("Не все слоты назначены шардам; выполните python -m src.database.sharding init")
+    for name, shard in router.shards.items():
+        with shard.session_factory() as db:
+            stray = [user_id for user_id in db.scalars(select(User.id)) if owners.get(slot_of(user_id)) != name]
+            deleted += _delete_users(db, stray)
+    return deleted
+
+
+def reshard(router: ShardRouter, drain: Sequence[str] = (), grace: float = 0.0) -> List[Move]:
+    finish_interrupted(router)
+    moves = plan_moves(router, drain)
+    for slot, source, target in moves:
+        copied = move_slot(router, slot, source, target)
+        logger.info("Слот %s: %s -> %s, заказов %s", slot, source, target, copied)
+    if moves:
+        time.sleep(grace)
+    delete_unowned(router)
+    router.refresh()
+    return moves
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drain", action="append", default=[], help="вывести шард (можно несколько раз)")
+    parser.add_argument("--dry-run", action="store_true", help="только показать переносы")
+    parser.add_argument("--grace", type=float, default=None,
+                        help="секунд до удаления перенесённых строк (по умолчанию shard_map_refresh_interval)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from src.config import get_settings
+    from src.database.sharding import create_shard_router
+
+    settings = get_settings()
+    router = create_shard_router(settings.shard_urls, settings)
+    try:
+        unknown = set(args.drain) - set(router.shards)
+        if unknown:
+            print(f"Неизвестные шарды: {', '.join(sorted(unknown))}")
+            return 1
+        if args.dry_run:
+            for slot, source, target in plan_moves(router, args.drain):
+                print(f"слот {slot}: {source} -> {target}")
+            return 0
+        grace = settings.shard_map_refresh_interval if args.grace is None else args.grace
+        moves = reshard(router, args.drain, grace)
+        print(f"Перенесено слотов: {len(moves)}")
+    finally:
+        router.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import logging
+from typing import List, Optional
+
+from sqlalchemy import MetaData, inspect
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def find_index_drift(engine: Engine, metadata: Optional[MetaData] = None) -> List[str]:
+    """
+    Сравнивает индексы, объявленные в ORM-моделях, с индексами живой схемы.
+
+    Возвращает список расхождений в человекочитаемом виде:
+    отсутствующие в базе индексы, индексы с другим набором колонок
+    и индексы, которые есть в базе, но не объявлены в моделях.
+    Пустой список означает, что схема совпадает с моделями.
+    """
+    if metadata is None:
+        from src.models.orm_models import Base
+        metadata = Base.metadata
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    problems = []
+
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            problems.append(f"таблица {table.name} отсутствует в базе")
+            continue
+
+        declared = {
+            index.name: [column.name for column in index.columns]
+            for index in table.indexes
+        }
+        live = {
+            index["name"]: list(index["column_names"])
+            for index in inspector.get_indexes(table.name)
+        }
+
+        for name, columns in declared.items():
+            if name not in live:
+                problems.append(f"индекс {name} ({', '.join(columns)}) отсутствует в таблице {table.name}")
+            elif live[name] != columns:
+                problems.append(
+                    f"индекс {name} в таблице {table.name}: в базе ({', '.join(live[name])}), "
+                    f"в моделях ({', '.join(columns)})"
+                )
+
+        for name in live.keys() - declared.keys():
+            problems.append(f"индекс {name} в таблице {table.name} не объявлен в моделях")
+
+    return problems
+
+
+def check_index_drift(engine: Engine, metadata: Optional[MetaData] = None) -> List[str]:
+    """Проверка при старте приложения: пишет расхождения индексов в лог."""
+    problems = find_index_drift(engine, metadata)
+    for problem in problems:
+        logger.warning("Расхождение схемы: %s", problem)
+    return problems
@@ -0,0 +1,380 @@
+"""
+Шардирование пользователей и заказов по user_id.
+
+Все данные пользователя — строка users, его заказы, сводка и версии для
+ETag — лежат в одном шарде, поэтому создание заказа остаётся одной
+локальной транзакцией, как и без шардов. Шард находится в два шага:
+
+- слот: id пользователя и его заказов — Snowflake, в битах которого
+  записан слот пользователя (один из SLOTS). Новый пользователь получает
+  случайный слот, его заказы — слот пользователя, поэтому шард заказа
+  находится по id без обращения к базам;
+- шард слота: каждый шард перечисляет свои слоты в таблице shard_slots,
+  ShardRouter держит собранную из них карту и перечитывает её раз в
+  shard_map_refresh_interval секунд. Начальное распределение слотов и
+  целевое при решардинге (src/database/reshard.py) даёт консистентное
+  хеш-кольцо по именам шардов: при добавлении шарда к нему переезжает
+  около 1/N слотов, остальные остаются на месте.
+
+Запись проверяет в своей транзакции, что шард владеет слотом
+(claim_slot), поэтому сервис с устаревшей картой не запишет данные не
+туда: он получает WrongShard, перечитывает карту и повторяет запрос.
+
+Snowflake: 41 бит миллисекунд от SNOWFLAKE_EPOCH_MS (до 2093 года),
+10 бит слота, 12 бит последовательности. Генераторов в разных процессах
+не различает ничего, кроме случайного начала последовательности в каждой
+миллисекунде, поэтому совпадение id возможно; его ловит первичный ключ
+шарда (одинаковые id — один слот — один шард), и создание повторяется с
+новым id. id больше 2^53, в JavaScript их нужно читать как BigInt.
+
+Подготовка шардов (SHARD_URLS в настройках):
+    python -m src.database.sharding upgrade   # миграции в каждом шарде
+    python -m src.database.sharding init      # распределение слотов по кольцу
+    python -m src.database.sharding status
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.config import Settings
+from src.models.orm_models import Order, ShardSlot, User
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SLOT_BITS = 10
+SEQUENCE_BITS = 12
+SLOTS = 1 << SLOT_BITS
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+# 2024-01-01T00:00:00Z
+SNOWFLAKE_EPOCH_MS = 1_704_067_200_000
+
+SLOT_ACTIVE = "active"
+SLOT_MOVING = "moving"
+
+# Точек на кольце у каждого шарда: больше точек — ровнее доли шардов
+RING_VNODES = 64
+# Сколько раз повторять создание при совпадении id или устаревшей карте
+WRITE_ATTEMPTS = 3
+
+
+class ShardingError(RuntimeError):
+    pass
+
+
+class WrongShard(ShardingError):
+    """Шард не владеет слотом: карта слотов устарела."""
+
+    def __init__(self, slot: int):
+        super().__init__(f"Слот {slot} не принадлежит этому шарду")
+        self.slot = slot
+
+
+class SlotMoving(ShardingError):
+    """Слот переносится на другой шард; запись в него временно недоступна."""
+
+    def __init__(self, slot: int):
+        super().__init__(f"Слот {slot} переносится на другой шард")
+        self.slot = slot
+
+
+def slot_of(entity_id: int) -> int:
+    """Слот пользователя или заказа по его id."""
+    return (entity_id >> SEQUENCE_BITS) & (SLOTS - 1)
+
+
+def slot_expression(id_column):
+    """slot_of в SQL: поиск строк слота при переносе (полный проход по таблице)."""
+    return id_column.op(">>")(SEQUENCE_BITS).op("&")(SLOTS - 1)
+
+
+class SnowflakeGenerator:
+    """Генератор id процесса; потокобезопасен."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._first = 0
+        self._sequence = 0
+
+    def next_id(self, slot: int) -> int:
+        with self._lock:
+            now = max(int(self._clock() * 1000) - SNOWFLAKE_EPOCH_MS, self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & SEQUENCE_MASK
+                if self._sequence == self._first:
+                    # Последовательность миллисекунды исчерпана: берём
+                    # следующую, не дожидаясь часов
+                    now += 1
+            if now != self._last_ms:
+                self._first = self._sequence = random.getrandbits(SEQUENCE_BITS)
+                self._last_ms = now
+            return (now << (SLOT_BITS + SEQUENCE_BITS)) | (slot << SEQUENCE_BITS) | self._sequence
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Консистентное хеш-кольцо: слот принадлежит первой точке шарда по часовой стрелке."""
+
+    def __init__(self, names: Iterable[str], vnodes: int = RING_VNODES):
+        points = sorted((_ring_hash(f"{name}#{index}"), name) for name in names for index in range(vnodes))
+        if not points:
+            raise ShardingError("Кольцо без шардов")
+        self._keys = [key for key, _ in points]
+        self._names = [name for _, name in points]
+
+    def owner(self, slot: int) -> str:
+        index = bisect.bisect(self._keys, _ring_hash(f"slot-{slot}")) % len(self._keys)
+        return self._names[index]
+
+    def assignment(self) -> Dict[int, str]:
+        return {slot: self.owner(slot) for slot in range(SLOTS)}
+
+
+class Shard:
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def claim_slot(db: Session, slot: int) -> None:
+    """
+    Проверка владения слотом в транзакции записи. Вызывается после
+    изменений, перед commit: к этому моменту транзакция держит блокировку
+    записи (SQLite) или строки слота (FOR SHARE в PostgreSQL), и перенос
+    слота не может начаться между проверкой и фиксацией.
+    """
+    state = db.scalar(select(ShardSlot.state).where(ShardSlot.slot == slot).with_for_update(read=True))
+    if state is None:
+        raise WrongShard(slot)
+    if state == SLOT_MOVING:
+        raise SlotMoving(slot)
+
+
+def owns_slot(db: Session, slot: int) -> bool:
+    """Для чтений: «не найдено» верно, только если шард владеет слотом."""
+    return db.scalar(select(ShardSlot.slot).where(ShardSlot.slot == slot)) is not None
+
+
+class ShardRouter:
+    """Шарды, карта слотов и генератор id."""
+
+    def __init__(self, shards: Sequence[Shard]):
+        self.shards: Dict[str, Shard] = {shard.name: shard for shard in shards}
+        self._owners: List[Optional[str]] = [None] * SLOTS
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.shards)), thread_name_prefix="shard")
+        self.ids = SnowflakeGenerator()
+
+    def load_owners(self) -> Dict[int, Dict[str, str]]:
+        """Слоты всех шардов: slot -> {имя шарда: состояние}."""
+        owners: Dict[int, Dict[str, str]] = {}
+        for shard, rows in zip(self.shards.values(), self.scatter(
+                lambda shard: _slot_rows(shard.engine))):
+            for slot, state in rows:
+                owners.setdefault(slot, {})[shard.name] = state
+        return owners
+
+    def current_owners(self) -> Dict[int, str]:
+        """Владелец каждого назначенного слота."""
+        return {slot: _owner(states) for slot, states in self.load_owners().items()}
+
+    def refresh(self) -> None:
+        """Перечитывает карту слотов из shard_slots всех шардов."""
+        owners: List[Optional[str]] = [None] * SLOTS
+        for slot, name in self.current_owners().items():
+            owners[slot] = name
+        self._owners = owners
+
+    def shard_for_slot(self, slot: int) -> Shard:
+        name = self._owners[slot]
+        if name is None:
+            raise ShardingError(
+                f"Слот {slot} не назначен ни одному шарду; выполните python -m src.database.sharding init"
+            )
+        return self.shards[name]
+
+    def shard_for_id(self, entity_id: int) -> Shard:
+        return self.shard_for_slot(slot_of(entity_id))
+
+    def new_user_id(self) -> int:
+        # Случайный слот равномерно распределяет пользователей по слотам
+        return self.ids.next_id(random.randrange(SLOTS))
+
+    def new_order_id(self, user_id: int) -> int:
+        return self.ids.next_id(slot_of(user_id))
+
+    def run(self, entity_id: int, work: Callable[[Session], T]) -> T:
+        """
+        work(сессия шарда) для пользователя или заказа entity_id. На
+        WrongShard карта перечитывается и work выполняется на новом шарде.
+        """
+        for attempt in range(WRITE_ATTEMPTS):
+            shard = self.shard_for_id(entity_id)
+            with shard.session_factory() as db:
+                try:
+                    return work(db)
+                except WrongShard:
+                    db.rollback()
+                    if attempt == WRITE_ATTEMPTS - 1:
+                        raise
+            logger.info("Карта слотов устарела (слот %s), перечитываю", slot_of(entity_id))
+            self.refresh()
+
+    def scatter(self, work: Callable[[Shard], T]) -> List[T]:
+        """work(шард) параллельно для всех шардов; результаты в порядке шардов."""
+        return list(self._executor.map(work, self.shards.values()))
+
+    def dispose(self) -> None:
+        self._executor.shutdown(wait=False)
+        for shard in self.shards.values():
+            shard.engine.dispose()
+
+
+def _owner(states: Dict[str, str]) -> str:
+    # Во время переноса слотом на миг владеют оба шарда: источник (moving)
+    # уже не принимает запись, поэтому владелец — цель
+    return next((name for name, state in states.items() if state == SLOT_ACTIVE), next(iter(states)))
+
+
+def _slot_rows(engine: Engine):
+    with engine.connect() as conn:
+        return conn.execute(select(ShardSlot.slot, ShardSlot.state)).all()
+
+
+def create_shard_router(shard_urls: Dict[str, str], settings: Settings) -> ShardRouter:
+    from src.database.db import apply_sqlite_pragmas, engine_options
+    from src.metrics import instrument_engine
+
+    shards = []
+    for name, url in shard_urls.items():
+        engine = create_engine(url, **engine_options(url, settings))
+        apply_sqlite_pragmas(engine)
+        if settings.metrics_enabled:
+            instrument_engine(engine)
+        shards.append(Shard(name, engine))
+    return ShardRouter(shards)
+
+
+def init_slots(router: ShardRouter) -> int:
+    """
+    Распределяет слоты по кольцу из всех шардов. Только для шардов без
+    слотов: перераспределение уже назначенных — дело reshard.
+    Возвращает число назначенных слотов.
+    """
+    if router.load_owners():
+        raise ShardingError("Слоты уже распределены; для изменения используйте python -m src.database.reshard")
+    by_shard: Dict[str, List[int]] = {}
+    for slot, name in HashRing(router.shards).assignment().items():
+        by_shard.setdefault(name, []).append(slot)
+    for name, slots in by_shard.items():
+        with router.shards[name].engine.begin() as conn:
+            conn.execute(insert(ShardSlot), [{"slot": slot, "state": SLOT_ACTIVE} for slot in slots])
+    router.refresh()
+    return SLOTS
+
+
+async def refresh_periodically(router: ShardRouter, interval: float) -> None:
+    """Фоновая задача lifespan: карта слотов раз в interval секунд."""
+    from starlette.concurrency import run_in_threadpool
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(router.refresh)
+        except Exception:
+            logger.exception("Не удалось перечитать карту слотов")
+
+
+_router: Optional[ShardRouter] = None
+
+
+def start_shard_router(settings: Settings) -> Optional[ShardRouter]:
+    """При старте сервиса: шарды из shard_urls, сверка их схемы и карта слотов."""
+    global _router
+    if not settings.shard_urls:
+        return None
+    from src.database.migrate import check_schema_version
+
+    router = create_shard_router(settings.shard_urls, settings)
+    for shard in router.shards.values():
+        check_schema_version(shard.engine)
+    router.refresh()
+    _router = router
+    return router
+
+
+def stop_shard_router() -> None:
+    global _router
+    if _router is not None:
+        _router.dispose()
+        _router = None
+
+
+def get_shard_router() -> ShardRouter:
+    if _router is None:
+        raise ShardingError("Шардирование не запущено")
+    return _router
+
+
+def _shard_counts(shard: Shard):
+    with shard.engine.connect() as conn:
+        return (
+            conn.scalar(select(func.count()).select_from(ShardSlot)),
+            conn.scalar(select(func.count()).select_from(User)),
+            conn.scalar(select(func.count()).select_from(Order)),
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["upgrade", "init", "status"])
+    args = parser.parse_args(argv)
+
+    from src.config import get_settings
+    from src.database.migrate import upgrade
+
+    settings = get_settings()
+    if not settings.shard_urls:
+        print("SHARD_URLS не задан")
+        return 1
+    router = create_shard_router(settings.shard_urls, settings)
+    try:
+        if args.command == "upgrade":
+            for shard in router.shards.values():
+                applied = upgrade(shard.engine)
+                print(f"{shard.name}: применено миграций {len(applied)}")
+        elif args.command == "init":
+            try:
+                init_slots(router)
+            except ShardingError as exc:
+                print(exc)
+                return 1
+            print(f"Слоты распределены по {len(router.shards)} шардам")
+        else:
+            for shard, (slots, users, orders) in zip(router.shards.values(), router.scatter(_shard_counts)):
+                print(f"{shard.name:<12} слотов {slots:>5}  пользователей {users:>10}  заказов {orders:>12}")
+    finally:
+        router.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
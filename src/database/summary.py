@@ -0,0 +1,280 @@
+"""
+Сводные таблицы заказов: user_order_stats и product_order_stats.
+
+Вставка заказов (crud.create_order, crud.bulk_create_orders и асинхронный
+create_order) увеличивает счётчики в той же транзакции, поэтому чтение
+статистики — поиск по первичному ключу без обхода orders. Цена — три
+выражения на каждую вставку (два UPSERT сводок и UPDATE версии списка
+заказов), для одиночного POST /orders — четыре выражения вместо одного.
+
+Пересчёт с нуля и сверка с orders:
+    python -m src.database.summary verify
+    python -m src.database.summary rebuild
+"""
+import argparse
+import logging
+import sys
+from collections import defaultdict
+from enum import Enum
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from src.models.orm_models import Order, ProductOrderStats, User, UserOrderStats
+
+logger = logging.getLogger(__name__)
+
+# (user_id, product_name, quantity) одного вставленного заказа
+OrderFacts = Tuple[int, str, int]
+
+
+# insert() с ON CONFLICT DO UPDATE по диалекту; для остальных диалектов
+# сводка обновляется переносимо (_increment_portable)
+_UPSERT_INSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
+
+def _increment(db: Session, model, key: str, totals: Dict) -> None:
+    if not totals:
+        return
+    table = model.__table__
+    rows = [
+        {key: value, "order_count": count, "total_quantity": quantity}
+        for value, (count, quantity) in totals.items()
+    ]
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        _increment_portable(db, table, key, rows)
+        return
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[key]],
+        set_={
+            "order_count": table.c.order_count + statement.excluded.order_count,
+            "total_quantity": table.c.total_quantity + statement.excluded.total_quantity,
+        },
+    )
+    db.execute(statement, rows)
+
+
+def _increment_portable(db: Session, table, key: str, rows: List[dict]) -> None:
+    """
+    UPDATE строки сводки, а если её нет — INSERT; по выражению на ключ.
+    Без атомарного UPSERT две транзакции, одновременно добавляющие первую
+    строку ключа, сталкиваются на первичном ключе: INSERT идёт в точке
+    сохранения, и проигравшая транзакция откатывает только его и повторяет
+    UPDATE по уже вставленной строке.
+    """
+    statement = (
+        update(table)
+        .where(table.c[key] == bindparam("b_key"))
+        .values(
+            order_count=table.c.order_count + bindparam("b_count"),
+            total_quantity=table.c.total_quantity + bindparam("b_quantity"),
+        )
+    )
+    for row in rows:
+        params = {"b_key": row[key], "b_count": row["order_count"], "b_quantity": row["total_quantity"]}
+        if db.execute(statement, params).rowcount:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(**row))
+        except IntegrityError:
+            db.execute(statement, params)
+
+
+def _bump_orders_version(db: Session, by_user: Dict) -> None:
+    """Увеличивает users.orders_version (ETag списка заказов) на число новых заказов."""
+    if not by_user:
+        return
+    users = User.__table__
+    db.execute(
+        update(users)
+        .where(users.c.id == bindparam("b_user_id"))
+        .values(orders_version=users.c.orders_version + bindparam("b_count")),
+        [{"b_user_id": user_id, "b_count": count} for user_id, (count, _) in by_user.items()],
+    )
+
+
+def record_orders(db: Session, orders: Iterable[OrderFacts]) -> None:
+    """
+    Добавляет вставленные заказы в сводки и увеличивает версию списка
+    заказов их пользователей. Не фиксирует транзакцию: вызывается между
+    INSERT заказов и commit, чтобы сводка и orders менялись атомарно.
+    Заказы предварительно агрегируются, поэтому пакет любого размера —
+    это два UPSERT-выражения и одно UPDATE.
+    """
+    by_user = defaultdict(lambda: [0, 0])
+    by_product = defaultdict(lambda: [0, 0])
+    for user_id, product_name, quantity in orders:
+        by_user[user_id][0] += 1
+        by_user[user_id][1] += quantity
+        by_product[product_name][0] += 1
+        by_product[product_name][1] += quantity
+    _increment(db, UserOrderStats, "user_id", by_user)
+    _increment(db, ProductOrderStats, "product_name", by_product)
+    _bump_orders_version(db, by_user)
+
+
+def move_product_totals(db: Session, orders: Iterable[OrderFacts], sign: int) -> None:
+    """
+    Прибавляет (sign=1) или вычитает (sign=-1) заказы в сводке по товарам
+    без изменения сводки пользователей: при переносе заказов между шардами
+    (src/database/reshard.py) строки user_order_stats переносятся целиком.
+    """
+    by_product = defaultdict(lambda: [0, 0])
+    for _, product_name, quantity in orders:
+        by_product[product_name][0] += sign
+        by_product[product_name][1] += sign * quantity
+    _increment(db, ProductOrderStats, "product_name", by_product)
+
+
+class OrderStatsGroup(str, Enum):
+    product_name = "product_name"
+    user_id = "user_id"
+
+
+_GROUP_TABLES = {
+    OrderStatsGroup.product_name: ProductOrderStats,
+    OrderStatsGroup.user_id: UserOrderStats,
+}
+
+
+def user_stats_statement(user_id: int) -> Select:
+    """
+    Сводка пользователя одним поиском по ключу. LEFT JOIN от users:
+    нет строк — нет пользователя, нет строки сводки — нет заказов (нули).
+    """
+    return (
+        select(
+            User.id.label("user_id"),
+            func.coalesce(UserOrderStats.order_count, 0).label("order_count"),
+            func.coalesce(UserOrderStats.total_quantity, 0).label("total_quantity"),
+        )
+        .outerjoin(UserOrderStats, UserOrderStats.user_id == User.id)
+        .where(User.id == user_id)
+    )
+
+
+def group_stats_statement(group_by: OrderStatsGroup) -> Select:
+    """Строки сводки по группам в порядке ключа группы; пустые группы пропускаются."""
+    model = _GROUP_TABLES[group_by]
+    key = getattr(model, group_by.value)
+    return (
+        select(key, model.order_count, model.total_quantity)
+        .where(model.order_count > 0)
+        .order_by(key)
+    )
+
+
+def _user_totals_statement():
+    return select(
+        Order.user_id, func.count(Order.id), func.sum(Order.quantity)
+    ).group_by(Order.user_id)
+
+
+def _product_totals_statement():
+    return select(
+        Order.product_name, func.count(Order.id), func.sum(Order.quantity)
+    ).group_by(Order.product_name)
+
+
+def rebuild_summary(db: Session) -> None:
+    """Пересчитывает обе сводки по orders с нуля одной транзакцией."""
+    db.execute(delete(UserOrderStats))
+    db.execute(delete(ProductOrderStats))
+    db.execute(insert(UserOrderStats).from_select(
+        ["user_id", "order_count", "total_quantity"], _user_totals_statement()
+    ))
+    db.execute(insert(ProductOrderStats).from_select(
+        ["product_name", "order_count", "total_quantity"], _product_totals_statement()
+    ))
+    db.commit()
+
+
+def _compare(name: str, expected: Dict, actual: Dict) -> List[str]:
+    problems = []
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        want = expected.get(key, (0, 0))
+        have = actual.get(key, (0, 0))
+        if want != have:
+            problems.append(
+                f"{name} {key}: в сводке {have[0]} заказов / {have[1]} шт., "
+                f"по orders {want[0]} заказов / {want[1]} шт."
+            )
+    return problems
+
+
+def verify_summary(db: Session) -> List[str]:
+    """
+    Сверяет сводки с агрегатами по orders (полный проход по таблице).
+    Пустой список означает, что сводки верны.
+    """
+    expected_users = {row[0]: (row[1], row[2]) for row in db.execute(_user_totals_statement())}
+    actual_users = {
+        row.user_id: (row.order_count, row.total_quantity)
+        for row in db.scalars(select(UserOrderStats))
+        if row.order_count or row.total_quantity
+    }
+    expected_products = {row[0]: (row[1], row[2]) for row in db.execute(_product_totals_statement())}
+    actual_products = {
+        row.product_name: (row.order_count, row.total_quantity)
+        for row in db.scalars(select(ProductOrderStats))
+        if row.order_count or row.total_quantity
+    }
+    return (
+        _compare("пользователь", expected_users, actual_users)
+        + _compare("товар", expected_products, actual_products)
+    )
+
+
+def check_summary_initialized(engine: Engine) -> bool:
+    """
+    Проверка при старте: сводки пусты, а заказы есть — значит, база создана
+    до появления сводных таблиц и их нужно пересчитать командой rebuild.
+    Два запроса с LIMIT 1, без обхода таблиц.
+    """
+    with engine.connect() as conn:
+        has_orders = conn.execute(select(Order.id).limit(1)).first() is not None
+        has_summary = conn.execute(select(ProductOrderStats.product_name).limit(1)).first() is not None
+    if has_orders and not has_summary:
+        logger.warning(
+            "Сводные таблицы заказов пусты; выполните python -m src.database.summary rebuild"
+        )
+        return False
+    return True
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args(argv)
+
+    from src.database.db import SessionLocal, engine
+    from src.database.migrate import check_schema_version
+    check_schema_version(engine)
+
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            rebuild_summary(db)
+            print("Сводки пересчитаны")
+        problems = verify_summary(db)
+
+    for problem in problems:
+        print(f"Расхождение: {problem}")
+    if not problems:
+        print("Сводки совпадают с orders")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,76 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
+import anyio
+from fastapi import FastAPI, Response
 from fastapi.openapi.utils import get_openapi
 
 from src.api import users, orders
-from src.database.db import engine
-from src.models.orm_models import Base
+from src.cache import get_cache
+from src.config import get_settings
+from src.database.db import SessionLocal, engine, replica_pool, USE_ASYNC_DB
+from src.database.group_commit import start_order_writer, stop_order_writer
+from src.database.idempotency import purge_periodically
+from src.database.migrate import check_schema_version
+from src.database.replicas import ReadYourWritesMiddleware, check_periodically
+from src.database.sharding import refresh_periodically, start_shard_router, stop_shard_router
+from src.metrics import PROMETHEUS_MEDIA_TYPE, MetricsMiddleware, registry, route_class
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    # Пул потоков для синхронных обработчиков того же размера, что и пул соединений
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    if settings.shard_urls:
+        # При шардировании основная база не используется: схема каждого
+        # шарда сверяется при старте, карта слотов перечитывается фоном
+        shard_router = start_shard_router(settings)
+        try:
+            refresh_task = asyncio.create_task(refresh_periodically(shard_router, settings.shard_map_refresh_interval))
+            try:
+                yield
+            finally:
+                refresh_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await refresh_task
+        finally:
+            stop_shard_router()
+        return
+    # Схема создаётся и меняется миграциями (python -m src.database.migrate upgrade)
+    # до старта; здесь только сверка версии и индексов, без create_all
+    check_schema_version(engine)
+    purge_task = None
+    if settings.idempotency_purge_interval:
+        purge_task = asyncio.create_task(purge_periodically(
+            SessionLocal, settings.idempotency_ttl, settings.idempotency_purge_interval
+        ))
+    start_order_writer(SessionLocal, settings)
+    health_task = None
+    if replica_pool:
+        # Реплики не мешают старту: нездоровые пропускаются до следующей проверки
+        await anyio.to_thread.run_sync(replica_pool.check_all)
+        if settings.replica_health_interval:
+            health_task = asyncio.create_task(check_periodically(replica_pool, settings.replica_health_interval))
+    yield
+    # Начатые запросы к этому моменту завершены, очередь писателя пуста
+    stop_order_writer()
+    for task in (purge_task, health_task):
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    # Сюда uvicorn доходит после SIGTERM, когда начатые запросы завершены
+    if USE_ASYNC_DB:
+        from src.database.db import get_async_engine
+        await get_async_engine().dispose()
+    engine.dispose()
+    replica_pool.dispose()
 
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
+    lifespan=lifespan,
     title="User and Order API",
     description="API для управления пользователями и заказами",
     version="1.0.0",
@@ -46,9 +109,33 @@ def custom_openapi():
 
 
 app.openapi = custom_openapi
+# Маршруты самого приложения тоже замеряют ожидание потока (при включённых метриках)
+app.router.route_class = route_class(get_settings())
+
+if replica_pool and not get_settings().shard_urls:
+    # Добавлен раньше метрик, поэтому оборачивается ими: в метриках учтён и он
+    app.add_middleware(ReadYourWritesMiddleware, window=get_settings().read_your_writes_window)
+
+if get_settings().metrics_enabled:
+    app.add_middleware(MetricsMiddleware, server_timing=get_settings().server_timing_enabled)
+
+if get_settings().shard_urls:
+    # Шардирование: только маршруты с user_id или id (см. src/api/sharded.py)
+    from src.api import sharded
+
+    app.include_router(sharded.users_router)
+    app.include_router(sharded.orders_router)
+else:
+    if USE_ASYNC_DB:
+        # Асинхронные обработчики перехватывают свои маршруты первыми,
+        # остальные запросы обслуживают синхронные роутеры
+        from src.api import async_users, async_orders
+
+        app.include_router(async_users.router)
+        app.include_router(async_orders.router)
 
-app.include_router(users.router)
-app.include_router(orders.router)
+    app.include_router(users.router)
+    app.include_router(orders.router)
 
 
 @app.get("/", tags=["status"])
@@ -61,7 +148,19 @@ def read_root():
     }
 
 
+@app.get("/cache/stats", tags=["status"])
+def read_cache_stats():
+    return get_cache().stats.as_dict()
+
+
+@app.get("/metrics", tags=["status"], response_class=Response)
+async def read_metrics():
+    # Текстовый формат Prometheus: задержки по маршрутам, SQL, сериализация, ожидание пула
+    return Response(content=registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+
 if __name__ == "__main__":
-    import uvicorn
+    from src.serve import main
+
+    main()
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,406 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from src.config import Settings
+
+# Границы корзин гистограмм времени (секунды) и числа SQL-выражений на запрос
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Границы корзин размера пачки групповой фиксации заказов
+BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Сколько замеров запросов копится до раскладки по гистограммам
+PENDING_REQUESTS_LIMIT = 1024
+
+# Метка маршрута для запросов, не совпавших ни с одним маршрутом:
+# подставлять сырой путь нельзя, иначе число рядов не ограничено
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestMetrics:
+    """Замеры одного запроса; заполняются из событий движка и сериализации."""
+
+    __slots__ = ("statements", "db_time", "serialization_time", "threadpool_wait", "session_wait")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+        self.threadpool_wait = 0.0
+        self.session_wait = 0.0
+
+
+# Текущий запрос. Пул потоков anyio копирует контекст, поэтому синхронные
+# обработчики видят тот же объект, что и middleware в event loop
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def record_serialization(seconds: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.serialization_time += seconds
+
+
+def record_session_wait(seconds: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.session_wait += seconds
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками; потокобезопасна."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float],
+                 lock: Optional[threading.Lock] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Общий lock позволяет обновить несколько гистограмм за один захват
+        self._lock = lock or threading.Lock()
+        # метки -> [счётчики по корзинам (не накопительные) + корзина +Inf, сумма]
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series(labels)
+            series[0][index] += 1
+            series[1] += value
+
+    def series(self, labels: Tuple[str, ...]) -> List:
+        """Ряд для меток, создаётся при первом обращении; вызывается под self._lock."""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(snapshot):
+            base = _format_labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{le}"}} {cumulative}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {_format_number(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def inc_many(self, items: Iterable[Tuple[Tuple[str, ...], float]]) -> None:
+        """Несколько увеличений (метки, величина) за один захват lock."""
+        with self._lock:
+            for labels, amount in items:
+                self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{{{_format_labels(self.labelnames, labels)}}} {_format_number(value)}")
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Набор метрик сервиса и их вывод в текстовом формате Prometheus."""
+
+    def __init__(self):
+        # Гистограммы запроса обновляются вместе в _aggregate_pending под одним lock
+        self._request_lock = threading.Lock()
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Время обработки запроса",
+            ("method", "route"), LATENCY_BUCKETS, self._request_lock,
+        )
+        self.requests = Counter(
+            "http_requests_total", "Число обработанных запросов",
+            ("method", "route", "status"),
+        )
+        self.db_statements = Histogram(
+            "db_statements_per_request", "Число SQL-выражений на запрос",
+            ("method", "route"), STATEMENT_BUCKETS, self._request_lock,
+        )
+        self.db_time = Histogram(
+            "db_time_seconds", "Суммарное время SQL-выражений за запрос",
+            ("method", "route"), LATENCY_BUCKETS, self._request_lock,
+        )
+        self.serialization_time = Histogram(
+            "serialization_time_seconds", "Время сериализации ответа",
+            ("method", "route"), LATENCY_BUCKETS, self._request_lock,
+        )
+        self.threadpool_wait = Histogram(
+            "threadpool_wait_seconds", "Ожидание потока: от передачи обработчика в пул до его запуска",
+            ("method", "route"), LATENCY_BUCKETS, self._request_lock,
+        )
+        self.session_wait = Histogram(
+            "db_session_wait_seconds", "Ожидание слота сессии базы данных",
+            ("method", "route"), LATENCY_BUCKETS, self._request_lock,
+        )
+        # (method, route) -> ряды гистограмм запроса, чтобы не искать их
+        # в каждой гистограмме заново на каждый замер
+        self._request_series: Dict[Tuple[str, str], Tuple[Tuple[Tuple[float, ...], List], ...]] = {}
+        # Замеры запросов, ещё не разложенные по гистограммам
+        self._pending: Deque[tuple] = deque()
+        self.group_commit_batch = Histogram(
+            "group_commit_batch_size", "Число заказов, зафиксированных одной транзакцией групповой фиксации",
+            (), BATCH_BUCKETS,
+        )
+        self.group_commit_time = Histogram(
+            "group_commit_flush_seconds", "Время записи и фиксации одной пачки заказов",
+            (), LATENCY_BUCKETS,
+        )
+
+        self.read_sessions = Counter(
+            "db_read_sessions_total", "Сессии чтения по базам: primary или адрес реплики",
+            ("target",),
+        )
+
+    def observe_request(self, method: str, route: str, status: int,
+                        duration: float, metrics: RequestMetrics) -> None:
+        # На пути запроса только постановка в очередь (deque.append
+        # потокобезопасен и не требует lock); по гистограммам замеры
+        # раскладываются пачкой — при выводе метрик или заполнении очереди
+        self._pending.append((
+            method, route, status, duration, metrics.statements, metrics.db_time,
+            metrics.serialization_time, metrics.threadpool_wait, metrics.session_wait,
+        ))
+        if len(self._pending) >= PENDING_REQUESTS_LIMIT:
+            self._aggregate_pending()
+
+    def _aggregate_pending(self) -> None:
+        pending = self._pending
+        statuses = []
+        with self._request_lock:
+            while pending:
+                method, route, status, *values = pending.popleft()
+                labels = (method, route)
+                request_series = self._request_series.get(labels)
+                if request_series is None:
+                    request_series = self._request_series[labels] = tuple(
+                        (histogram.buckets, histogram.series(labels))
+                        for histogram in (self.request_duration, self.db_statements, self.db_time,
+                                          self.serialization_time, self.threadpool_wait, self.session_wait)
+                    )
+                for (buckets, series), value in zip(request_series, values):
+                    series[0][bisect.bisect_left(buckets, value)] += 1
+                    series[1] += value
+                statuses.append(((method, route, str(status)), 1))
+        self.requests.inc_many(statuses)
+
+    def render(self) -> str:
+        self._aggregate_pending()
+        lines = []
+        for metric in (self.request_duration, self.requests, self.db_statements,
+                       self.db_time, self.serialization_time, self.threadpool_wait, self.session_wait,
+                       self.group_commit_batch, self.group_commit_time, self.read_sessions):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# Замер через события диалекта do_execute*, а не before/after_cursor_execute:
+# любой слушатель событий Connection включает для каждого выражения всю
+# цепочку событий выполнения (before_execute, after_execute и т.д.), а
+# слушатель диалекта вызывается один раз и сам выполняет выражение на
+# курсоре — одна пара perf_counter на выражение. Вне запроса он возвращает
+# False, и выражение выполняет диалект как обычно.
+def _do_execute(cursor, statement, parameters, context):
+    metrics = _current.get()
+    if metrics is None:
+        return False
+    started = time.perf_counter()
+    context.dialect.do_execute(cursor, statement, parameters, context)
+    # Упавшее выражение не доходит до этой строки и не считается
+    metrics.db_time += time.perf_counter() - started
+    metrics.statements += 1
+    return True
+
+
+def _do_execute_no_params(cursor, statement, context):
+    metrics = _current.get()
+    if metrics is None:
+        return False
+    started = time.perf_counter()
+    context.dialect.do_execute_no_params(cursor, statement, context)
+    metrics.db_time += time.perf_counter() - started
+    metrics.statements += 1
+    return True
+
+
+def _do_executemany(cursor, statement, parameters, context):
+    metrics = _current.get()
+    if metrics is None:
+        return False
+    started = time.perf_counter()
+    context.dialect.do_executemany(cursor, statement, parameters, context)
+    metrics.db_time += time.perf_counter() - started
+    metrics.statements += 1
+    return True
+
+
+_DIALECT_LISTENERS = (
+    ("do_execute", _do_execute),
+    ("do_execute_no_params", _do_execute_no_params),
+    ("do_executemany", _do_executemany),
+)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Подключает подсчёт SQL-выражений и их времени к диалекту engine через
+    события do_execute, do_execute_no_params и do_executemany. Вне запроса
+    слушатели только проверяют ContextVar. Повторный вызов ничего не меняет.
+    """
+    if event.contains(engine, "do_execute", _do_execute):
+        return
+    for identifier, listener in _DIALECT_LISTENERS:
+        event.listen(engine, identifier, listener)
+
+
+def _timed_endpoint(endpoint):
+    @functools.wraps(endpoint)
+    async def dispatch(*args, **kwargs):
+        dispatched = time.perf_counter()
+
+        def call():
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.threadpool_wait += time.perf_counter() - dispatched
+            return endpoint(*args, **kwargs)
+
+        return await run_in_threadpool(call)
+
+    return dispatch
+
+
+class TimedRoute(APIRoute):
+    """
+    Маршрут, который замеряет ожидание потока синхронным обработчиком:
+    от передачи в пул потоков anyio до начала выполнения в потоке. Такой
+    обработчик оборачивается в асинхронный, который сам передаёт его в
+    пул, поэтому проверка ответа по response_model идёт в event loop.
+    Асинхронные обработчики не меняются: их ожидание потока равно нулю.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def route_class(settings: Settings) -> Type[APIRoute]:
+    """
+    Класс маршрутов роутеров сервиса: TimedRoute при включённых метриках,
+    иначе обычный APIRoute — без метрик замер ожидания потока никто не
+    читает, а слой вокруг синхронного обработчика стоил бы каждому запросу.
+    """
+    return TimedRoute if settings.metrics_enabled else APIRoute
+
+
+_SERVER_TIMING = (
+    'db;dur=%.2f;desc="%d queries", ser;dur=%.2f, wait;dur=%.2f, session;dur=%.2f, total;dur=%.2f'
+)
+
+
+def server_timing(metrics: RequestMetrics, total: float) -> str:
+    """Значение заголовка Server-Timing (длительности в миллисекундах)."""
+    return _SERVER_TIMING % (
+        metrics.db_time * 1000, metrics.statements, metrics.serialization_time * 1000,
+        metrics.threadpool_wait * 1000, metrics.session_wait * 1000, total * 1000,
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: замеряет запрос, пишет метрики в registry и при
+    server_timing=True добавляет заголовок Server-Timing. Сделано на чистом
+    ASGI, без BaseHTTPMiddleware, чтобы не добавлять лишнюю задачу и копию
+    тела ответа на каждый запрос.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = registry, exclude_paths: Sequence[str] = ("/metrics",),
+                 server_timing: bool = False):
+        self.app = app
+        self.registry = registry
+        self.exclude_paths = frozenset(exclude_paths)
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    header = server_timing(metrics, time.perf_counter() - started)
+                    message["headers"] = [*message.get("headers", ()), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            self.registry.observe_request(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                time.perf_counter() - started,
+                metrics,
+            )
@@ -1,21 +1,35 @@
 from pydantic import BaseModel
 from typing import List, Optional
-from sqlalchemy import Column, Integer, String, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Float, Integer, LargeBinary, String, ForeignKey, Index
+from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+# Тип id пользователей и заказов: 64-битные id шардирования (Snowflake,
+# src/database/sharding.py) не помещаются в INTEGER PostgreSQL. В SQLite
+# INTEGER и так 64-битный, а первичный ключ-псевдоним rowid должен быть
+# объявлен именно как INTEGER
+EntityId = BigInteger().with_variant(Integer, "sqlite")
+
 
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(EntityId, primary_key=True, autoincrement=True)
     username = Column(String(50), unique=True, nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     age = Column(Integer, nullable=False)
+    # Версия строки для ETag: ORM увеличивает её при каждом UPDATE (version_id_col)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Версия списка заказов пользователя для ETag: увеличивается при каждой
+    # вставке его заказа в той же транзакции (summary.record_orders)
+    orders_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __mapper_args__ = {"version_id_col": version}
 
-    orders = relationship("Order", back_populates="user")
+    # Загрузка по умолчанию ленивая (запрос на каждого пользователя); для списков
+    # с заказами используется selectinload, см. src/api/embedding.py
+    orders = relationship("Order", back_populates="user", order_by="Order.id")
 
     def __repr__(self):
         return f"<User(id={self.id}, username={self.username}, email={self.email}, age={self.age})>"
@@ -23,13 +37,91 @@ class User(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Выборка заказов пользователя, упорядоченных по id (get_user_orders)
+        Index("ix_orders_user_id_id", "user_id", "id"),
+        # Поиск по началу названия товара (GET /orders/search, src/database/order_search.py)
+        Index("ix_orders_product_name_id", "product_name", "id"),
+    )
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    id = Column(EntityId, primary_key=True, autoincrement=True)
+    user_id = Column(EntityId, ForeignKey("users.id"), nullable=False)
     product_name = Column(String(100), nullable=False)
     quantity = Column(Integer, nullable=False)
+    # Версия строки для ETag, как у User
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     user = relationship("User", back_populates="orders")
 
     def __repr__(self):
         return f"<Order(id={self.id}, user_id={self.user_id}, product_name={self.product_name}, quantity={self.quantity})>"
+
+
+class UserOrderStats(Base):
+    """
+    Сводка заказов по пользователю. Обновляется в той же транзакции,
+    что и вставка заказов (src/database/summary.py), а не вычисляется по orders.
+    """
+    __tablename__ = "user_order_stats"
+
+    user_id = Column(EntityId, ForeignKey("users.id"), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    total_quantity = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserOrderStats(user_id={self.user_id}, order_count={self.order_count}, total_quantity={self.total_quantity})>"
+
+
+class ProductOrderStats(Base):
+    """Сводка заказов по названию товара; обновляется так же, как UserOrderStats."""
+    __tablename__ = "product_order_stats"
+
+    product_name = Column(String(100), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    total_quantity = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ProductOrderStats(product_name={self.product_name}, order_count={self.order_count}, total_quantity={self.total_quantity})>"
+
+
+class IdempotencyKey(Base):
+    """
+    Ответ на запрос с заголовком Idempotency-Key. Записывается в той же
+    транзакции, что и созданный заказ (src/api/idempotency.py); повтор
+    запроса с тем же ключом получает сохранённый ответ без новой записи.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # Удаление просроченных ключей (purge_expired)
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+    key = Column(String(255), primary_key=True)
+    # sha256 тела запроса: тот же ключ с другим телом — ошибка клиента
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(LargeBinary, nullable=False)
+    # Unix-время создания; срок жизни задаётся настройкой idempotency_ttl
+    created_at = Column(Float, nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(key={self.key}, status_code={self.status_code}, created_at={self.created_at})>"
+
+
+class ShardSlot(Base):
+    """
+    Слот шардирования, которым владеет эта база (src/database/sharding.py).
+    Без шардирования таблица пуста. Запись в слот проверяет его строку в
+    своей транзакции, поэтому устаревшая карта слотов у сервиса не может
+    записать данные не в тот шард.
+    """
+    __tablename__ = "shard_slots"
+
+    slot = Column(Integer, primary_key=True, autoincrement=False)
+    # active — слот принимает запись; moving — слот переносится на другой шард
+    state = Column(String(16), nullable=False, default="active", server_default="active")
+
+    def __repr__(self):
+        return f"<ShardSlot(slot={self.slot}, state={self.state})>"
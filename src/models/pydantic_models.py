@@ -1,5 +1,14 @@
 import re
-from pydantic import BaseModel, EmailStr, validator
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ConfigDict, EmailStr, TypeAdapter, ValidationError, field_validator
+from pydantic_core import ErrorDetails
+
+# Шаблон компилируется один раз при импорте, а не на каждый вызов валидатора.
+# match с якорями, а не fullmatch: $ допускает завершающий перевод строки,
+# и поведение должно остаться прежним
+USERNAME_RE = re.compile(r'^[a-zA-Z0-9_]+$')
 
 
 class UserCreate(BaseModel):
@@ -7,48 +16,136 @@ class UserCreate(BaseModel):
     email: EmailStr
     age: int
 
-    @validator('username')
-    def username_validator(cls, v):
+    # Проверки написаны валидаторами, а не ограничениями Field(min_length=...,
+    # pattern=..., gt=..., lt=...): у ограничений свои тексты и типы ошибок,
+    # а клиенты API получают именно эти сообщения
+    @field_validator('username')
+    @classmethod
+    def username_validator(cls, v: str) -> str:
         if len(v) < 3:
             raise ValueError('Имя пользователя должно содержать минимум 3 символа')
-        if not re.match(r'^[a-zA-Z0-9_]+$', v):
+        if USERNAME_RE.match(v) is None:
             raise ValueError('Имя пользователя может содержать только буквы, цифры и нижнее подчеркивание')
         return v
 
-    @validator('age')
-    def age_validator(cls, v):
+    @field_validator('age')
+    @classmethod
+    def age_validator(cls, v: int) -> int:
         if v <= 0 or v >= 100:
             raise ValueError('Возраст должен быть больше 0 и меньше 100')
         return v
 
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     username: str
     email: EmailStr
     age: int
 
-    class Config:
-        from_attributes = True
-
 
 class OrderCreate(BaseModel):
     user_id: int
     product_name: str
     quantity: int
 
-    @validator('quantity')
-    def quantity_validator(cls, v):
+    @field_validator('quantity')
+    @classmethod
+    def quantity_validator(cls, v: int) -> int:
         if v <= 0:
             raise ValueError('Количество должно быть больше 0')
         return v
 
 
+# Сколько элементов валидируется одним вызовом TypeAdapter в validate_batch
+VALIDATE_BATCH_SIZE = 256
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter для List[model], один на модель на весь процесс."""
+    return TypeAdapter(List[model])
+
+
+def validate_batch(model: Type[BaseModel], raw_items: Sequence[Any]
+                   ) -> Tuple[Dict[int, BaseModel], Dict[int, List[ErrorDetails]]]:
+    """
+    Валидирует элементы моделью model пачками по VALIDATE_BATCH_SIZE: одна
+    пачка — один вызов pydantic-core вместо model_validate на каждый элемент.
+
+    Возвращает валидные элементы и ошибки по индексу элемента. Пачка, в
+    которой нашлась ошибка, проверяется заново поэлементно — так ошибки
+    каждого элемента совпадают с ошибками model_validate, а повторная
+    работа ограничена пачками с ошибками, а не всем запросом.
+    """
+    adapter = list_adapter(model)
+    items, errors = {}, {}
+    for start in range(0, len(raw_items), VALIDATE_BATCH_SIZE):
+        chunk = raw_items[start:start + VALIDATE_BATCH_SIZE]
+        try:
+            items.update(zip(range(start, start + len(chunk)), adapter.validate_python(chunk)))
+            continue
+        except ValidationError:
+            pass
+        for index, raw in enumerate(chunk, start):
+            try:
+                items[index] = model.model_validate(raw)
+            except ValidationError as e:
+                errors[index] = e.errors()
+    return items, errors
+
+
 class OrderResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     user_id: int
     product_name: str
     quantity: int
 
-    class Config:
-        from_attributes = True  # Заменили orm_mode на from_attributes
\ No newline at end of file
+
+class UserWithOrdersResponse(UserResponse):
+    orders: List[OrderResponse] = []
+
+
+class OrderWithUserResponse(OrderResponse):
+    user: UserResponse
+
+
+class UserOrderStatsResponse(BaseModel):
+    user_id: int
+    order_count: int
+    total_quantity: int
+
+
+class ProductOrderStatsResponse(BaseModel):
+    product_name: str
+    order_count: int
+    total_quantity: int
+
+
+class UserLookupResult(BaseModel):
+    id: int
+    found: bool
+    user: Optional[UserResponse] = None
+
+
+class OrderLookupResult(BaseModel):
+    id: int
+    found: bool
+    order: Optional[OrderResponse] = None
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    # created | invalid | duplicate | user_not_found
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    failed: int
+    items: List[BulkItemResult]
@@ -0,0 +1,108 @@
+"""
+Точка входа production-сервера: uvicorn с несколькими воркерами.
+
+    python -m src.serve
+    python -m src.serve --workers 8 --port 8080 --backlog 4096
+
+Значения по умолчанию берутся из настроек (WORKERS, HOST, PORT, BACKLOG,
+KEEP_ALIVE_TIMEOUT, GRACEFUL_TIMEOUT, SERVER_LOOP, SERVER_HTTP), аргументы
+командной строки их переопределяют. Число воркеров по умолчанию — число
+доступных процессу CPU.
+
+Каждый воркер — отдельный процесс со своим engine и пулом соединений
+(uvicorn запускает воркеры через spawn; для серверов с fork см.
+_dispose_engines_after_fork в src/database/db.py). Метрики /metrics и
+кеш в памяти тоже свои у каждого воркера.
+
+По SIGTERM воркер перестаёт принимать соединения, закрывает простаивающие
+keep-alive соединения и дожидается начатых запросов, но не дольше
+GRACEFUL_TIMEOUT секунд; затем lifespan закрывает пулы соединений.
+
+Миграции здесь не запускаются: python -m src.database.migrate upgrade
+выполняется один раз на выкладку, до старта воркеров.
+"""
+import argparse
+import importlib.util
+import logging
+from typing import Any, Dict, List, Optional
+
+from src.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+APP = "src.main:app"
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def resolve_loop(loop: str) -> str:
+    """auto -> uvloop, если установлен, иначе asyncio."""
+    if loop != "auto":
+        return loop
+    if _installed("uvloop"):
+        return "uvloop"
+    logger.warning("uvloop не установлен, используется стандартный asyncio")
+    return "asyncio"
+
+
+def resolve_http(http: str) -> str:
+    """auto -> httptools, если установлен, иначе h11."""
+    if http != "auto":
+        return http
+    if _installed("httptools"):
+        return "httptools"
+    logger.warning("httptools не установлен, используется h11")
+    return "h11"
+
+
+def uvicorn_options(settings: Settings) -> Dict[str, Any]:
+    """Аргументы uvicorn.run для APP по настройкам."""
+    return {
+        "host": settings.host,
+        "port": settings.port,
+        "workers": settings.effective_workers,
+        "loop": resolve_loop(settings.server_loop),
+        "http": resolve_http(settings.server_http),
+        "backlog": settings.backlog,
+        "timeout_keep_alive": settings.keep_alive_timeout,
+        "timeout_graceful_shutdown": settings.graceful_timeout,
+    }
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--backlog", type=int)
+    parser.add_argument("--keep-alive-timeout", type=int)
+    parser.add_argument("--graceful-timeout", type=int)
+    parser.add_argument("--loop", dest="server_loop", choices=["auto", "uvloop", "asyncio"])
+    parser.add_argument("--http", dest="server_http", choices=["auto", "httptools", "h11"])
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true", help="не писать строку лога на каждый запрос")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    args = _parse_args(argv)
+    overrides = {
+        name: value for name, value in vars(args).items()
+        if value is not None and name in Settings.model_fields
+    }
+    settings = get_settings().model_copy(update=overrides)
+    options = uvicorn_options(settings)
+    logger.info(
+        "Запуск %s: %s воркеров, loop=%s, http=%s",
+        APP, options["workers"], options["loop"], options["http"],
+    )
+    uvicorn.run(APP, log_level=args.log_level, access_log=not args.no_access_log, **options)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    main()
@@ -1 +1,105 @@
+import os
+import tempfile
 
+# Основной engine приложения создаётся при импорте src.database.db:
+# в тестах это временный файл, а не ./test.db. Не база в памяти: lifespan
+# закрывает пул при остановке, и база в памяти пропала бы вместе с ним
+_app_db_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_app_db_dir.name, 'app.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.api.orders import get_order_db
+from src.database.db import apply_sqlite_pragmas, engine, get_read_db, get_write_db
+from src.database.migrate import upgrade
+from src.database.query_counter import QueryCounter
+from src.cache import LRUCache, get_cache
+from src.main import app
+from src.models.orm_models import Base, User, Order
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_app_database():
+    # lifespan приложения сверяет версию схемы основного engine
+    upgrade(engine)
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    apply_sqlite_pragmas(engine, "default")
+
+    Base.metadata.create_all(engine)
+
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSessionLocal()
+
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture(scope="function")
+def cache():
+    return LRUCache(max_size=100, ttl=60)
+
+
+@pytest.fixture(scope="function")
+def client(db_session, cache):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_write_db] = override_get_db
+    app.dependency_overrides[get_order_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_cache] = lambda: cache
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="function")
+def query_counter(db_session):
+    with QueryCounter(db_session.get_bind()) as counter:
+        yield counter
+
+
+@pytest.fixture(scope="function")
+def test_user(db_session):
+    user = User(
+        username="testuser",
+        email="test@example.com",
+        age=30
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture(scope="function")
+def test_order(db_session, test_user):
+    order = Order(
+        user_id=test_user.id,
+        product_name="Test Product",
+        quantity=1
+    )
+    db_session.add(order)
+    db_session.commit()
+    db_session.refresh(order)
+    return order
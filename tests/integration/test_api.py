@@ -1,3 +1,17 @@
+import json
+from typing import List
+
+import pytest
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from src.database.crud import ORDER_COLUMNS
+from src.models.orm_models import Order, User
+from src.models.pydantic_models import OrderResponse, UserResponse
+
+
 class TestUserAPI:
     def test_create_user(self, client, db_session):
         user_data = {
@@ -7,7 +21,7 @@ class TestUserAPI:
         }
         response = client.post("/users", json=user_data)
 
-        assert response.status_code == 200
+        assert response.status_code == 201
 
         data = response.json()
         assert "id" in data
@@ -69,7 +83,7 @@ class TestOrderAPI:
         }
         response = client.post("/orders", json=order_data)
 
-        assert response.status_code == 200
+        assert response.status_code == 201
 
         data = response.json()
         assert "id" in data
@@ -89,3 +103,552 @@ class TestOrderAPI:
             "quantity": 0
         }
         response = client.post("/orders", json=invalid_order_data)
+        assert response.status_code == 422
+
+
+class TestPaginationAPI:
+    def _create_users(self, client, count):
+        ids = []
+        for i in range(count):
+            response = client.post("/users", json={
+                "username": f"user_{i}",
+                "email": f"user_{i}@example.com",
+                "age": 20 + i
+            })
+            ids.append(response.json()["id"])
+        return ids
+
+    def test_skip_limit_still_supported(self, client):
+        ids = self._create_users(client, 5)
+
+        response = client.get("/users", params={"skip": 2, "limit": 2})
+
+        assert response.status_code == 200
+        assert [u["id"] for u in response.json()] == ids[2:4]
+
+    def test_after_id(self, client):
+        ids = self._create_users(client, 5)
+
+        response = client.get("/users", params={"after_id": ids[1], "limit": 2})
+
+        assert response.status_code == 200
+        assert [u["id"] for u in response.json()] == ids[2:4]
+
+    def test_cursor_walks_all_pages(self, client):
+        ids = self._create_users(client, 5)
+
+        seen = []
+        params = {"limit": 2, "after_id": 0}
+        while True:
+            response = client.get("/users", params=params)
+            assert response.status_code == 200
+            seen.extend(u["id"] for u in response.json())
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if next_cursor is None:
+                break
+            params = {"limit": 2, "cursor": next_cursor}
+
+        assert seen == ids
+
+    def test_orders_cursor(self, client, test_user):
+        ids = []
+        for i in range(3):
+            response = client.post("/orders", json={
+                "user_id": test_user.id,
+                "product_name": f"Product {i}",
+                "quantity": 1
+            })
+            ids.append(response.json()["id"])
+
+        first = client.get("/orders", params={"after_id": 0, "limit": 2})
+        assert [o["id"] for o in first.json()] == ids[:2]
+
+        second = client.get("/orders", params={"cursor": first.headers["X-Next-Cursor"], "limit": 2})
+        assert [o["id"] for o in second.json()] == ids[2:]
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_invalid_cursor(self, client):
+        response = client.get("/orders", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+
+class TestBulkAPI:
+    def test_bulk_create_users(self, client, test_user):
+        payload = [
+            {"username": "alice", "email": "alice@example.com", "age": 30},
+            {"username": test_user.username, "email": "new@example.com", "age": 30},
+            {"username": "a", "email": "short@example.com", "age": 30},
+            {"username": "bob", "email": "bob@example.com", "age": 40},
+            {"username": "bob", "email": "bob2@example.com", "age": 40},
+        ]
+        response = client.post("/users/bulk", json=payload)
+
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["created"] == 2
+        assert data["failed"] == 3
+        assert [item["status"] for item in data["items"]] == [
+            "created", "duplicate", "invalid", "created", "duplicate"
+        ]
+
+        alice = client.get(f"/users/{data['items'][0]['id']}").json()
+        assert alice["username"] == "alice"
+
+    def test_bulk_create_orders_ndjson(self, client, test_user):
+        lines = [
+            f'{{"user_id": {test_user.id}, "product_name": "Laptop", "quantity": 1}}',
+            '{"user_id": 9999, "product_name": "Laptop", "quantity": 1}',
+            f'{{"user_id": {test_user.id}, "product_name": "Mouse", "quantity": 0}}',
+            f'{{"user_id": {test_user.id}, "product_name": "Mouse", "quantity": 3}}',
+        ]
+        response = client.post(
+            "/orders/bulk",
+            content="\n".join(lines) + "\n",
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+
+        items = response.json()["items"]
+        assert [item["status"] for item in items] == ["created", "user_not_found", "invalid", "created"]
+        assert items[1]["error"] == "Пользователь не найден"
+        assert items[0]["id"] < items[3]["id"]
+
+        orders = client.get(f"/users/{test_user.id}/orders").json()
+        assert [o["product_name"] for o in orders] == ["Laptop", "Mouse"]
+
+    def test_bulk_invalid_json(self, client):
+        response = client.post("/orders/bulk", content="[{", headers={"Content-Type": "application/json"})
+
+        assert response.status_code == 400
+
+    def test_bulk_requires_array(self, client):
+        response = client.post("/users/bulk", json={"username": "alice"})
+
+        assert response.status_code == 400
+
+
+class TestStatementCounts:
+    def test_create_order_statement_budget(self, client, test_user, query_counter):
+        query_counter.reset()
+        response = client.post("/orders", json={
+            "user_id": test_user.id,
+            "product_name": "Test Product",
+            "quantity": 1
+        })
+
+        assert response.status_code == 201
+        # INSERT ... RETURNING и три выражения сводок на каждый POST:
+        # по одному UPSERT в каждую сводку и версия списка заказов
+        assert query_counter.count == 4
+        assert "RETURNING" in query_counter.statements[0]
+        assert "user_order_stats" in query_counter.statements[1]
+        assert "product_order_stats" in query_counter.statements[2]
+        assert "orders_version" in query_counter.statements[3]
+
+    def test_create_order_nonexistent_user(self, client, query_counter):
+        response = client.post("/orders", json={
+            "user_id": 9999,
+            "product_name": "Test Product",
+            "quantity": 1
+        })
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Пользователь не найден"
+        # Неудачный INSERT и поиск пользователя уже после отказа
+        assert query_counter.count == 2
+
+    def test_create_order_other_integrity_error_is_not_404(self, client, test_user, monkeypatch):
+        def failing_create_order(db, order):
+            raise IntegrityError("INSERT INTO orders", {}, Exception("CHECK constraint failed"))
+
+        monkeypatch.setattr("src.api.orders.crud.create_order", failing_create_order)
+
+        with pytest.raises(IntegrityError):
+            client.post("/orders", json={
+                "user_id": test_user.id,
+                "product_name": "Test Product",
+                "quantity": 1
+            })
+
+    def test_create_user_single_statement(self, client, query_counter):
+        response = client.post("/users", json={
+            "username": "johndoe",
+            "email": "john@example.com",
+            "age": 30
+        })
+
+        assert response.status_code == 201
+        assert response.json()["username"] == "johndoe"
+        assert query_counter.count == 1
+
+    def test_user_orders_single_statement(self, client, test_order, query_counter):
+        query_counter.reset()
+        response = client.get(f"/users/{test_order.user_id}/orders")
+
+        assert response.status_code == 200
+        assert [o["id"] for o in response.json()] == [test_order.id]
+        assert query_counter.count == 1
+
+    def test_user_without_orders(self, client, test_user, query_counter):
+        query_counter.reset()
+        response = client.get(f"/users/{test_user.id}/orders")
+
+        assert response.status_code == 200
+        assert response.json() == []
+        assert query_counter.count == 1
+
+    def test_nonexistent_user_orders(self, client, query_counter):
+        response = client.get("/users/9999/orders")
+
+        assert response.status_code == 404
+        assert query_counter.count == 1
+
+
+class TestCacheAPI:
+    def test_repeat_read_served_from_cache(self, client, test_user, cache, query_counter):
+        first = client.get(f"/users/{test_user.id}")
+        query_counter.reset()
+        second = client.get(f"/users/{test_user.id}")
+
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert query_counter.count == 0
+        assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "evictions": 0}
+
+    def test_not_found_is_not_cached(self, client, cache):
+        assert client.get("/orders/9999").status_code == 404
+        assert client.get("/orders/9999").status_code == 404
+        assert len(cache) == 0
+
+    def test_create_order_invalidates_key(self, client, test_user, cache):
+        # Устаревшая запись под id, который получит новый заказ
+        cache.set("order:1", b'{"stale": true}')
+
+        created = client.post("/orders", json={
+            "user_id": test_user.id,
+            "product_name": "Fresh",
+            "quantity": 1
+        }).json()
+        assert created["id"] == 1
+
+        assert client.get("/orders/1").json()["product_name"] == "Fresh"
+
+    def test_bulk_create_invalidates_keys(self, client, cache):
+        cache.set("user:1", b'{"stale": true}')
+
+        client.post("/users/bulk", json=[{"username": "alice", "email": "alice@example.com", "age": 30}])
+
+        assert client.get("/users/1").json()["username"] == "alice"
+
+
+class TestFastResponses:
+    def test_list_endpoints_match_response_model(self, client, db_session, test_order):
+        def reference(model, objects):
+            adapter = TypeAdapter(List[model])
+            return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+        users = db_session.query(User).order_by(User.id).all()
+        orders = db_session.query(Order).order_by(Order.id).all()
+
+        assert client.get("/users").content == reference(UserResponse, users)
+        assert client.get("/orders").content == reference(OrderResponse, orders)
+        assert client.get(f"/users/{test_order.user_id}/orders").content == reference(OrderResponse, orders)
+
+    def test_openapi_keeps_response_models(self, client):
+        paths = client.get("/openapi.json").json()["paths"]
+
+        for path, model in [("/users", "UserResponse"), ("/orders", "OrderResponse"),
+                            ("/users/{user_id}/orders", "OrderResponse")]:
+            schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+            # Списки /users и /orders дополнительно описывают ответ пакетного чтения (?ids=)
+            variants = schema.get("anyOf", [schema])
+            assert {"type": "array", "items": {"$ref": f"#/components/schemas/{model}"}} in [
+                {"type": variant["type"], "items": variant["items"]} for variant in variants
+            ]
+            names = [param["name"] for param in paths[path]["get"].get("parameters", [])]
+            assert "response" not in names
+
+
+class TestExportAPI:
+    @staticmethod
+    def seed_orders(client, count):
+        user_ids = [
+            client.post("/users", json={"username": f"user_{i}", "email": f"user{i}@example.com", "age": 30}).json()["id"]
+            for i in range(2)
+        ]
+        client.post("/orders/bulk", json=[
+            {"user_id": user_ids[i % 2], "product_name": f"Product, {i}", "quantity": i + 1}
+            for i in range(count)
+        ])
+        return user_ids
+
+    def test_orders_ndjson(self, client):
+        self.seed_orders(client, 5)
+
+        response = client.get("/orders/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = response.content.splitlines()
+        assert len(lines) == 5
+        assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+        assert lines[0] == b'{"id":1,"user_id":1,"product_name":"Product, 0","quantity":1}'
+
+    def test_orders_filters(self, client):
+        user_ids = self.seed_orders(client, 10)
+
+        response = client.get("/orders/export", params={"user_id": user_ids[1], "min_id": 3, "max_id": 8})
+
+        assert [json.loads(line)["id"] for line in response.content.splitlines()] == [4, 6, 8]
+
+    def test_orders_csv(self, client):
+        self.seed_orders(client, 2)
+
+        response = client.get("/orders/export", params={"format": "csv"})
+
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.headers["content-disposition"] == 'attachment; filename="orders.csv"'
+        assert response.text.splitlines() == [
+            "id,user_id,product_name,quantity",
+            '1,1,"Product, 0",1',
+            '2,2,"Product, 1",2',
+        ]
+
+    def test_users_export(self, client, test_user):
+        response = client.get("/users/export")
+
+        assert response.status_code == 200
+        assert json.loads(response.content) == {
+            "id": test_user.id, "username": "testuser", "email": "test@example.com", "age": 30
+        }
+        assert client.get("/users/export", params={"min_id": test_user.id + 1}).content == b""
+
+    def test_streams_in_batches_from_single_select(self, client, db_session, query_counter, monkeypatch):
+        from src.api import export
+        self.seed_orders(client, 7)
+        monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 3)
+        query_counter.reset()
+
+        chunks = list(export.stream_rows(
+            db_session, select(*ORDER_COLUMNS).order_by(Order.id), OrderResponse, export.ExportFormat.ndjson
+        ))
+
+        assert [chunk.count(b"\n") for chunk in chunks] == [3, 3, 1]
+        assert query_counter.count == 1
+
+    def test_invalid_format(self, client):
+        assert client.get("/orders/export", params={"format": "xml"}).status_code == 422
+
+    def test_detail_routes_still_work(self, client, test_order):
+        assert client.get(f"/orders/{test_order.id}").status_code == 200
+        assert client.get("/orders/abc").status_code == 422
+
+
+class TestLookupAPI:
+    def test_users_in_request_order_with_markers(self, client):
+        for name in ("alice", "bob", "carol"):
+            client.post("/users", json={"username": name, "email": f"{name}@example.com", "age": 30})
+
+        response = client.get("/users", params={"ids": "3,999,1,3"})
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"id": 3, "found": True, "user": {"id": 3, "username": "carol", "email": "carol@example.com", "age": 30}},
+            {"id": 999, "found": False, "user": None},
+            {"id": 1, "found": True, "user": {"id": 1, "username": "alice", "email": "alice@example.com", "age": 30}},
+            {"id": 3, "found": True, "user": {"id": 3, "username": "carol", "email": "carol@example.com", "age": 30}},
+        ]
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_orders_lookup(self, client, test_order):
+        response = client.get("/orders", params={"ids": f"{test_order.id},5"})
+
+        assert response.json() == [
+            {"id": test_order.id, "found": True, "order": {
+                "id": test_order.id, "user_id": test_order.user_id, "product_name": "Test Product", "quantity": 1
+            }},
+            {"id": 5, "found": False, "order": None},
+        ]
+
+    def test_chunked_in_queries(self, client, query_counter, monkeypatch):
+        from src.database import crud
+        monkeypatch.setattr(crud, "IN_CHUNK_SIZE", 2)
+        client.post("/users/bulk", json=[
+            {"username": f"user_{i}", "email": f"user{i}@example.com", "age": 30} for i in range(5)
+        ])
+        query_counter.reset()
+
+        response = client.get("/users", params={"ids": "5,4,3,2,1,1"})
+
+        assert [item["id"] for item in response.json() if item["found"]] == [5, 4, 3, 2, 1, 1]
+        # 5 уникальных id по 2 в пачке — 3 запроса, а не 6
+        assert query_counter.count == 3
+
+    @pytest.mark.parametrize("ids", ["", "1,a", ",,"])
+    def test_invalid_ids(self, client, ids):
+        assert client.get("/orders", params={"ids": ids}).status_code == 400
+
+    def test_too_many_ids(self, client):
+        from src.api.lookup import LOOKUP_MAX_IDS
+        ids = ",".join(str(i) for i in range(LOOKUP_MAX_IDS + 1))
+
+        assert client.get("/users", params={"ids": ids}).status_code == 400
+
+
+class TestEmbeddingAPI:
+    @staticmethod
+    def seed(client, users, orders_per_user):
+        client.post("/users/bulk", json=[
+            {"username": f"user_{i}", "email": f"user{i}@example.com", "age": 30} for i in range(users)
+        ])
+        client.post("/orders/bulk", json=[
+            {"user_id": user_id, "product_name": f"Product {n}", "quantity": n + 1}
+            for user_id in range(1, users + 1) for n in range(orders_per_user)
+        ])
+
+    def test_user_with_orders(self, client, test_order):
+        response = client.get(f"/users/{test_order.user_id}", params={"include": "orders"})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "id": test_order.user_id, "username": "testuser", "email": "test@example.com", "age": 30,
+            "orders": [{"id": test_order.id, "user_id": test_order.user_id, "product_name": "Test Product", "quantity": 1}],
+        }
+        assert client.get("/users/999", params={"include": "orders"}).status_code == 404
+
+    def test_user_without_orders_has_empty_list(self, client, test_user):
+        assert client.get("/users", params={"include": "orders"}).json()[0]["orders"] == []
+
+    def test_users_page_takes_two_queries(self, client, query_counter):
+        self.seed(client, users=100, orders_per_user=3)
+        query_counter.reset()
+
+        response = client.get("/users", params={"include": "orders", "limit": 100})
+
+        users = response.json()
+        assert len(users) == 100
+        assert all(len(user["orders"]) == 3 for user in users)
+        assert [order["id"] for order in users[0]["orders"]] == [1, 2, 3]
+        assert query_counter.count == 2
+        assert "X-Next-Cursor" in response.headers
+
+    def test_orders_with_user_take_one_query(self, client, query_counter):
+        self.seed(client, users=10, orders_per_user=5)
+        query_counter.reset()
+
+        orders = client.get("/orders", params={"include": "user", "after_id": 10, "limit": 20}).json()
+
+        assert [order["id"] for order in orders] == list(range(11, 31))
+        assert all(order["user"]["id"] == order["user_id"] for order in orders)
+        assert query_counter.count == 1
+
+    def test_order_with_user(self, client, test_order):
+        body = client.get(f"/orders/{test_order.id}", params={"include": "user"}).json()
+
+        assert body["user"] == {"id": test_order.user_id, "username": "testuser", "email": "test@example.com", "age": 30}
+        assert client.get("/orders/999", params={"include": "user"}).status_code == 404
+
+    def test_include_bypasses_cache(self, client, test_user, cache):
+        client.get(f"/users/{test_user.id}", params={"include": "orders"})
+
+        assert len(cache) == 0
+
+    def test_invalid_include(self, client, test_user):
+        assert client.get("/users", params={"include": "user"}).status_code == 422
+        assert client.get("/orders", params={"include": "orders"}).status_code == 422
+        assert client.get("/users", params={"include": "orders", "ids": "1"}).status_code == 400
+
+
+class TestStatsAPI:
+    def test_user_stats_follow_creates(self, client, test_user):
+        assert client.get(f"/users/{test_user.id}/stats").json() == {
+            "user_id": test_user.id, "order_count": 0, "total_quantity": 0
+        }
+
+        client.post("/orders", json={"user_id": test_user.id, "product_name": "Laptop", "quantity": 2})
+        client.post("/orders/bulk", json=[
+            {"user_id": test_user.id, "product_name": "Mouse", "quantity": 3},
+            {"user_id": 999, "product_name": "Mouse", "quantity": 5},
+            {"user_id": test_user.id, "product_name": "Laptop", "quantity": 1},
+        ])
+        client.post("/orders", json={"user_id": 999, "product_name": "Laptop", "quantity": 7})
+
+        assert client.get(f"/users/{test_user.id}/stats").json() == {
+            "user_id": test_user.id, "order_count": 3, "total_quantity": 6
+        }
+        assert client.get("/orders/stats", params={"group_by": "product_name"}).json() == [
+            {"product_name": "Laptop", "order_count": 2, "total_quantity": 3},
+            {"product_name": "Mouse", "order_count": 1, "total_quantity": 3},
+        ]
+        assert client.get("/orders/stats", params={"group_by": "user_id"}).json() == [
+            {"user_id": test_user.id, "order_count": 3, "total_quantity": 6},
+        ]
+
+    def test_stats_do_not_scan_orders(self, client, test_order, query_counter):
+        query_counter.reset()
+
+        client.get(f"/users/{test_order.user_id}/stats")
+        client.get("/orders/stats")
+
+        assert query_counter.count == 2
+        assert not any("FROM orders" in statement for statement in query_counter.statements)
+
+    def test_unknown_user(self, client):
+        response = client.get("/users/999/stats")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Пользователь не найден"
+
+    def test_stats_pagination_and_validation(self, client, test_user):
+        client.post("/orders/bulk", json=[
+            {"user_id": test_user.id, "product_name": name, "quantity": 1} for name in ("C", "A", "B")
+        ])
+
+        page = client.get("/orders/stats", params={"skip": 1, "limit": 1}).json()
+
+        assert [group["product_name"] for group in page] == ["B"]
+        assert client.get("/orders/stats", params={"group_by": "quantity"}).status_code == 422
+
+    def test_summary_matches_orders(self, client, db_session, test_user):
+        from src.database.summary import verify_summary
+        client.post("/orders/bulk", json=[
+            {"user_id": test_user.id, "product_name": f"Product {i % 3}", "quantity": i + 1} for i in range(10)
+        ])
+
+        assert verify_summary(db_session) == []
+
+
+class TestMetricsAPI:
+    def test_server_timing_header_and_prometheus_output(self, client, db_session, test_user, monkeypatch):
+        from src.main import app
+        from src.metrics import MetricsMiddleware, instrument_engine
+        instrument_engine(db_session.get_bind())
+
+        assert "Server-Timing" not in client.get(f"/users/{test_user.id}/orders").headers
+        # Как при SERVER_TIMING_ENABLED=1: заголовок включается у уже собранного middleware
+        layer = app.middleware_stack
+        while not isinstance(layer, MetricsMiddleware):
+            layer = layer.app
+        monkeypatch.setattr(layer, "server_timing", True)
+        response = client.get(f"/users/{test_user.id}/orders")
+
+        assert 'db;dur=' in response.headers["Server-Timing"]
+        assert 'desc="1 queries"' in response.headers["Server-Timing"]
+
+        metrics = client.get("/metrics")
+        assert metrics.status_code == 200
+        assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "Server-Timing" not in metrics.headers
+        assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}/orders"}' in metrics.text
+        assert '# TYPE db_statements_per_request histogram' in metrics.text
+
+    def test_unmatched_routes_share_one_label(self, client):
+        client.get("/no/such/path/1")
+
+        metrics = client.get("/metrics").text
+
+        assert '/no/such/path' not in metrics
+        assert 'route="unmatched",status="404"' in metrics
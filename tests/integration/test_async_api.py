@@ -0,0 +1,153 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from src.api import users, orders
+from src.cache import LRUCache, get_cache, order_key, user_key
+from src.database.db import apply_sqlite_pragmas, get_async_db, get_read_db, get_write_db, to_async_url
+from src.models.orm_models import Base
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+
+def make_client(db_path, use_async):
+    url = f"sqlite:///{db_path}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(engine, "default")
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    cache = LRUCache()
+    app = FastAPI()
+    app.dependency_overrides[get_write_db] = override_get_db
+    app.dependency_overrides[orders.get_order_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_cache] = lambda: cache
+
+    if use_async:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from src.api import async_users, async_orders
+
+        async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+        apply_sqlite_pragmas(async_engine.sync_engine, "default")
+        AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with AsyncSessionLocal() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        app.dependency_overrides[async_orders.get_async_order_db] = override_get_async_db
+        app.include_router(async_users.router)
+        app.include_router(async_orders.router)
+
+    app.include_router(users.router)
+    app.include_router(orders.router)
+    return TestClient(app)
+
+
+SCENARIO = [
+    ("post", "/users", {"username": "alice", "email": "alice@example.com", "age": 30}),
+    ("post", "/users", {"username": "bob", "email": "bob@example.com", "age": 40}),
+    ("post", "/users", {"username": "alice", "email": "other@example.com", "age": 30}),
+    ("post", "/users", {"username": "x", "email": "x@example.com", "age": 30}),
+    ("post", "/orders", {"user_id": 1, "product_name": "Laptop", "quantity": 1}),
+    ("post", "/orders", {"user_id": 1, "product_name": "Mouse", "quantity": 2}),
+    ("post", "/orders", {"user_id": 999, "product_name": "Mouse", "quantity": 2}),
+    ("get", "/users/1", None),
+    ("get", "/users/999", None),
+    ("get", "/users/abc", None),
+    ("get", "/users", {"limit": 1}),
+    ("get", "/users", {"after_id": 1}),
+    ("get", "/users", {"cursor": "broken"}),
+    ("get", "/users/1/orders", None),
+    ("get", "/users/999/orders", None),
+    ("get", "/orders/1", None),
+    ("get", "/orders/999", None),
+    ("get", "/orders", {"skip": 1}),
+    ("get", "/orders", {"limit": 1, "after_id": 0}),
+    ("get", "/users", {"ids": "2,999,1"}),
+    ("get", "/users", {"ids": "1,x"}),
+    ("get", "/orders", {"ids": "2,1,2"}),
+    ("get", "/users", {"include": "orders"}),
+    ("get", "/users/1", {"include": "orders"}),
+    ("get", "/users/999", {"include": "orders"}),
+    ("get", "/orders", {"include": "user", "limit": 1}),
+    ("get", "/orders/2", {"include": "user"}),
+    ("get", "/orders", {"include": "bad"}),
+    ("get", "/users/1/stats", None),
+    ("get", "/orders/stats", None),
+]
+
+
+def run_scenario(client):
+    results = []
+    for method, path, payload in SCENARIO:
+        if method == "post":
+            response = client.post(path, json=payload)
+        else:
+            response = client.get(path, params=payload)
+        results.append((
+            method, path, response.status_code, response.content,
+            response.headers.get("X-Next-Cursor"), response.headers.get("ETag")
+        ))
+    return results
+
+
+class TestAsyncParity:
+    def test_async_matches_sync(self, tmp_path):
+        with make_client(tmp_path / "sync.db", use_async=False) as sync_client:
+            expected = run_scenario(sync_client)
+        with make_client(tmp_path / "async.db", use_async=True) as async_client:
+            actual = run_scenario(async_client)
+
+        for expected_item, actual_item in zip(expected, actual):
+            assert actual_item == expected_item
+
+    def test_async_writes_invalidate_shared_cache(self, tmp_path):
+        with make_client(tmp_path / "async.db", use_async=True) as client:
+            cache = client.app.dependency_overrides[get_cache]()
+            cache.set(user_key(1), b"stale")
+            cache.set(order_key(1), b"stale")
+
+            assert client.post("/users", json=SCENARIO[0][2]).status_code == 201
+            assert client.post("/orders", json=SCENARIO[4][2]).status_code == 201
+
+            assert cache.get(user_key(1)) is None
+            assert cache.get(order_key(1)) is None
+
+    def test_async_reads_use_shared_cache(self, tmp_path):
+        with make_client(tmp_path / "async.db", use_async=True) as client:
+            cache = client.app.dependency_overrides[get_cache]()
+            assert client.post("/users", json=SCENARIO[0][2]).status_code == 201
+            assert client.post("/orders", json=SCENARIO[4][2]).status_code == 201
+
+            for path in ("/users/1", "/orders/1"):
+                first = client.get(path)
+                hits = cache.stats.hits
+                second = client.get(path)
+
+                assert cache.stats.hits == hits + 1
+                assert second.content == first.content
+                assert second.headers["ETag"] == first.headers["ETag"]
+
+    def test_async_url(self):
+        assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+        assert to_async_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        assert to_async_url("postgresql+asyncpg://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        assert to_async_url("postgresql+psycopg2://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+        assert to_async_url("sqlite+pysqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+        assert to_async_url("postgresql+psycopg_async://u:p@db/app") == "postgresql+psycopg_async://u:p@db/app"
+        with pytest.raises(ValueError):
+            to_async_url("mysql://u:p@db/app")
@@ -0,0 +1,119 @@
+import pytest
+
+from src.api.etags import etag, etag_matches, pack_cached, unpack_cached
+from tests.integration.test_async_api import make_client
+
+ORDER = {"user_id": 1, "product_name": "Laptop", "quantity": 1}
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def api(request, tmp_path):
+    if request.param:
+        pytest.importorskip("aiosqlite")
+        pytest.importorskip("greenlet")
+    with make_client(tmp_path / "app.db", use_async=request.param) as client:
+        client.post("/users", json={"username": "alice", "email": "alice@example.com", "age": 30})
+        client.post("/orders", json=ORDER)
+        yield client
+
+
+def revalidate(client, path, tag, **params):
+    return client.get(path, params=params, headers={"If-None-Match": tag})
+
+
+class TestConditionalGet:
+    @pytest.mark.parametrize("path, params", [
+        ("/users/1", {}),
+        ("/users/1", {"include": "orders"}),
+        ("/users/1/orders", {}),
+        ("/orders/1", {}),
+        ("/orders/1", {"include": "user"}),
+    ])
+    def test_not_modified(self, api, path, params):
+        first = api.get(path, params=params)
+        tag = first.headers["ETag"]
+
+        second = revalidate(api, path, tag, **params)
+
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == tag
+        assert revalidate(api, path, '"stale"', **params).content == first.content
+
+    def test_new_order_changes_only_order_lists(self, api):
+        user = api.get("/users/1").headers["ETag"]
+        with_orders = api.get("/users/1", params={"include": "orders"}).headers["ETag"]
+        orders = api.get("/users/1/orders").headers["ETag"]
+
+        api.post("/orders", json=ORDER)
+
+        assert revalidate(api, "/users/1", user).status_code == 304
+        assert revalidate(api, "/users/1", with_orders, include="orders").status_code == 200
+        response = revalidate(api, "/users/1/orders", orders)
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert response.headers["ETag"] != orders
+
+    def test_tags_differ_between_resources(self, api):
+        tags = {
+            api.get("/users/1").headers["ETag"],
+            api.get("/users/1", params={"include": "orders"}).headers["ETag"],
+            api.get("/users/1/orders").headers["ETag"],
+            api.get("/orders/1").headers["ETag"],
+            api.get("/orders/1", params={"include": "user"}).headers["ETag"],
+        }
+        assert len(tags) == 5
+
+    @pytest.mark.parametrize("path", ["/users/999", "/users/999/orders", "/orders/999"])
+    def test_missing_record(self, api, path):
+        assert revalidate(api, path, "*").status_code == 404
+
+
+class TestConditionalGetQueries:
+    def test_version_lookup_only(self, client, test_order, query_counter):
+        tag = client.get(f"/users/{test_order.user_id}/orders").headers["ETag"]
+        query_counter.reset()
+
+        response = client.get(f"/users/{test_order.user_id}/orders", headers={"If-None-Match": tag})
+
+        assert response.status_code == 304
+        assert query_counter.count == 1
+        assert "orders_version" in query_counter.statements[0]
+        assert "product_name" not in query_counter.statements[0]
+
+    def test_cache_miss_reads_version_only(self, client, test_order, cache, query_counter):
+        tag = client.get(f"/orders/{test_order.id}").headers["ETag"]
+        cache.clear()
+        query_counter.reset()
+
+        assert client.get(f"/orders/{test_order.id}", headers={"If-None-Match": tag}).status_code == 304
+        assert query_counter.count == 1
+        assert "product_name" not in query_counter.statements[0]
+        # 304 не заполняет кеш
+        assert len(cache) == 0
+
+    def test_cache_hit_needs_no_queries(self, client, test_user, query_counter):
+        tag = client.get(f"/users/{test_user.id}").headers["ETag"]
+        query_counter.reset()
+
+        assert client.get(f"/users/{test_user.id}", headers={"If-None-Match": tag}).status_code == 304
+        assert query_counter.count == 0
+
+
+class TestEtagHelpers:
+    def test_etag_matches(self):
+        tag = etag("u", 1, 2)
+        assert tag == '"u.1.2"'
+        assert etag_matches(tag, tag)
+        assert etag_matches(f'"x", {tag}', tag)
+        assert etag_matches(f"W/{tag}", tag)
+        assert etag_matches("*", tag)
+        assert not etag_matches(None, tag)
+        assert not etag_matches('"u.1.3"', tag)
+        assert not etag_matches("u.1.2", tag)
+
+    def test_cached_entry(self):
+        assert unpack_cached(pack_cached('"u.1.2"', b'{"id":1}')) == ('"u.1.2"', b'{"id":1}')
+        # Запись без ETag (прежний формат) считается промахом
+        assert unpack_cached(b'{"id":1}') is None
+        assert unpack_cached(None) is None
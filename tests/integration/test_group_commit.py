@@ -0,0 +1,123 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.requests import Request
+
+from src.api.idempotency import IDEMPOTENCY_KEY_HEADER
+from src.api.orders import get_order_db
+from src.cache import LRUCache, get_cache
+from src.database.db import _get_session_slots
+from src.database.group_commit import GroupCommitWriter, get_order_writer
+from src.models.orm_models import Base, User
+from tests.integration.test_async_api import make_client
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def api(request, tmp_path):
+    if request.param:
+        pytest.importorskip("aiosqlite")
+        pytest.importorskip("greenlet")
+    db_path = tmp_path / "app.db"
+    client = make_client(db_path, use_async=request.param)
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    writer = GroupCommitWriter(sessionmaker(bind=engine), max_batch=50, max_latency=0.01)
+    writer.start()
+    client.app.dependency_overrides[get_order_writer] = lambda: writer
+    with client:
+        client.post("/users", json={"username": "alice", "email": "alice@example.com", "age": 30})
+        yield client
+    writer.stop()
+    engine.dispose()
+
+
+class TestGroupCommitAPI:
+    def test_create_order(self, api):
+        response = api.post("/orders", json={"user_id": 1, "product_name": "Laptop", "quantity": 2})
+
+        assert response.status_code == 201
+        assert response.json() == {"id": 1, "user_id": 1, "product_name": "Laptop", "quantity": 2}
+        assert api.get("/orders/1").json() == response.json()
+
+    def test_unknown_user(self, api):
+        response = api.post("/orders", json={"user_id": 999, "product_name": "Laptop", "quantity": 2})
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Пользователь не найден"
+
+    def test_concurrent_orders(self, api):
+        def post(i):
+            return api.post("/orders", json={"user_id": 1, "product_name": f"P{i}", "quantity": 1})
+
+        with ThreadPoolExecutor(10) as pool:
+            responses = list(pool.map(post, range(30)))
+
+        assert {response.status_code for response in responses} == {201}
+        assert len({response.json()["id"] for response in responses}) == 30
+        assert api.get("/users/1/stats").json()["order_count"] == 30
+
+
+def first_order_db(headers, writer):
+    request = Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+    async def run():
+        dependency = get_order_db(request, writer)
+        try:
+            return await dependency.__anext__()
+        finally:
+            await dependency.aclose()
+
+    return asyncio.run(run())
+
+
+class TestOrderSession:
+    def test_group_commit_takes_no_session(self):
+        assert first_order_db({}, writer=object()) is None
+
+    def test_idempotency_key_and_direct_insert_take_session(self):
+        assert isinstance(first_order_db({IDEMPOTENCY_KEY_HEADER: "k"}, writer=object()), Session)
+        assert isinstance(first_order_db({}, writer=None), Session)
+
+
+class TestAsyncOrderSession:
+    def test_pending_flush_holds_no_session_slot(self, tmp_path):
+        pytest.importorskip("aiosqlite")
+        pytest.importorskip("greenlet")
+        from src.api import async_orders
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(User(username="alice", email="alice@example.com", age=30))
+            session.commit()
+        # Пачка фиксируется через 0.5 с после первого заказа: всё это время запрос ждёт
+        writer = GroupCommitWriter(sessionmaker(bind=engine), max_batch=50, max_latency=0.5)
+        writer.start()
+        app = FastAPI()
+        app.include_router(async_orders.router)
+        app.dependency_overrides[get_order_writer] = lambda: writer
+        app.dependency_overrides[get_cache] = LRUCache
+
+        async def scenario():
+            slots = _get_session_slots()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                post = asyncio.create_task(
+                    client.post("/orders", json={"user_id": 1, "product_name": "Laptop", "quantity": 1})
+                )
+                await asyncio.sleep(0.1)
+                pending, borrowed = not post.done(), slots.borrowed_tokens
+                return pending, borrowed, await post
+
+        try:
+            pending, borrowed, response = asyncio.run(scenario())
+        finally:
+            writer.stop()
+            engine.dispose()
+
+        assert pending
+        assert borrowed == 0
+        assert response.status_code == 201
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from src.api.idempotency import IDEMPOTENCY_KEY_HEADER, REPLAYED_HEADER, create_order_once
+from src.database.db import apply_sqlite_pragmas
+from src.models.orm_models import Base, IdempotencyKey, Order, User
+from src.models.pydantic_models import OrderCreate
+from tests.integration.test_async_api import make_client
+
+ORDER = {"user_id": 1, "product_name": "Laptop", "quantity": 1}
+
+
+def post_order(client, payload, key):
+    return client.post("/orders", json=payload, headers={IDEMPOTENCY_KEY_HEADER: key})
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def api(request, tmp_path):
+    if request.param:
+        pytest.importorskip("aiosqlite")
+        pytest.importorskip("greenlet")
+    with make_client(tmp_path / "app.db", use_async=request.param) as client:
+        client.post("/users", json={"username": "alice", "email": "alice@example.com", "age": 30})
+        yield client
+
+
+def order_count(client):
+    return len(client.get("/users/1/orders").json())
+
+
+class TestIdempotencyKey:
+    def test_replay_returns_stored_response(self, api):
+        first = post_order(api, ORDER, "key-1")
+        second = post_order(api, ORDER, "key-1")
+
+        assert first.status_code == 201
+        assert REPLAYED_HEADER not in first.headers
+        assert second.status_code == 201
+        assert second.headers[REPLAYED_HEADER] == "true"
+        assert second.content == first.content
+        assert order_count(api) == 1
+
+    def test_different_keys_create_different_orders(self, api):
+        first = post_order(api, ORDER, "key-1")
+        second = post_order(api, ORDER, "key-2")
+
+        assert first.json()["id"] != second.json()["id"]
+        assert order_count(api) == 2
+
+    def test_key_reused_with_other_body(self, api):
+        post_order(api, ORDER, "key-1")
+        response = post_order(api, {**ORDER, "quantity": 2}, "key-1")
+
+        assert response.status_code == 422
+        assert order_count(api) == 1
+
+    def test_unknown_user_does_not_store_key(self, api):
+        response = post_order(api, {**ORDER, "user_id": 999}, "key-1")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Пользователь не найден"
+
+        # Ключ не занят: повтор после исправления тела проходит
+        assert post_order(api, ORDER, "key-1").status_code == 201
+
+    def test_without_header_is_not_deduplicated(self, api):
+        api.post("/orders", json=ORDER)
+        api.post("/orders", json=ORDER)
+        assert order_count(api) == 2
+
+    def test_empty_key_rejected(self, api):
+        assert post_order(api, ORDER, "").status_code == 422
+
+
+class TestCreateOrderOnce:
+    @pytest.fixture
+    def session_factory(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+        apply_sqlite_pragmas(engine, "default")
+        Base.metadata.create_all(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            db.add(User(username="alice", email="alice@example.com", age=30))
+            db.commit()
+        yield SessionLocal
+        engine.dispose()
+
+    def test_expired_key_is_reused(self, session_factory):
+        order = OrderCreate(**ORDER)
+        with session_factory() as db:
+            create_order_once(db, order, "key-1", ttl=60)
+            db.execute(update(IdempotencyKey).values(created_at=time.time() - 120))
+            db.commit()
+
+            response = create_order_once(db, order, "key-1", ttl=60)
+
+            assert response.status_code == 201
+            assert REPLAYED_HEADER not in response.headers
+            assert db.scalar(select(func.count()).select_from(Order)) == 2
+            assert db.scalar(select(func.count()).select_from(IdempotencyKey)) == 1
+
+    def test_concurrent_requests_create_one_order(self, session_factory):
+        order = OrderCreate(**ORDER)
+        barrier = threading.Barrier(8)
+        responses = []
+
+        def worker():
+            with session_factory() as db:
+                barrier.wait()
+                responses.append(create_order_once(db, order, "key-1", ttl=60))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(responses) == 8
+        assert {response.status_code for response in responses} == {201}
+        assert len({response.body for response in responses}) == 1
+        assert sum(REPLAYED_HEADER not in response.headers for response in responses) == 1
+        with session_factory() as db:
+            assert db.scalar(select(func.count()).select_from(Order)) == 1
@@ -0,0 +1,127 @@
+import pytest
+
+from src.api.pagination import NEXT_CURSOR_HEADER
+from src.models.orm_models import Order, User
+
+
+@pytest.fixture
+def orders(db_session):
+    db_session.add_all([
+        User(id=1, username="alice", email="alice@example.com", age=30),
+        User(id=2, username="bob", email="bob@example.com", age=40),
+    ])
+    db_session.add_all([
+        Order(id=1, user_id=1, product_name="Laptop", quantity=1),
+        Order(id=2, user_id=1, product_name="Mouse", quantity=5),
+        Order(id=3, user_id=2, product_name="Laptop bag", quantity=2),
+        Order(id=4, user_id=1, product_name="laptop stand", quantity=3),
+        Order(id=5, user_id=2, product_name="Lamp", quantity=7),
+        Order(id=6, user_id=1, product_name="Laptop", quantity=9),
+    ])
+    db_session.commit()
+
+
+def ids(response):
+    return [order["id"] for order in response.json()]
+
+
+class TestOrderSearch:
+    def test_filters(self, client, orders):
+        assert ids(client.get("/orders/search", params={"user_id": 1})) == [1, 2, 4, 6]
+        # Начало названия с учётом регистра: "laptop stand" не подходит;
+        # без user_id заказы идут по названию товара, затем по id
+        assert ids(client.get("/orders/search", params={"product_prefix": "Lap"})) == [1, 6, 3]
+        assert ids(client.get("/orders/search", params={
+            "product_prefix": "Lap", "min_quantity": 2, "max_quantity": 9
+        })) == [6, 3]
+        assert ids(client.get("/orders/search", params={"user_id": 1, "product_prefix": "Laptop"})) == [1, 6]
+
+    def test_response_body(self, client, orders):
+        response = client.get("/orders/search", params={"user_id": 2, "product_prefix": "Lam"})
+        assert response.json() == [{"id": 5, "user_id": 2, "product_name": "Lamp", "quantity": 7}]
+
+    def test_sort_and_keyset_pages(self, client, orders):
+        pages = []
+        params = {"user_id": 1, "sort": "-id", "limit": 2}
+        while True:
+            response = client.get("/orders/search", params=params)
+            pages.append(ids(response))
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if cursor is None:
+                break
+            params["cursor"] = cursor
+
+        assert pages == [[6, 4], [2, 1], []]
+
+    def test_product_sort_pages(self, client, orders):
+        pages = []
+        params = {"product_prefix": "La", "limit": 2}
+        while True:
+            response = client.get("/orders/search", params=params)
+            pages.append(ids(response))
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if cursor is None:
+                break
+            params["cursor"] = cursor
+
+        # Lamp, Laptop (1, 6), Laptop bag
+        assert pages == [[5, 1], [6, 3], []]
+
+    @pytest.mark.parametrize("params", [
+        {},
+        {"min_quantity": 1},
+        {"user_id": 1, "min_quantity": 5, "max_quantity": 1},
+        {"user_id": 1, "cursor": "broken"},
+        {"product_prefix": "Lap", "sort": "id"},
+    ])
+    def test_rejected(self, client, orders, params):
+        assert client.get("/orders/search", params=params).status_code == 400
+
+    @pytest.mark.parametrize("params", [
+        {"user_id": 1, "sort": "quantity"},
+        {"user_id": 1, "limit": 0},
+        {"product_prefix": ""},
+    ])
+    def test_invalid_parameters(self, client, params):
+        assert client.get("/orders/search", params=params).status_code == 422
+
+
+class TestFulltextSearch:
+    def test_words_in_any_order_and_case(self, client, orders):
+        assert sorted(ids(client.get("/orders/search", params={"q": "LAPTOP", "sort": "id"}))) == [1, 3, 4, 6]
+        assert ids(client.get("/orders/search", params={"q": "bag laptop"})) == [3]
+        assert ids(client.get("/orders/search", params={"q": "laptop", "user_id": 2})) == [3]
+        assert ids(client.get("/orders/search", params={
+            "q": "laptop", "min_quantity": 3, "sort": "-id"
+        })) == [6, 4]
+
+    def test_ranked_by_relevance(self, client, orders):
+        response = client.get("/orders/search", params={"q": "laptop"})
+        # Короткие названия, где слово занимает большую часть, релевантнее
+        assert ids(response)[:2] == [1, 6]
+        assert set(ids(response)) == {1, 3, 4, 6}
+        assert set(response.json()[0]) == {"id", "user_id", "product_name", "quantity"}
+
+    def test_rank_keyset_pages(self, client, orders):
+        everything = ids(client.get("/orders/search", params={"q": "laptop"}))
+        pages = []
+        params = {"q": "laptop", "limit": 1}
+        while True:
+            response = client.get("/orders/search", params=params)
+            pages.extend(ids(response))
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if cursor is None:
+                break
+            params["cursor"] = cursor
+
+        assert pages == everything
+
+    @pytest.mark.parametrize("params", [
+        {"q": "laptop", "product_prefix": "Lap"},
+        {"q": "*-"},
+        {"user_id": 1, "sort": "rank"},
+        {"q": "laptop", "cursor": "broken"},
+        {"q": "laptop", "cursor": "aWQ6Mw"},
+    ])
+    def test_rejected(self, client, orders, params):
+        assert client.get("/orders/search", params=params).status_code == 400
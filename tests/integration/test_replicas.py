@@ -0,0 +1,92 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.cache import LRUCache, get_cache
+from src.database import db as db_module
+from src.database.db import apply_sqlite_pragmas
+from src.database.migrate import upgrade
+from src.database.replicas import PRIMARY_COOKIE, ReadYourWritesMiddleware, Replica, ReplicaPool
+from src.database.replicator import replicate
+from src.main import app
+
+USER = {"username": "alice", "email": "alice@example.com", "age": 30}
+
+
+@pytest.fixture
+def cluster(tmp_path, monkeypatch):
+    primary_path = tmp_path / "primary.db"
+    replica_paths = [str(tmp_path / "replica-1.db"), str(tmp_path / "replica-2.db")]
+    primary = create_engine(f"sqlite:///{primary_path}", connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(primary, "default")
+    upgrade(primary)
+    replicate(str(primary_path), replica_paths)
+    pool = ReplicaPool([
+        Replica(path, create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}))
+        for path in replica_paths
+    ])
+    monkeypatch.setattr(db_module, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=primary))
+    monkeypatch.setattr(db_module, "replica_pool", pool)
+    # Без кеша ответов: каждое чтение доходит до базы
+    app.dependency_overrides[get_cache] = lambda: LRUCache()
+
+    def sync():
+        replicate(str(primary_path), replica_paths)
+
+    yield pool, sync
+    app.dependency_overrides.clear()
+    pool.dispose()
+    primary.dispose()
+
+
+def make_client(**kwargs):
+    return TestClient(ReadYourWritesMiddleware(app, window=5), **kwargs)
+
+
+class TestReadReplicas:
+    def test_reads_go_to_replicas_until_synced(self, cluster):
+        pool, sync = cluster
+        writer, reader = make_client(), make_client()
+        with writer, reader:
+            user_id = writer.post("/users", json=USER).json()["id"]
+
+            # Реплики ещё не получили запись
+            assert reader.get(f"/users/{user_id}").status_code == 404
+            sync()
+            assert reader.get(f"/users/{user_id}").json()["username"] == "alice"
+
+    def test_read_your_writes(self, cluster):
+        writer = make_client()
+        with writer:
+            response = writer.post("/users", json=USER)
+            assert PRIMARY_COOKIE in response.cookies
+
+            # Своя запись видна сразу: чтение закреплено за основной базой
+            assert writer.get(f"/users/{response.json()['id']}").status_code == 200
+            assert writer.get("/users").json()[0]["username"] == "alice"
+
+            writer.cookies.set(PRIMARY_COOKIE, "1")
+            assert writer.get("/users").json() == []
+
+    def test_failed_write_does_not_pin(self, cluster):
+        with make_client() as client:
+            response = client.post("/orders", json={"user_id": 999, "product_name": "Laptop", "quantity": 1})
+            assert response.status_code == 404
+            assert PRIMARY_COOKIE not in response.cookies
+
+    def test_broken_replica_is_skipped(self, cluster, tmp_path):
+        pool, sync = cluster
+        # Пустой файл вместо реплики: схемы нет
+        broken = Replica("empty", create_engine(f"sqlite:///{tmp_path / 'empty.db'}",
+                                                connect_args={"check_same_thread": False}))
+        pool.replicas.insert(0, broken)
+        with make_client(raise_server_exceptions=False) as client:
+            client.post("/users", json=USER)
+            sync()
+            client.cookies.clear()
+
+            # Первое чтение попадает на реплику без схемы и выключает её
+            assert client.get("/users").status_code == 500
+            assert not broken.healthy
+            assert all(client.get("/users").json()[0]["username"] == "alice" for _ in range(4))
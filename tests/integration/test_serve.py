@@ -0,0 +1,53 @@
+import json
+import os
+import signal
+import socket
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+from benchmarks.bench_async_load import free_port
+from benchmarks.run import start_serve
+from src.database.migrate import upgrade
+
+
+@pytest.fixture
+def server(tmp_path):
+    db_path = tmp_path / "serve.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    upgrade(engine)
+    engine.dispose()
+
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    process = start_serve(str(tmp_path), port, workers=2, env=env)
+    yield process, port
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+def test_sigterm_drains_in_flight_request(server):
+    process, port = server
+    body = (json.dumps({"username": "slow", "email": "slow@example.com", "age": 30}) + "\n").encode()
+
+    with socket.create_connection(("127.0.0.1", port), timeout=30) as conn:
+        # Запрос начат: заголовки и часть тела уже у воркера
+        conn.sendall(
+            b"POST /users/bulk HTTP/1.1\r\nHost: test\r\nContent-Type: application/x-ndjson\r\n"
+            b"Content-Length: %d\r\n\r\n" % len(body) + body[:10]
+        )
+        time.sleep(0.5)
+        process.send_signal(signal.SIGTERM)
+        time.sleep(0.5)
+        conn.sendall(body[10:])
+        # Во время остановки сервер закрывает соединение после ответа
+        chunks = []
+        while chunk := conn.recv(65536):
+            chunks.append(chunk)
+        response = b"".join(chunks).decode()
+
+    assert response.startswith("HTTP/1.1 200")
+    assert '"created":1' in response
+    assert process.wait(timeout=30) == 0
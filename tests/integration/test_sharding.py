@@ -0,0 +1,141 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.exc import IntegrityError
+
+from src.api import sharded
+from src.database.db import apply_sqlite_pragmas
+from src.database.migrate import upgrade
+from src.database.reshard import reshard
+from src.database.sharding import SLOT_MOVING, Shard, ShardRouter, get_shard_router, init_slots, slot_of
+from src.models.orm_models import ShardSlot
+
+
+def make_shard(tmp_path, name):
+    engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(engine, "default")
+    upgrade(engine)
+    return Shard(name, engine)
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    shards = [make_shard(tmp_path, name) for name in ("s1", "s2", "s3")]
+    init_slots(ShardRouter(shards[:2]))
+    # Сервис знает о третьем шарде заранее, слотов у того пока нет
+    router = ShardRouter(shards)
+    router.refresh()
+    app = FastAPI()
+    app.include_router(sharded.users_router)
+    app.include_router(sharded.orders_router)
+    app.dependency_overrides[get_shard_router] = lambda: router
+    with TestClient(app) as client:
+        yield client, router, shards
+    router.dispose()
+
+
+def create_users(client, count):
+    return [
+        client.post("/users", json={"username": f"user{n}", "email": f"user{n}@example.com", "age": 20}).json()["id"]
+        for n in range(count)
+    ]
+
+
+class TestShardedApi:
+    def test_user_and_orders_live_on_one_shard(self, cluster):
+        client, router, _ = cluster
+        user_id = create_users(client, 1)[0]
+        response = client.post("/orders", json={"user_id": user_id, "product_name": "Book", "quantity": 2})
+        assert response.status_code == 201
+        order_id = response.json()["id"]
+        assert slot_of(order_id) == slot_of(user_id)
+
+        assert client.get(f"/users/{user_id}").json()["username"] == "user0"
+        assert client.get(f"/orders/{order_id}").json()["product_name"] == "Book"
+        assert [order["id"] for order in client.get(f"/users/{user_id}/orders").json()] == [order_id]
+
+    def test_not_found_and_duplicates(self, cluster):
+        client, router, _ = cluster
+        user_id = create_users(client, 1)[0]
+        assert client.get(f"/users/{user_id + 1}").status_code == 404
+        assert client.post("/orders", json={"user_id": user_id + 1, "product_name": "Book", "quantity": 1}) \
+            .status_code == 404
+        duplicate = client.post("/users", json={"username": "user0", "email": "other@example.com", "age": 20})
+        assert duplicate.status_code == 400
+
+    def test_scatter_pagination_covers_all_shards(self, cluster):
+        client, router, _ = cluster
+        user_ids = create_users(client, 25)
+        assert {router.shard_for_id(user_id).name for user_id in user_ids} == {"s1", "s2"}
+
+        seen, cursor = [], None
+        while True:
+            response = client.get("/users", params={"limit": 10, **({"cursor": cursor} if cursor else {})})
+            seen.extend(user["id"] for user in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert seen == sorted(user_ids)
+
+    def test_writes_to_moving_slot_get_503(self, cluster):
+        client, router, _ = cluster
+        user_id = create_users(client, 1)[0]
+        with router.shard_for_id(user_id).engine.begin() as conn:
+            conn.execute(update(ShardSlot).where(ShardSlot.slot == slot_of(user_id)).values(state=SLOT_MOVING))
+        response = client.post("/orders", json={"user_id": user_id, "product_name": "Book", "quantity": 1})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        # Чтение переносимого слота продолжается из источника
+        assert client.get(f"/users/{user_id}").status_code == 200
+
+    def test_id_collision_on_every_attempt_is_not_503(self, cluster, monkeypatch):
+        client, router, _ = cluster
+        user_id = create_users(client, 1)[0]
+        monkeypatch.setattr(router, "new_user_id", lambda: user_id)
+
+        with pytest.raises(IntegrityError):
+            client.post("/users", json={"username": "other", "email": "other@example.com", "age": 20})
+
+    def test_unsupported_list_params_are_rejected(self, cluster):
+        client, _, _ = cluster
+        create_users(client, 3)
+        for path in ("/users", "/orders"):
+            for params in ({"skip": 2}, {"ids": "1,2"}, {"include": "orders"}):
+                response = client.get(path, params=params)
+                assert response.status_code == 400
+                assert next(iter(params)) in response.json()["detail"]
+        assert client.get("/users", params={"skip": 0}).status_code == 200
+
+    def test_idempotency_key_is_rejected(self, cluster):
+        client, router, _ = cluster
+        user_id = create_users(client, 1)[0]
+        response = client.post(
+            "/orders", json={"user_id": user_id, "product_name": "Book", "quantity": 1},
+            headers={"Idempotency-Key": "retry-1"},
+        )
+        assert response.status_code == 501
+        assert client.get(f"/users/{user_id}/orders").json() == []
+
+    @pytest.mark.parametrize("method, path", [
+        ("post", "/users/bulk"), ("get", "/users/export"), ("get", "/users/1/stats"),
+        ("post", "/orders/bulk"), ("get", "/orders/export"), ("get", "/orders/stats"), ("get", "/orders/search"),
+    ])
+    def test_single_database_routes_answer_501(self, cluster, method, path):
+        client, _, _ = cluster
+        assert client.request(method, path).status_code == 501
+
+    def test_stale_map_follows_reshard(self, cluster):
+        client, router, shards = cluster
+        user_ids = create_users(client, 30)
+        # Решардинг другим процессом: карта сервиса устаревает
+        moves = reshard(ShardRouter(shards))
+        moved = [user_id for user_id in user_ids if slot_of(user_id) in {slot for slot, _, _ in moves}]
+        assert moved
+
+        user_id = moved[0]
+        assert client.get(f"/users/{user_id}").status_code == 200
+        response = client.post("/orders", json={"user_id": user_id, "product_name": "Book", "quantity": 1})
+        assert response.status_code == 201
+        assert router.shard_for_id(user_id).name == "s3"
+        assert len(client.get("/users", params={"limit": 100}).json()) == len(user_ids)
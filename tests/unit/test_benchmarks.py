@@ -0,0 +1,111 @@
+import json
+import random
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from benchmarks import compare
+from benchmarks.run import percentile, summarize
+from benchmarks.scenarios import SCENARIOS, Context, select_scenarios
+from benchmarks.seed import seed
+from src.database.summary import verify_summary
+from src.models.orm_models import Order, User
+
+
+def results(**scenarios):
+    return {"meta": {"mode": "asgi", "scale": "10k", "concurrency": 50}, "scenarios": scenarios}
+
+
+def scenario_result(p95=10.0, p99=20.0, rps=1000.0, errors=0):
+    return {"p95_ms": p95, "p99_ms": p99, "rps": rps, "errors": errors}
+
+
+class TestStatistics:
+    def test_percentile_interpolates(self):
+        values = [1.0, 2.0, 3.0, 4.0]
+        assert percentile(values, 0) == 1.0
+        assert percentile(values, 50) == 2.5
+        assert percentile(values, 100) == 4.0
+        assert percentile([], 99) == 0.0
+
+    def test_summarize(self):
+        summary = summarize([0.001 * i for i in range(1, 101)], errors=2, elapsed=0.5)
+
+        assert summary["requests"] == 100
+        assert summary["errors"] == 2
+        assert summary["p50_ms"] == pytest.approx(50.5)
+        assert summary["p99_ms"] == pytest.approx(99.01)
+        assert summary["rps"] == 200.0
+
+
+class TestCompare:
+    def test_within_threshold(self):
+        baseline = results(user_get=scenario_result())
+        current = results(user_get=scenario_result(p95=10.5, rps=960.0))
+
+        assert compare.find_regressions(baseline, current, threshold=10) == []
+
+    def test_latency_and_throughput_regressions(self):
+        baseline = results(user_get=scenario_result(), order_get=scenario_result())
+        current = results(user_get=scenario_result(p95=15.0), order_get=scenario_result(rps=500.0))
+
+        found = {(r.scenario, r.metric) for r in compare.find_regressions(baseline, current, threshold=10)}
+        assert found == {("user_get", "p95_ms"), ("order_get", "rps")}
+
+    def test_new_errors_are_regression(self):
+        baseline = results(user_get=scenario_result())
+        current = results(user_get=scenario_result(errors=3))
+
+        assert [r.metric for r in compare.find_regressions(baseline, current, threshold=10)] == ["errors"]
+
+    def test_exit_code(self, tmp_path, capsys):
+        baseline = tmp_path / "baseline.json"
+        current = tmp_path / "current.json"
+        baseline.write_text(json.dumps(results(user_get=scenario_result())))
+        current.write_text(json.dumps(results(user_get=scenario_result(p99=40.0), extra=scenario_result())))
+
+        assert compare.main([str(baseline), str(current)]) == 1
+        output = capsys.readouterr().out
+        assert "Регрессия: user_get: p99_ms" in output
+        assert "Сценарий extra есть только в новом прогоне" in output
+        assert compare.main([str(baseline), str(baseline)]) == 0
+
+
+class TestSeed:
+    def test_seed_and_reuse(self, tmp_path):
+        db_path = str(tmp_path / "seed.db")
+
+        assert seed(db_path, "tiny") == (100, 1000)
+        # Повторный запуск не вставляет строки заново
+        assert seed(db_path, "tiny") == (100, 1000)
+
+        engine = create_engine(f"sqlite:///{db_path}")
+        with Session(engine) as db:
+            assert db.scalar(select(func.count()).select_from(User)) == 100
+            assert db.scalar(select(func.count()).select_from(Order)) == 1000
+            assert verify_summary(db) == []
+        engine.dispose()
+
+
+class TestScenarios:
+    def test_select_scenarios(self):
+        assert [s.name for s in select_scenarios(["user_get", "order_get"])] == ["user_get", "order_get"]
+        assert all(not s.write for s in select_scenarios([], include_writes=False))
+        with pytest.raises(ValueError):
+            select_scenarios(["missing"])
+
+    def test_every_scenario_succeeds(self, client, db_session):
+        # Сценарии должны оставаться в согласии с API: каждый запрос — 2xx или 304
+        db_session.add_all(User(id=i, username=f"user_{i}", email=f"user_{i}@example.com", age=30)
+                           for i in range(1, 11))
+        db_session.add_all(Order(user_id=i % 10 + 1, product_name="Laptop", quantity=1) for i in range(20))
+        db_session.commit()
+        ctx = Context(users=10, orders=20)
+        rnd = random.Random(0)
+
+        for scenario in SCENARIOS:
+            method, path, kwargs = scenario.build(ctx, rnd)
+            response = client.request(method, path, **kwargs)
+            assert response.is_success or response.status_code == 304, \
+                (scenario.name, response.status_code, response.text)
@@ -0,0 +1,95 @@
+from src.cache import Cache, LRUCache, RedisCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Минимальная подделка redis.Redis: get/set(ex=)/delete."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class TestLRUCache:
+    def test_hit_and_miss(self):
+        cache = LRUCache(max_size=10, ttl=60)
+
+        assert cache.get("user:1") is None
+        cache.set("user:1", b"{}")
+        assert cache.get("user:1") == b"{}"
+        assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "evictions": 0}
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache = LRUCache(max_size=10, ttl=5, clock=clock)
+        cache.set("user:1", b"{}")
+
+        clock.now = 4.9
+        assert cache.get("user:1") == b"{}"
+        clock.now = 5.0
+        assert cache.get("user:1") is None
+        assert cache.stats.evictions == 1
+        assert len(cache) == 0
+
+    def test_size_cap_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        cache.get("a")
+        cache.set("c", b"3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1"
+        assert cache.get("c") == b"3"
+        assert cache.stats.evictions == 1
+
+    def test_delete(self):
+        cache = LRUCache()
+        cache.set("a", b"1")
+        cache.delete("a", "missing")
+
+        assert cache.get("a") is None
+
+
+class TestRedisCache:
+    def test_roundtrip_with_prefix_and_ttl(self):
+        client = FakeRedis()
+        cache = RedisCache(client, ttl=30, prefix="uos:")
+
+        assert cache.get("order:1") is None
+        cache.set("order:1", b"{}")
+
+        assert client.data == {"uos:order:1": b"{}"}
+        assert client.ttls == {"uos:order:1": 30}
+        assert cache.get("order:1") == b"{}"
+        assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "evictions": 0}
+
+        cache.delete("order:1")
+        assert client.data == {}
+
+
+class TestDisabledCache:
+    def test_never_stores(self):
+        cache = Cache()
+        cache.set("a", b"1")
+
+        assert cache.get("a") is None
+        assert cache.stats.misses == 1
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from src.config import Settings
+from src.database.db import apply_sqlite_pragmas, engine_options, sqlite_pragmas
+
+
+def read_pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+class TestSqlitePragmas:
+    def test_production_profile(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+        apply_sqlite_pragmas(engine, "production")
+
+        assert read_pragma(engine, "journal_mode") == "wal"
+        assert read_pragma(engine, "synchronous") == 1  # NORMAL
+        assert read_pragma(engine, "foreign_keys") == 1
+        assert read_pragma(engine, "cache_size") == -64000
+        assert read_pragma(engine, "temp_store") == 2  # MEMORY
+        assert read_pragma(engine, "busy_timeout") == 5000
+        engine.dispose()
+
+    def test_default_profile_only_enables_foreign_keys(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+        apply_sqlite_pragmas(engine, "default")
+
+        assert read_pragma(engine, "foreign_keys") == 1
+        assert read_pragma(engine, "journal_mode") == "delete"
+        engine.dispose()
+
+    def test_overrides(self):
+        pragmas = sqlite_pragmas("production", {"cache_size": -2000, "mmap_size": 0})
+
+        assert pragmas["cache_size"] == -2000
+        assert pragmas["mmap_size"] == 0
+        assert pragmas["journal_mode"] == "WAL"
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            sqlite_pragmas("turbo")
+
+    def test_rejects_unsafe_value(self):
+        with pytest.raises(ValueError):
+            sqlite_pragmas("default", {"cache_size": "1; DROP TABLE users"})
+
+
+class TestSettings:
+    def test_defaults(self, monkeypatch):
+        monkeypatch.delenv("DATABASE_URL", raising=False)
+        settings = Settings(_env_file=None)
+
+        assert settings.database_url == "sqlite:///./test.db"
+        assert settings.effective_pool_size == settings.threadpool_size
+
+    def test_from_environment(self, monkeypatch):
+        monkeypatch.setenv("DATABASE_URL", "postgresql://app:secret@db/app")
+        monkeypatch.setenv("POOL_SIZE", "20")
+        monkeypatch.setenv("SQLITE_PRAGMAS", '{"cache_size": -2000}')
+        monkeypatch.setenv("WORKERS", "4")
+        settings = Settings(_env_file=None)
+
+        assert settings.database_url == "postgresql://app:secret@db/app"
+        assert settings.effective_pool_size == 20
+        assert settings.sqlite_pragmas == {"cache_size": -2000}
+        assert settings.workers == 4
+
+
+class TestEngineOptions:
+    def test_sqlite_memory_uses_static_pool(self):
+        options = engine_options("sqlite:///:memory:", Settings(_env_file=None))
+
+        assert options["poolclass"] is StaticPool
+        assert "pool_size" not in options
+
+    def test_sqlite_file_pool_sized_to_threadpool(self):
+        options = engine_options("sqlite:///./app.db", Settings(_env_file=None, threadpool_size=16))
+
+        assert options["poolclass"] is QueuePool
+        assert options["pool_size"] == 16
+        assert "pool_pre_ping" not in options
+
+    def test_server_database(self):
+        settings = Settings(_env_file=None, pool_size=8, max_overflow=2, pool_recycle=600)
+        options = engine_options("postgresql://app@db/app", settings)
+
+        assert options["poolclass"] is QueuePool
+        assert options["pool_size"] == 8
+        assert options["max_overflow"] == 2
+        assert options["pool_recycle"] == 600
+        assert options["pool_pre_ping"] is True
+
+    @pytest.mark.parametrize("url", ["postgresql+asyncpg://app@db/app", "postgresql+psycopg_async://app@db/app"])
+    def test_async_driver_keeps_default_pool_class(self, url):
+        options = engine_options(url, Settings(_env_file=None))
+
+        assert "poolclass" not in options
+        assert options["pool_size"] == 40
+
+    def test_explicit_sync_driver_gets_queue_pool(self):
+        options = engine_options("sqlite+pysqlite:///./app.db", Settings(_env_file=None))
+
+        assert options["poolclass"] is QueuePool
@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from src.database import group_commit
+from src.database.db import apply_sqlite_pragmas
+from src.database.group_commit import GroupCommitWriter
+from src.models.orm_models import Base, Order, User, UserOrderStats
+from src.models.pydantic_models import OrderCreate
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(engine, "default")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(username="alice", email="alice@example.com", age=30))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def commit_counter(engine):
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    return commits
+
+
+def order(user_id=1, quantity=1):
+    return OrderCreate(user_id=user_id, product_name="Laptop", quantity=quantity)
+
+
+class TestGroupCommitWriter:
+    def test_concurrent_orders_share_one_commit(self, engine, session_factory):
+        commits = commit_counter(engine)
+        writer = GroupCommitWriter(session_factory, max_batch=8, max_latency=5.0)
+        futures = [writer.submit(order(quantity=i + 1)) for i in range(8)]
+        # Пачка полна до истечения max_latency
+        writer.start()
+        results = [future.result(timeout=5) for future in futures]
+        writer.stop()
+
+        assert [result.status for result in results] == ["created"] * 8
+        assert len({result.id for result in results}) == 8
+        assert len(commits) == 1
+        with session_factory() as db:
+            assert db.scalar(select(func.count()).select_from(Order)) == 8
+            assert db.get(UserOrderStats, 1).total_quantity == sum(range(1, 9))
+
+    def test_flushes_after_max_latency(self, session_factory):
+        writer = GroupCommitWriter(session_factory, max_batch=100, max_latency=0.01)
+        writer.start()
+        try:
+            assert writer.create_order(order()).status == "created"
+        finally:
+            writer.stop()
+
+    def test_unknown_user_rejected_alone(self, session_factory):
+        writer = GroupCommitWriter(session_factory, max_batch=3, max_latency=5.0)
+        futures = [writer.submit(order()), writer.submit(order(user_id=999)), writer.submit(order())]
+        writer.start()
+        results = [future.result(timeout=5) for future in futures]
+        writer.stop()
+
+        assert [result.status for result in results] == ["created", "user_not_found", "created"]
+
+    def test_failed_batch_fails_every_request(self, session_factory, monkeypatch):
+        def broken(db, items, results):
+            raise OperationalError("INSERT", {}, Exception("disk I/O error"))
+
+        monkeypatch.setattr(group_commit, "bulk_create_orders", broken)
+        writer = GroupCommitWriter(session_factory, max_batch=2, max_latency=5.0)
+        futures = [writer.submit(order()), writer.submit(order())]
+        writer.start()
+        for future in futures:
+            with pytest.raises(OperationalError):
+                future.result(timeout=5)
+        writer.stop()
+
+    def test_cancelled_order_not_written(self, session_factory):
+        writer = GroupCommitWriter(session_factory, max_batch=2, max_latency=5.0)
+        cancelled = writer.submit(order())
+        kept = writer.submit(order())
+        assert cancelled.cancel()
+        writer.start()
+        assert kept.result(timeout=5).status == "created"
+        writer.stop()
+
+        with session_factory() as db:
+            assert db.scalar(select(func.count()).select_from(Order)) == 1
+
+    def test_stop_drains_queue(self, session_factory):
+        writer = GroupCommitWriter(session_factory, max_batch=100, max_latency=5.0)
+        futures = [writer.submit(order()) for _ in range(3)]
+        writer.start()
+        writer.stop()
+
+        assert all(future.result(timeout=0).status == "created" for future in futures)
+        with pytest.raises(RuntimeError):
+            writer.submit(order())
+
+    def test_threads_waiting_on_writer(self, session_factory):
+        writer = GroupCommitWriter(session_factory, max_batch=100, max_latency=0.05)
+        writer.start()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(writer.create_order(order()))) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.stop()
+
+        assert len({result.id for result in results}) == 20
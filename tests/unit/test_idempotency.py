@@ -0,0 +1,48 @@
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from src.database import idempotency
+from src.database.idempotency import is_expired, find_key, purge_expired, purge_periodically, store_key
+from src.models.orm_models import IdempotencyKey
+
+
+def add_key(db, key, created_at):
+    store_key(db, key, "hash", 201, b"{}")
+    find_key(db, key).created_at = created_at
+    db.commit()
+
+
+class TestIdempotencyStore:
+    def test_is_expired(self, db_session):
+        add_key(db_session, "k", created_at=1000.0)
+        stored = find_key(db_session, "k")
+
+        assert not is_expired(stored, ttl=60, now=1059.0)
+        assert is_expired(stored, ttl=60, now=1061.0)
+
+    def test_purge_expired(self, db_session, monkeypatch):
+        monkeypatch.setattr(idempotency, "PURGE_BATCH_SIZE", 2)
+        for i in range(5):
+            add_key(db_session, f"old-{i}", created_at=1000.0)
+        add_key(db_session, "fresh", created_at=2000.0)
+
+        assert purge_expired(db_session, ttl=100, now=2050.0) == 5
+        assert db_session.scalars(select(IdempotencyKey.key)).all() == ["fresh"]
+
+    def test_purge_periodically(self, db_session):
+        add_key(db_session, "old", created_at=1000.0)
+        session_factory = sessionmaker(bind=db_session.get_bind())
+
+        async def run():
+            task = asyncio.create_task(purge_periodically(session_factory, ttl=100, interval=0.01))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if find_key(db_session, "old") is None:
+                    break
+            task.cancel()
+
+        asyncio.run(run())
+        db_session.expire_all()
+        assert find_key(db_session, "old") is None
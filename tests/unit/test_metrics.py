@@ -0,0 +1,215 @@
+import asyncio
+
+import threading
+
+import anyio
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.metrics import (
+    Counter, Histogram, MetricsMiddleware, MetricsRegistry, RequestMetrics, TimedRoute,
+    _current, instrument_engine, record_serialization, route_class, server_timing
+)
+from src.config import Settings
+
+
+class TestHistogram:
+    def test_prometheus_text(self):
+        histogram = Histogram("latency_seconds", "Задержка", ("route",), (0.1, 1.0))
+        histogram.observe(("/a",), 0.05)
+        histogram.observe(("/a",), 0.1)
+        histogram.observe(("/a",), 3.0)
+
+        assert histogram.collect() == [
+            "# HELP latency_seconds Задержка",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{route="/a",le="0.1"} 2',
+            'latency_seconds_bucket{route="/a",le="1.0"} 2',
+            'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+            'latency_seconds_sum{route="/a"} 3.15',
+            'latency_seconds_count{route="/a"} 3',
+        ]
+
+    def test_label_escaping(self):
+        counter = Counter("requests_total", "Запросы", ("route",))
+        counter.inc(('a"b\\c',))
+
+        assert counter.collect()[-1] == 'requests_total{route="a\\"b\\\\c"} 1'
+
+    def test_inc_many(self):
+        counter = Counter("requests_total", "Запросы", ("route",))
+        counter.inc_many([(("/a",), 1), (("/b",), 2), (("/a",), 1)])
+
+        assert counter.collect()[2:] == ['requests_total{route="/a"} 2', 'requests_total{route="/b"} 2']
+
+
+class TestEngineInstrumentation:
+    def test_counts_only_inside_request(self, db_session):
+        engine = db_session.get_bind()
+        instrument_engine(engine)
+        instrument_engine(engine)  # повторная подписка не удваивает счёт
+
+        db_session.execute(text("SELECT 1"))
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            db_session.execute(text("SELECT 1"))
+            db_session.execute(text("SELECT 2"))
+            record_serialization(0.5)
+        finally:
+            _current.reset(token)
+
+        assert metrics.statements == 2
+        assert metrics.db_time > 0
+        assert metrics.serialization_time == 0.5
+
+    def test_failed_statement_is_not_counted(self, db_session):
+        instrument_engine(db_session.get_bind())
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            try:
+                db_session.execute(text("SELECT * FROM no_such_table"))
+            except OperationalError:
+                db_session.rollback()
+            db_session.execute(text("SELECT 1"))
+        finally:
+            _current.reset(token)
+
+        assert metrics.statements == 1
+
+
+    def test_counts_executemany_and_statements_without_params(self, db_session):
+        instrument_engine(db_session.get_bind())
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            connection = db_session.connection()
+            connection.exec_driver_sql("CREATE TEMP TABLE numbers (n INTEGER)")
+            connection.exec_driver_sql("INSERT INTO numbers (n) VALUES (?)", [(1,), (2,), (3,)])
+        finally:
+            _current.reset(token)
+
+        assert metrics.statements == 2
+
+
+class TestRouteClass:
+    def test_timed_only_with_metrics_enabled(self):
+        assert route_class(Settings(_env_file=None, metrics_enabled=True)) is TimedRoute
+        assert route_class(Settings(_env_file=None, metrics_enabled=False)) is APIRoute
+
+
+class TestThreadpoolWait:
+    def test_sync_handler_waits_for_busy_thread(self):
+        registry = MetricsRegistry()
+        router = APIRouter(route_class=TimedRoute)
+        release = threading.Event()
+
+        @router.get("/block")
+        def block():
+            release.wait(5)
+            return {}
+
+        @router.get("/fast")
+        def fast():
+            return {}
+
+        app = FastAPI()
+        app.include_router(router)
+        timed = MetricsMiddleware(app, registry, server_timing=True)
+
+        async def scenario():
+            # Один поток в пуле: второй запрос ждёт, пока первый его не освободит
+            anyio.to_thread.current_default_thread_limiter().total_tokens = 1
+            async with anyio.create_task_group() as tasks:
+                headers = {}
+
+                async def request(path):
+                    async def receive():
+                        return {"type": "http.request", "body": b""}
+
+                    async def send(message):
+                        if message["type"] == "http.response.start":
+                            headers[path] = dict(message["headers"])[b"server-timing"].decode()
+
+                    scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+                             "query_string": b"", "headers": [], "root_path": ""}
+                    await timed(scope, receive, send)
+
+                tasks.start_soon(request, "/block")
+                await anyio.sleep(0.05)
+                tasks.start_soon(request, "/fast")
+                await anyio.sleep(0.1)
+                release.set()
+            return headers
+
+        headers = anyio.run(scenario)
+
+        wait = float(headers["/fast"].split("wait;dur=")[1].split(",")[0])
+        assert wait >= 50
+        assert 'threadpool_wait_seconds_count{method="GET",route="/fast"} 1' in registry.render()
+
+
+class TestMiddleware:
+    def test_server_timing_and_registry(self):
+        registry = MetricsRegistry()
+
+        async def app(scope, receive, send):
+            _current.get().statements += 3
+            await send({"type": "http.response.start", "status": 201, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": "/users", "method": "POST"}
+        asyncio.run(MetricsMiddleware(app, registry, server_timing=True)(scope, None, send))
+
+        headers = dict(sent[0]["headers"])
+        assert headers[b"server-timing"].startswith(b'db;dur=0.00;desc="3 queries", ser;dur=0.00')
+        rendered = registry.render()
+        assert 'http_requests_total{method="POST",route="unmatched",status="201"} 1' in rendered
+        assert 'db_statements_per_request_bucket{method="POST",route="unmatched",le="3"} 1' in rendered
+
+    def test_server_timing_off_by_default(self):
+        registry = MetricsRegistry()
+        sent = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(MetricsMiddleware(app, registry)({"type": "http", "path": "/users", "method": "GET"}, None, send))
+
+        assert sent[0]["headers"] == []
+        assert 'http_requests_total{method="GET",route="unmatched",status="200"} 1' in registry.render()
+
+    def test_excluded_path_untouched(self):
+        registry = MetricsRegistry()
+        sent = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(MetricsMiddleware(app, registry)({"type": "http", "path": "/metrics", "method": "GET"}, None, send))
+
+        assert sent[0]["headers"] == []
+        assert "http_requests_total{" not in registry.render()
+
+    def test_server_timing_format(self):
+        metrics = RequestMetrics()
+        metrics.statements = 1
+        metrics.db_time = 0.0012
+
+        assert server_timing(metrics, 0.005) == \
+            'db;dur=1.20;desc="1 queries", ser;dur=0.00, wait;dur=0.00, session;dur=0.00, total;dur=5.00'
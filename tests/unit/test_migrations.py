@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from src.database import db
+from src.database.fulltext import is_fts_table
+from src.database.migrate import (
+    SchemaVersionError, check_schema_version, current_version, discover_migrations, head_version,
+    schema_version, upgrade,
+)
+from src.database.schema import find_index_drift
+from src.database.summary import verify_summary
+from src.main import lifespan
+from src.models.orm_models import Base, Order, ProductOrderStats, User
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_single_declarative_base():
+    assert db.Base is Base
+
+
+def test_migrations_are_numbered_in_order():
+    versions = [migration.version for migration in discover_migrations()]
+    assert versions == sorted(versions)
+    assert head_version() == versions[-1]
+
+
+class TestUpgrade:
+    def test_fresh_database_matches_models(self, engine):
+        assert upgrade(engine) == [migration.version for migration in discover_migrations()]
+
+        tables = {name for name in inspect(engine).get_table_names() if not is_fts_table(name)}
+        assert tables == set(Base.metadata.tables) | {schema_version.name}
+        assert find_index_drift(engine) == []
+        for table in Base.metadata.sorted_tables:
+            columns = {column["name"] for column in inspect(engine).get_columns(table.name)}
+            assert columns == set(table.columns.keys())
+        with engine.connect() as conn:
+            assert current_version(conn) == head_version()
+
+    def test_row_versions_backfilled(self, engine):
+        upgrade(engine, target=2)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO users (id, username, email, age) VALUES (1, 'alice', 'a@example.com', 30)")
+            conn.exec_driver_sql("INSERT INTO orders (user_id, product_name, quantity) VALUES (1, 'Laptop', 2)")
+            conn.exec_driver_sql(
+                "INSERT INTO user_order_stats (user_id, order_count, total_quantity) VALUES (1, 1, 2)"
+            )
+
+        upgrade(engine)
+
+        with Session(engine) as session:
+            user = session.get(User, 1)
+            assert (user.version, user.orders_version) == (1, 1)
+            assert session.scalar(select(Order.version)) == 1
+
+    def test_upgrade_is_idempotent(self, engine):
+        upgrade(engine)
+        assert upgrade(engine) == []
+
+    def test_adopts_database_created_without_migrations(self, engine):
+        # База из времён create_all: нет ни индекса, ни сводных таблиц
+        Base.metadata.create_all(engine, tables=[User.__table__, Order.__table__])
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_orders_user_id_id")
+            conn.execute(User.__table__.insert(), [{"id": 1, "username": "alice", "email": "a@example.com", "age": 30}])
+            conn.execute(Order.__table__.insert(), [
+                {"user_id": 1, "product_name": "Laptop", "quantity": 2},
+                {"user_id": 1, "product_name": "Mouse", "quantity": 1},
+            ])
+
+        upgrade(engine)
+
+        assert find_index_drift(engine) == []
+        with Session(engine) as session:
+            assert verify_summary(session) == []
+            assert session.scalar(select(ProductOrderStats.order_count).where(
+                ProductOrderStats.product_name == "Laptop")) == 1
+
+
+class TestSchemaVersionCheck:
+    def test_rejects_unmigrated_database(self, engine):
+        with pytest.raises(SchemaVersionError, match="migrate upgrade"):
+            check_schema_version(engine)
+
+    def test_accepts_head(self, engine):
+        upgrade(engine)
+        assert check_schema_version(engine) == head_version()
+
+    def test_newer_schema_only_warns(self, engine, caplog):
+        upgrade(engine)
+        with engine.begin() as conn:
+            conn.execute(schema_version.insert().values(
+                version=head_version() + 1, description="будущая", applied_at=datetime.now(timezone.utc)
+            ))
+
+        assert check_schema_version(engine) == head_version() + 1
+        assert "новее кода" in caplog.text
+
+    def test_reports_index_drift(self, engine, caplog):
+        upgrade(engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_orders_user_id_id")
+
+        assert check_schema_version(engine) == head_version()
+        assert "ix_orders_user_id_id" in caplog.text
+
+    def test_lifespan_refuses_to_start_on_old_schema(self, engine, monkeypatch):
+        monkeypatch.setattr("src.main.engine", engine)
+        app = FastAPI(lifespan=lifespan)
+
+        with pytest.raises(SchemaVersionError):
+            with TestClient(app):
+                pass
@@ -0,0 +1,179 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, delete, insert, update
+from sqlalchemy.pool import StaticPool
+
+from src.database.fulltext import FTS_TABLE, match_query, rebuild_fulltext
+from src.database.migrate import upgrade
+from src.database.order_search import (
+    INDEX_SORTS, PRODUCT_PREFIX, QUANTITY, SEARCH_PLANS, TEXT, USER_ID, OrderSearch, OrderSort, SearchError,
+    default_sort, prefix_upper_bound, search_index, search_statement,
+)
+from src.models.orm_models import Order, User
+
+
+@pytest.fixture(params=[False, True], ids=["no-stats", "analyzed"])
+def engine(request):
+    # Схема из миграций: индексы те же, что в рабочей базе
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    upgrade(engine)
+    rnd = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"user_{i}", "email": f"user_{i}@example.com", "age": 30} for i in range(1, 201)
+        ])
+        conn.execute(insert(Order), [
+            {"user_id": rnd.randint(1, 200), "product_name": f"Product {rnd.randrange(50)}",
+             "quantity": rnd.randint(1, 10)}
+            for _ in range(5000)
+        ])
+        if request.param:
+            conn.exec_driver_sql("ANALYZE")
+    yield engine
+    engine.dispose()
+
+
+def search_for(filters):
+    return OrderSearch(
+        user_id=5 if USER_ID in filters else None,
+        product_prefix="Product 1" if PRODUCT_PREFIX in filters else None,
+        min_quantity=2 if QUANTITY in filters else None,
+        max_quantity=8 if QUANTITY in filters else None,
+        q="product 1" if TEXT in filters else None,
+    )
+
+
+def sorts_for(filters):
+    return [sort for sort in INDEX_SORTS[SEARCH_PLANS[filters]] if sort is not OrderSort.rank or TEXT in filters]
+
+
+def query_plan(conn, statement):
+    sql = str(statement.compile(conn.engine, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+class TestQueryPlans:
+    @pytest.mark.parametrize("filters", list(SEARCH_PLANS), ids=lambda filters: "+".join(sorted(filters)))
+    def test_allowed_combinations_use_declared_index(self, engine, filters):
+        with engine.connect() as conn:
+            for sort in sorts_for(filters):
+                for after_id in (None, 2500):
+                    statement = search_statement(search_for(filters), sort, after_id, 50,
+                                                 after_score=-1.0, after_product="Product 1")
+                    plan = query_plan(conn, statement)
+
+                    assert not any(step.startswith("SCAN orders ") for step in plan), plan
+                    if sort is not OrderSort.rank:
+                        # Страница читается в порядке индекса, без сортировки всех совпадений
+                        assert not any("TEMP B-TREE" in step for step in plan), plan
+                    if TEXT in filters:
+                        # Строки отбирает MATCH по FTS-индексу (":M" в плане), orders — по ключу
+                        assert plan[0].startswith(f"SCAN {FTS_TABLE} VIRTUAL TABLE INDEX"), plan
+                        assert ":M" in plan[0], plan
+                        assert "SEARCH orders USING INTEGER PRIMARY KEY" in plan[1], plan
+                    else:
+                        assert not any(step.startswith("SCAN") for step in plan), plan
+                        searches = [step for step in plan if step.startswith("SEARCH")]
+                        assert searches, plan
+                        assert all(f"SEARCH orders USING INDEX {SEARCH_PLANS[filters]}" in step
+                                   for step in searches), plan
+
+
+class TestSearchRules:
+    def test_requires_selective_filter(self):
+        with pytest.raises(SearchError, match="хотя бы один фильтр"):
+            search_index(OrderSearch())
+        with pytest.raises(SearchError, match="только вместе"):
+            search_index(OrderSearch(min_quantity=1))
+
+    def test_rejects_inverted_quantity_range(self):
+        with pytest.raises(SearchError, match="min_quantity"):
+            search_index(OrderSearch(user_id=1, min_quantity=5, max_quantity=2))
+
+    def test_fulltext_rules(self):
+        with pytest.raises(SearchError, match="нельзя использовать вместе"):
+            search_index(OrderSearch(product_prefix="Lap", q="laptop"))
+        with pytest.raises(SearchError, match="ни одного слова"):
+            search_index(OrderSearch(q="*:-"))
+        with pytest.raises(SearchError, match="rank"):
+            search_statement(OrderSearch(user_id=1), OrderSort.rank)
+
+    def test_sort_follows_index(self):
+        assert default_sort(OrderSearch(product_prefix="Lap")) is OrderSort.product
+        assert default_sort(OrderSearch(user_id=1, product_prefix="Lap")) is OrderSort.id
+        assert default_sort(OrderSearch(q="lap")) is OrderSort.rank
+        with pytest.raises(SearchError, match="только сортировка product"):
+            search_statement(OrderSearch(product_prefix="Lap"), OrderSort.id)
+        with pytest.raises(SearchError, match="Сортировка product"):
+            search_statement(OrderSearch(user_id=1), OrderSort.product)
+
+    def test_rejects_product_cursor_outside_prefix(self):
+        search = OrderSearch(product_prefix="Lap")
+        for after_product in ("Keyboard", "Mouse"):
+            with pytest.raises(SearchError, match="Курсор"):
+                search_statement(search, OrderSort.product, 10, 50, after_product=after_product)
+        search_statement(search, OrderSort.product, 10, 50, after_product="Laptop")
+
+    def test_product_pages_match_full_sort(self, engine):
+        search = OrderSearch(product_prefix="Product 1", min_quantity=3)
+        with engine.connect() as conn:
+            expected = [row.id for row in conn.execute(search_statement(search, OrderSort.product, limit=10000))]
+            pages, after = [], (None, None)
+            while True:
+                page = conn.execute(search_statement(
+                    search, OrderSort.product, after[1], 37, after_product=after[0]
+                )).all()
+                pages.extend(row.id for row in page)
+                if len(page) < 37:
+                    break
+                after = (page[-1].product_name, page[-1].id)
+        assert pages == expected
+
+    def test_prefix_upper_bound(self):
+        assert prefix_upper_bound("Lap") == "Laq"
+        assert prefix_upper_bound("Товар") == "Товас"
+        assert prefix_upper_bound("a\U0010ffff") == "b"
+        assert prefix_upper_bound("\U0010ffff") is None
+
+
+class TestFulltext:
+    def test_match_query_quotes_words(self):
+        assert match_query("Laptop  bag") == '"Laptop" "bag"'
+        # Синтаксис FTS5 из ввода не проходит
+        assert match_query('lap* OR "bag" NEAR(x)') == '"lap" "OR" "bag" "NEAR" "x"'
+        assert match_query("Ноутбук") == '"Ноутбук"'
+        assert match_query(" -*") is None
+
+    def test_triggers_keep_index_in_sync(self, engine):
+        def found(conn, q):
+            statement = search_statement(OrderSearch(q=q), OrderSort.id, limit=10000)
+            return {row.id for row in conn.execute(statement)}
+
+        with engine.begin() as conn:
+            order_id = conn.execute(
+                insert(Order).values(user_id=1, product_name="Gaming Laptop", quantity=1)
+            ).inserted_primary_key[0]
+            assert found(conn, "laptop") == {order_id}
+
+            conn.execute(update(Order).where(Order.id == order_id).values(product_name="Desk"))
+            assert found(conn, "laptop") == set()
+            assert order_id in found(conn, "desk")
+
+            conn.execute(delete(Order).where(Order.id == order_id))
+            assert found(conn, "desk") == set()
+
+    def test_rebuild(self, engine):
+        def found(conn):
+            return {row.id for row in conn.execute(search_statement(OrderSearch(q="product 7"), limit=10000))}
+
+        with engine.begin() as conn:
+            expected = found(conn)
+            assert expected
+            # Индекс потерял содержимое (например, загрузка в обход триггеров)
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+            assert found(conn) == set()
+
+            rebuild_fulltext(conn)
+
+            assert found(conn) == expected
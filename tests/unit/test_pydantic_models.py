@@ -1,7 +1,8 @@
 import pytest
 from pydantic import ValidationError
 
-from src.models.pydantic_models import UserCreate, UserResponse, OrderCreate, OrderResponse
+from src.models import pydantic_models
+from src.models.pydantic_models import UserCreate, UserResponse, OrderCreate, OrderResponse, validate_batch
 
 class TestUserCreateModel:
     def test_valid_user_create(self):
@@ -95,4 +96,69 @@ class TestOrderCreateModel:
         }
         with pytest.raises(ValidationError) as exc_info:
             OrderCreate(**order_data)
-        assert "Количество должно быть больше 0" in str(exc_info.value)
\ No newline at end of file
+        assert "Количество должно быть больше 0" in str(exc_info.value)
+
+def error_summary(model, data):
+    with pytest.raises(ValidationError) as exc_info:
+        model.model_validate(data)
+    return [(err["loc"], err["msg"], err["type"]) for err in exc_info.value.errors()]
+
+
+class TestErrorMessages:
+    # Тексты и типы ошибок — часть API (422 и ошибки пакетной вставки)
+    @pytest.mark.parametrize("model, data, expected", [
+        (UserCreate, {"username": "jo", "email": "a@example.com", "age": 25}, [
+            (("username",), "Value error, Имя пользователя должно содержать минимум 3 символа", "value_error"),
+        ]),
+        (UserCreate, {"username": "john@doe", "email": "a@example.com", "age": 0}, [
+            (("username",), "Value error, Имя пользователя может содержать только буквы, цифры и нижнее подчеркивание",
+             "value_error"),
+            (("age",), "Value error, Возраст должен быть больше 0 и меньше 100", "value_error"),
+        ]),
+        (UserCreate, {"username": 5, "email": "a@example.com", "age": "x"}, [
+            (("username",), "Input should be a valid string", "string_type"),
+            (("age",), "Input should be a valid integer, unable to parse string as an integer", "int_parsing"),
+        ]),
+        (OrderCreate, {"user_id": 1, "product_name": "Laptop", "quantity": 0}, [
+            (("quantity",), "Value error, Количество должно быть больше 0", "value_error"),
+        ]),
+        (OrderCreate, [1, 2], [
+            ((), "Input should be a valid dictionary or instance of OrderCreate", "model_type"),
+        ]),
+    ])
+    def test_messages_unchanged(self, model, data, expected):
+        assert error_summary(model, data) == expected
+
+    def test_trailing_newline_in_username_still_accepted(self):
+        # Прежний re.match с $ пропускал завершающий перевод строки
+        assert UserCreate(username="john\n", email="a@example.com", age=30).username == "john\n"
+
+
+class TestValidateBatch:
+    def test_all_valid(self):
+        raw = [{"user_id": i, "product_name": "Laptop", "quantity": 1} for i in range(1, 4)]
+
+        items, errors = validate_batch(OrderCreate, raw)
+
+        assert errors == {}
+        assert [item.user_id for item in items.values()] == [1, 2, 3]
+        assert list(items) == [0, 1, 2]
+
+    def test_errors_match_single_validation(self, monkeypatch):
+        monkeypatch.setattr(pydantic_models, "VALIDATE_BATCH_SIZE", 2)
+        raw = [
+            {"user_id": 1, "product_name": "Laptop", "quantity": 1},
+            {"user_id": 2, "product_name": "Mouse", "quantity": 1},
+            {"user_id": 3, "product_name": "Laptop", "quantity": 0},
+            {"user_id": 4, "product_name": "Mouse", "quantity": 2},
+            "not an object",
+        ]
+
+        items, errors = validate_batch(OrderCreate, raw)
+
+        assert sorted(items) == [0, 1, 3]
+        assert sorted(errors) == [2, 4]
+        for index, item_errors in errors.items():
+            assert [(e["loc"], e["msg"]) for e in item_errors] == [
+                (loc, msg) for loc, msg, _ in error_summary(OrderCreate, raw[index])
+            ]
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+from src.database.migrate import upgrade
+from src.database.replicas import Replica, ReplicaPool, pinned_to_primary
+from src.database.replicator import replicate
+
+
+def file_replica(path, name, migrated=True):
+    engine = create_engine(f"sqlite:///{path}")
+    if migrated:
+        upgrade(engine)
+    return Replica(name, engine)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ReplicaPool([file_replica(tmp_path / f"r{i}.db", f"r{i}") for i in range(3)])
+    yield pool
+    pool.dispose()
+
+
+class TestReplicaPool:
+    def test_round_robin(self, pool):
+        assert [pool.choose().name for _ in range(6)] == ["r0", "r1", "r2", "r0", "r1", "r2"]
+
+    def test_skips_unhealthy(self, pool):
+        pool.mark_down(pool.replicas[1], "тест")
+        assert [pool.choose().name for _ in range(4)] == ["r0", "r2", "r0", "r2"]
+
+        for replica in pool.replicas:
+            pool.mark_down(replica, "тест")
+        assert pool.choose() is None
+
+    def test_empty_pool(self):
+        pool = ReplicaPool()
+        assert not pool
+        assert pool.choose() is None
+
+    def test_health_check(self, tmp_path):
+        stale = file_replica(tmp_path / "stale.db", "stale", migrated=False)
+        missing = Replica("missing", create_engine(f"sqlite:///{tmp_path / 'no-dir' / 'r.db'}"))
+        healthy = file_replica(tmp_path / "ok.db", "ok")
+        pool = ReplicaPool([stale, missing, healthy])
+
+        assert pool.check_all() == 1
+        assert [replica.healthy for replica in pool.replicas] == [False, False, True]
+
+        # Реплика с догнавшей схемой возвращается следующей проверкой
+        upgrade(stale.engine)
+        assert pool.check_all() == 2
+        assert stale.healthy
+        pool.dispose()
+
+
+class TestReadYourWrites:
+    def test_pinned_window(self):
+        now = 1000.0
+        assert pinned_to_primary("1003.5", 5, now)
+        assert not pinned_to_primary("999.0", 5, now)
+        # Подделанное значение далеко в будущем не закрепляет навсегда
+        assert not pinned_to_primary("99999", 5, now)
+        assert not pinned_to_primary("abc", 5, now)
+        assert not pinned_to_primary(None, 5, now)
+
+
+class TestReplicator:
+    def test_copies_database(self, tmp_path):
+        source = tmp_path / "primary.db"
+        with sqlite3.connect(source) as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.execute("INSERT INTO t VALUES (1), (2)")
+        replicas = [tmp_path / "r1.db", tmp_path / "r2.db"]
+
+        replicate(str(source), [str(path) for path in replicas])
+        with sqlite3.connect(source) as conn:
+            conn.execute("INSERT INTO t VALUES (3)")
+        replicate(str(source), [str(path) for path in replicas])
+
+        for path in replicas:
+            with sqlite3.connect(path) as conn:
+                assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (3,)
@@ -0,0 +1,68 @@
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from src.api import responses
+from src.api.responses import json_row, json_rows_response
+from src.database.crud import ORDER_COLUMNS, USER_COLUMNS
+from src.models.orm_models import Order, User
+from src.models.pydantic_models import OrderResponse, UserResponse
+
+
+def reference_bytes(model, objects) -> bytes:
+    """Так ответ сериализовал FastAPI через response_model."""
+    adapter = TypeAdapter(List[model])
+    return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+
+@pytest.fixture
+def populated(db_session):
+    users = [
+        User(username="ivan_petrov", email="ivan@example.com", age=30),
+        User(username="anna", email="anna@example.com", age=41),
+    ]
+    db_session.add_all(users)
+    db_session.flush()
+    db_session.add_all([
+        Order(user_id=users[0].id, product_name="Чайник «Эко»", quantity=2),
+        Order(user_id=users[1].id, product_name='Quote " and \\ slash', quantity=1),
+        Order(user_id=users[1].id, product_name="Emoji 🚀  ", quantity=99),
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture(params=["orjson", "json"])
+def serializer(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(responses, "orjson", None)
+    return request.param
+
+
+class TestResponseParity:
+    def test_order_rows_match_response_model(self, populated, serializer):
+        rows = populated.execute(select(*ORDER_COLUMNS).order_by(Order.id)).all()
+        objects = populated.scalars(select(Order).order_by(Order.id)).all()
+
+        assert json_rows_response(rows, OrderResponse).body == reference_bytes(OrderResponse, objects)
+
+    def test_user_rows_match_response_model(self, populated, serializer):
+        rows = populated.execute(select(*USER_COLUMNS).order_by(User.id)).all()
+        objects = populated.scalars(select(User).order_by(User.id)).all()
+
+        assert json_rows_response(rows, UserResponse).body == reference_bytes(UserResponse, objects)
+
+    def test_single_row_matches_model_dump_json(self, populated, serializer):
+        row = populated.execute(select(*ORDER_COLUMNS).where(Order.id == 1)).one()
+        obj = populated.get(Order, 1)
+
+        assert json_row(row, OrderResponse) == OrderResponse.model_validate(obj).model_dump_json().encode()
+
+    def test_empty_list(self, serializer):
+        assert json_rows_response([], OrderResponse).body == b"[]"
+
+    def test_trailing_columns_are_dropped(self, serializer):
+        assert json_row((1, 2, "X", 3, 777), OrderResponse) == \
+            b'{"id":1,"user_id":2,"product_name":"X","quantity":3}'
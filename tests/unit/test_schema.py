@@ -0,0 +1,34 @@
+from sqlalchemy import text
+
+from src.database.schema import find_index_drift
+
+
+class TestIndexDrift:
+    def test_no_drift_on_fresh_schema(self, db_session):
+        assert find_index_drift(db_session.get_bind()) == []
+
+    def test_missing_index_reported(self, db_session):
+        db_session.execute(text("DROP INDEX ix_orders_user_id_id"))
+        db_session.commit()
+
+        problems = find_index_drift(db_session.get_bind())
+
+        assert len(problems) == 1
+        assert "ix_orders_user_id_id" in problems[0]
+        assert "отсутствует" in problems[0]
+
+    def test_undeclared_index_reported(self, db_session):
+        db_session.execute(text("CREATE INDEX ix_orders_quantity ON orders (quantity)"))
+        db_session.commit()
+
+        problems = find_index_drift(db_session.get_bind())
+
+        assert problems == ["индекс ix_orders_quantity в таблице orders не объявлен в моделях"]
+
+    def test_user_orders_query_uses_index(self, db_session):
+        plan = db_session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM orders WHERE user_id = 1 ORDER BY id"
+        )).fetchall()
+
+        details = " ".join(row[-1] for row in plan)
+        assert "ix_orders_user_id_id" in details
@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import create_engine
+
+from src import serve
+from src.config import Settings
+from src.database import db
+
+
+class TestUvicornOptions:
+    def test_workers_default_to_available_cpus(self, monkeypatch):
+        monkeypatch.delenv("WORKERS", raising=False)
+        monkeypatch.setattr("os.sched_getaffinity", lambda pid: {0, 1, 2}, raising=False)
+
+        assert serve.uvicorn_options(Settings(_env_file=None))["workers"] == 3
+
+    def test_options_from_settings(self):
+        settings = Settings(
+            _env_file=None, workers=4, backlog=4096, keep_alive_timeout=15, graceful_timeout=20,
+            server_loop="asyncio", server_http="h11",
+        )
+
+        options = serve.uvicorn_options(settings)
+
+        assert options["workers"] == 4
+        assert options["backlog"] == 4096
+        assert options["timeout_keep_alive"] == 15
+        assert options["timeout_graceful_shutdown"] == 20
+        assert (options["loop"], options["http"]) == ("asyncio", "h11")
+
+    @pytest.mark.parametrize("installed, expected", [(True, ("uvloop", "httptools")), (False, ("asyncio", "h11"))])
+    def test_auto_prefers_uvloop_and_httptools(self, monkeypatch, installed, expected):
+        monkeypatch.setattr(serve, "_installed", lambda module: installed)
+
+        assert (serve.resolve_loop("auto"), serve.resolve_http("auto")) == expected
+
+
+def test_engine_pool_replaced_after_fork(monkeypatch):
+    engine = create_engine("sqlite:///:memory:")
+    monkeypatch.setattr(db, "engine", engine)
+    pool = engine.pool
+
+    db._dispose_engines_after_fork()
+
+    assert engine.pool is not pool
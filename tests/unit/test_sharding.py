@@ -0,0 +1,170 @@
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+
+from src.database.crud import create_order, create_user
+from src.database.db import apply_sqlite_pragmas
+from src.database.migrate import upgrade
+from src.database.reshard import delete_unowned, plan_moves, reshard
+from src.database.sharding import (
+    SLOT_MOVING, SLOTS, HashRing, Shard, ShardingError, ShardRouter, SlotMoving, SnowflakeGenerator, WrongShard,
+    claim_slot, init_slots, slot_of,
+)
+from src.database.summary import verify_summary
+from src.models.orm_models import Order, ShardSlot, User
+from src.models.pydantic_models import OrderCreate, UserCreate
+
+
+def make_shard(tmp_path, name):
+    engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(engine, "default")
+    upgrade(engine)
+    return Shard(name, engine)
+
+
+@pytest.fixture
+def shards(tmp_path):
+    created = [make_shard(tmp_path, name) for name in ("s1", "s2", "s3")]
+    yield created
+    for shard in created:
+        shard.engine.dispose()
+
+
+def populate(router, users=40, orders_per_user=3):
+    user_ids = []
+    for n in range(users):
+        user_id = router.new_user_id()
+        router.run(user_id, lambda db: create_user(
+            db, UserCreate(username=f"user{n}", email=f"user{n}@example.com", age=30), user_id
+        ))
+        for k in range(orders_per_user):
+            order = OrderCreate(user_id=user_id, product_name=f"product {k}", quantity=k + 1)
+            router.run(user_id, lambda db: create_order(db, order, order_id=router.new_order_id(user_id)))
+        user_ids.append(user_id)
+    return user_ids
+
+
+def counts(router, model):
+    def count(shard):
+        with shard.engine.connect() as conn:
+            return conn.scalar(select(func.count()).select_from(model))
+    return sum(router.scatter(count))
+
+
+class TestIds:
+    def test_snowflake_ids_are_unique_and_carry_slot(self):
+        generator = SnowflakeGenerator()
+        ids = [generator.next_id(slot % SLOTS) for slot in range(10_000)]
+        assert len(set(ids)) == len(ids)
+        assert [slot_of(value) for value in ids] == [slot % SLOTS for slot in range(10_000)]
+
+    def test_ids_of_later_milliseconds_are_larger(self):
+        ticks = iter([1_800_000_000.0, 1_800_000_000.0, 1_800_000_000.002])
+        generator = SnowflakeGenerator(clock=lambda: next(ticks))
+        first, second, later = (generator.next_id(3) for _ in range(3))
+        assert first != second
+        assert later > max(first, second)
+
+    def test_sequence_overflow_waits_for_next_millisecond(self):
+        ticks = iter([1_800_000_000.0] * 5000 + [1_800_000_000.001] * 10)
+        generator = SnowflakeGenerator(clock=lambda: next(ticks))
+        ids = [generator.next_id(1) for _ in range(4097)]
+        assert len(set(ids)) == 4097
+
+
+class TestHashRing:
+    def test_adding_shard_moves_slots_only_to_new_shard(self):
+        before = HashRing(["s1", "s2", "s3"]).assignment()
+        after = HashRing(["s1", "s2", "s3", "s4"]).assignment()
+        moved = [slot for slot in range(SLOTS) if before[slot] != after[slot]]
+        assert all(after[slot] == "s4" for slot in moved)
+        # Около четверти слотов, с запасом на неравномерность кольца
+        assert SLOTS / 8 < len(moved) < SLOTS / 2
+
+    def test_assignment_covers_all_slots(self):
+        assert set(HashRing(["a", "b"]).assignment()) == set(range(SLOTS))
+
+
+class TestSlots:
+    def test_init_slots_assigns_each_slot_once(self, shards):
+        router = ShardRouter(shards)
+        assert init_slots(router) == SLOTS
+        owners = router.load_owners()
+        assert len(owners) == SLOTS
+        assert all(len(states) == 1 for states in owners.values())
+        with pytest.raises(ShardingError):
+            init_slots(router)
+
+    def test_unassigned_slot_raises(self, shards):
+        router = ShardRouter(shards)
+        with pytest.raises(ShardingError):
+            router.shard_for_slot(0)
+
+    def test_claim_slot(self, shards):
+        router = ShardRouter(shards)
+        init_slots(router)
+        slot = 5
+        owner = router.shard_for_slot(slot)
+        other = next(shard for shard in shards if shard is not owner)
+        with owner.session_factory() as db:
+            claim_slot(db, slot)
+        with other.session_factory() as db, pytest.raises(WrongShard):
+            claim_slot(db, slot)
+        with owner.engine.begin() as conn:
+            conn.execute(ShardSlot.__table__.update().values(state=SLOT_MOVING).where(ShardSlot.slot == slot))
+        with owner.session_factory() as db, pytest.raises(SlotMoving):
+            claim_slot(db, slot)
+
+    def test_run_follows_moved_slot(self, shards):
+        router = ShardRouter(shards)
+        init_slots(router)
+        user_id = router.new_user_id()
+        owner = router.shard_for_id(user_id)
+        target = next(shard for shard in shards if shard is not owner)
+        with owner.engine.begin() as conn:
+            conn.execute(ShardSlot.__table__.delete().where(ShardSlot.slot == slot_of(user_id)))
+        with target.engine.begin() as conn:
+            conn.execute(insert(ShardSlot).values(slot=slot_of(user_id)))
+
+        def write(db):
+            claim_slot(db, slot_of(user_id))
+            return db.bind.url
+
+        # Карта устарела: первая попытка уходит к прежнему владельцу
+        assert router.run(user_id, write) == target.engine.url
+
+
+class TestReshard:
+    def test_adding_shard_moves_data_without_loss(self, shards):
+        router = ShardRouter(shards[:2])
+        init_slots(router)
+        user_ids = populate(router)
+        users, orders = counts(router, User), counts(router, Order)
+
+        grown = ShardRouter(shards)
+        grown.refresh()
+        moves = reshard(grown)
+        assert moves and all(target == "s3" for _, _, target in moves)
+        assert plan_moves(grown) == []
+        assert counts(grown, User) == users and counts(grown, Order) == orders
+        for user_id in user_ids:
+            with grown.shard_for_id(user_id).session_factory() as db:
+                assert db.get(User, user_id) is not None
+                assert db.scalar(select(func.count()).where(Order.user_id == user_id)) == 3
+        for shard in shards:
+            with shard.session_factory() as db:
+                assert verify_summary(db) == []
+
+    def test_drain_moves_everything_off_shard(self, shards):
+        router = ShardRouter(shards)
+        init_slots(router)
+        populate(router, users=20)
+        orders = counts(router, Order)
+        reshard(router, drain=["s2"])
+        assert set(router.current_owners().values()) == {"s1", "s3"}
+        with shards[1].engine.connect() as conn:
+            assert conn.scalar(select(func.count()).select_from(User)) == 0
+        assert counts(router, Order) == orders
+
+    def test_delete_unowned_requires_full_map(self, shards):
+        with pytest.raises(ShardingError):
+            delete_unowned(ShardRouter(shards))
@@ -0,0 +1,9 @@
+from benchmarks.bench_cold_start import measure_import
+
+
+def test_import_does_not_touch_database(tmp_path):
+    db_path = tmp_path / "cold.db"
+
+    measure_import(f"sqlite:///{db_path}")
+
+    assert not db_path.exists()
@@ -0,0 +1,120 @@
+import pytest
+from sqlalchemy import update
+
+from src.database import summary
+from src.database.summary import check_summary_initialized, rebuild_summary, record_orders, verify_summary
+from src.models.orm_models import Order, ProductOrderStats, User, UserOrderStats
+
+
+def make_users(db_session, count):
+    users = [User(username=f"user_{i}", email=f"user{i}@example.com", age=30) for i in range(count)]
+    db_session.add_all(users)
+    db_session.commit()
+    return users
+
+
+class TestRecordOrders:
+    @pytest.mark.parametrize("upsert", [True, False], ids=["on-conflict", "portable"])
+    def test_aggregates_and_increments(self, db_session, monkeypatch, upsert):
+        if not upsert:
+            # Диалект без ON CONFLICT: UPDATE, затем INSERT
+            monkeypatch.setattr(summary, "_UPSERT_INSERTS", {})
+        first, second = make_users(db_session, 2)
+
+        record_orders(db_session, [(first.id, "Laptop", 1), (first.id, "Mouse", 2), (second.id, "Mouse", 3)])
+        record_orders(db_session, [(first.id, "Mouse", 4)])
+        db_session.commit()
+
+        assert db_session.get(UserOrderStats, first.id).order_count == 3
+        assert db_session.get(UserOrderStats, first.id).total_quantity == 7
+        assert db_session.get(UserOrderStats, second.id).total_quantity == 3
+        assert db_session.get(ProductOrderStats, "Mouse").order_count == 3
+        assert db_session.get(ProductOrderStats, "Mouse").total_quantity == 9
+        assert db_session.get(ProductOrderStats, "Laptop").order_count == 1
+
+    def test_portable_retries_update_after_insert_race(self, db_session, monkeypatch):
+        monkeypatch.setattr(summary, "_UPSERT_INSERTS", {})
+        user, = make_users(db_session, 1)
+        # Параллельная транзакция вставляет ту же строку сводки между UPDATE и INSERT
+        racing = [
+            UserOrderStats(user_id=user.id, order_count=1, total_quantity=3),
+            ProductOrderStats(product_name="Laptop", order_count=1, total_quantity=3),
+        ]
+        begin_nested = db_session.begin_nested
+
+        def racing_begin_nested():
+            db_session.add(racing.pop(0))
+            db_session.flush()
+            return begin_nested()
+
+        monkeypatch.setattr(db_session, "begin_nested", racing_begin_nested)
+
+        record_orders(db_session, [(user.id, "Laptop", 3)])
+        db_session.commit()
+
+        assert racing == []
+        assert db_session.get(UserOrderStats, user.id).order_count == 2
+        assert db_session.get(UserOrderStats, user.id).total_quantity == 6
+        assert db_session.get(ProductOrderStats, "Laptop").order_count == 2
+
+    def test_empty_batch_is_noop(self, db_session, query_counter):
+        record_orders(db_session, [])
+
+        assert query_counter.count == 0
+
+    def test_rolled_back_with_transaction(self, db_session):
+        user, = make_users(db_session, 1)
+
+        record_orders(db_session, [(user.id, "Laptop", 1)])
+        db_session.rollback()
+
+        assert db_session.get(UserOrderStats, user.id) is None
+
+
+class TestRebuildAndVerify:
+    def test_verify_reports_drift_and_rebuild_fixes_it(self, db_session):
+        first, second = make_users(db_session, 2)
+        db_session.add_all([
+            Order(user_id=first.id, product_name="Laptop", quantity=1),
+            Order(user_id=second.id, product_name="Laptop", quantity=2),
+        ])
+        db_session.commit()
+
+        # Заказы вставлены в обход record_orders — сводки пусты
+        problems = verify_summary(db_session)
+        assert len(problems) == 3
+        assert any("товар Laptop" in problem for problem in problems)
+
+        rebuild_summary(db_session)
+
+        assert verify_summary(db_session) == []
+        assert db_session.get(ProductOrderStats, "Laptop").total_quantity == 3
+
+    def test_verify_detects_corrupted_counter(self, db_session):
+        user, = make_users(db_session, 1)
+        db_session.add(Order(user_id=user.id, product_name="Laptop", quantity=1))
+        db_session.commit()
+        rebuild_summary(db_session)
+
+        db_session.execute(update(UserOrderStats).values(total_quantity=100))
+        db_session.commit()
+
+        assert verify_summary(db_session) == [
+            f"пользователь {user.id}: в сводке 1 заказов / 100 шт., по orders 1 заказов / 1 шт."
+        ]
+
+
+class TestStartupCheck:
+    def test_warns_when_orders_exist_without_summary(self, db_session, caplog):
+        user, = make_users(db_session, 1)
+        engine = db_session.get_bind()
+
+        assert check_summary_initialized(engine)
+
+        db_session.add(Order(user_id=user.id, product_name="Laptop", quantity=1))
+        db_session.commit()
+        assert not check_summary_initialized(engine)
+        assert "rebuild" in caplog.text
+
+        rebuild_summary(db_session)
+        assert check_summary_initialized(engine)